@@ -0,0 +1,60 @@
+"""
+Benchmark de l'encodage JSON des payloads stats.
+
+Compare le fournisseur Flask par défaut (json de la bibliothèque standard) au
+fournisseur de l'application (orjson s'il est installé) sur les payloads
+complets de /api/db/dump/stats et /api/db/dump/stats/advanced/series.
+
+Usage:
+    python scripts/bench_json_encoding.py [year] [repeat]
+"""
+
+import os
+import sys
+from time import perf_counter
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, 'server'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from api.json_provider import FastJSONProvider, get_json_backend
+from services.dump_stats_service import build_stats_from_dump_db, get_time_series
+
+
+def _time_encode(provider, payload, repeat):
+    """Best and mean encode time in ms over ``repeat`` runs, and the output size."""
+    durations = []
+    size = 0
+    for _ in range(repeat):
+        started = perf_counter()
+        size = len(provider.dumps(payload))
+        durations.append((perf_counter() - started) * 1000)
+    return min(durations), sum(durations) / len(durations), size
+
+
+def main():
+    year = int(sys.argv[1]) if len(sys.argv) > 1 else 2025
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    app = Flask(__name__)
+    providers = {
+        'json (défaut Flask)': DefaultJSONProvider(app),
+        f'{get_json_backend()} (FastJSONProvider)': FastJSONProvider(app)
+    }
+    payloads = {
+        'stats': {'success': True, 'data': build_stats_from_dump_db(year)},
+        'series (day)': {'success': True, 'data': get_time_series('day', year)}
+    }
+
+    print(f"Année {year}, {repeat} encodages par mesure")
+    for payload_name, payload in payloads.items():
+        print(f"\n{payload_name}")
+        for provider_name, provider in providers.items():
+            best, mean, size = _time_encode(provider, payload, repeat)
+            print(f"  {provider_name:<28} min {best:8.2f} ms   moy {mean:8.2f} ms   {size / 1024:8.1f} Ko")
+
+
+if __name__ == '__main__':
+    main()
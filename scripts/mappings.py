@@ -80,6 +80,13 @@ DECHETTERIE_MAPPING = {
     'dech. monistrol': 'Monistrol',
 }
 
+# Opening calendars (used by missing-days detection when calendars are enabled)
+# Weekdays follow Python's convention: 0 = Monday ... 6 = Sunday
+DEFAULT_CLOSED_WEEKDAYS = [6]
+
+# Per-déchetterie overrides of DEFAULT_CLOSED_WEEKDAYS
+DECHETTERIE_CLOSED_WEEKDAYS = {}
+
 # Standard category columns (updated to match actual data)
 # Standard categories for regular collection
 CATEGORY_COLUMNS = [
@@ -252,6 +259,11 @@ def get_dechetteries_list():
     return STANDARD_DECHETTERIES.copy()
 
 
+def get_closed_weekdays(dechetterie):
+    """Get the closed weekdays (0 = Monday) of a standard déchetterie."""
+    return list(DECHETTERIE_CLOSED_WEEKDAYS.get(dechetterie, DEFAULT_CLOSED_WEEKDAYS))
+
+
 def get_category_columns():
     """Get the list of standard category columns."""
     return CATEGORY_COLUMNS.copy()
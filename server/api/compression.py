@@ -0,0 +1,155 @@
+"""
+Compression négociée des réponses (gzip, et brotli s'il est installé).
+
+Appliquée après chaque requête : les réponses texte / JSON au-delà d'un seuil
+sont compressées selon ``Accept-Encoding`` ; les réponses en flux (générateurs)
+sont compressées au fil de l'eau. Les corps compressés des réponses portant un
+ETag (voir ``api/http_cache.py``) sont gardés dans un petit cache LRU indexé
+par (ETag, encodage) : un même payload de stats n'est compressé qu'une fois
+par version des données. Les vues dont le corps varie à ETag égal (mesures
+de temps ``timings_ms`` par requête) positionnent ``g.volatile_response``
+et ne passent pas par ce cache.
+"""
+
+from collections import OrderedDict
+import threading
+import zlib
+
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/csv',
+    'text/html',
+    'text/plain'
+}
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def _supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _choose_encoding():
+    """Pick the best encoding accepted by the client, or None."""
+    accepted = request.accept_encodings
+    best = None
+    best_quality = 0
+    for encoding in _supported_encodings():
+        quality = accepted[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(chunks, encoding):
+    """Compress an iterable of byte (or text) chunks on the fly."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def _cached_body(key):
+    with _cache_lock:
+        body = _cache.get(key)
+        if body is not None:
+            _cache.move_to_end(key)
+        return body
+
+
+def _store_body(key, body):
+    global _cache_bytes
+    if len(body) > CACHE_MAX_BYTES // 4:
+        return
+    with _cache_lock:
+        if key in _cache:
+            return
+        _cache[key] = body
+        _cache_bytes += len(body)
+        while _cache_bytes > CACHE_MAX_BYTES:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+
+
+def _should_skip(response):
+    if getattr(g, 'skip_compression', False):
+        return True
+    if response.status_code != 200 or request.method == 'HEAD':
+        return True
+    if 'Content-Encoding' in response.headers or 'Content-Range' in response.headers:
+        return True
+    # send_file responses (file wrappers, range support) are left untouched
+    if response.direct_passthrough:
+        return True
+    return response.mimetype not in COMPRESSIBLE_MIMETYPES
+
+
+def compress_response(response):
+    """after_request hook compressing eligible responses."""
+    if _should_skip(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+
+    etag, _ = response.get_etag()
+    volatile = getattr(g, 'volatile_response', False)
+    key = (request.path, etag, encoding) if etag and not volatile else None
+    body = _cached_body(key) if key else None
+    if body is None:
+        body = _compress(data, encoding)
+        if key:
+            _store_body(key, body)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Register response compression on the Flask app."""
+    app.after_request(compress_response)
@@ -0,0 +1,117 @@
+"""
+Limite de concurrence des endpoints lourds (calculs de stats).
+
+Au plus ``HEAVY_MAX_CONCURRENT`` calculs lourds sont menés en même temps,
+tous workers confondus : chaque calcul doit obtenir un des fichiers de slot
+(verrou ``flock`` non bloquant). Le slot n'est demandé qu'au démarrage d'un
+calcul effectif (garde du cache de résultats) : les hits et les attentes d'un
+calcul déjà en cours passent toujours. Sans slot libre, la requête reçoit
+immédiatement un 503 avec ``Retry-After`` plutôt que de s'empiler jusqu'au
+timeout gunicorn. Sans ``fcntl`` (Windows), la limite s'applique par processus.
+
+Par défaut, la limite vaut le nombre de threads de requête (workers x threads,
+cf. gunicorn.conf.py) moins un, pour que les endpoints légers restent servis.
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+import os
+from pathlib import Path
+import threading
+
+from flask import g, jsonify
+
+from services.cache import ComputeRejected, reset_compute_guard, set_compute_guard
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: per-process limit only
+    fcntl = None
+
+
+def _default_max_concurrent():
+    """Request threads of the gunicorn setup, minus one kept for light endpoints."""
+    workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+    threads = int(os.environ.get('GUNICORN_THREADS', 2))
+    return max(1, workers * threads - 1)
+
+
+HEAVY_MAX_CONCURRENT = int(os.environ.get('HEAVY_MAX_CONCURRENT') or _default_max_concurrent())
+RETRY_AFTER_SECONDS = 5
+
+_local_slots = threading.BoundedSemaphore(HEAVY_MAX_CONCURRENT)
+
+
+def _slots_dir():
+    path = Path(__file__).resolve().parents[1] / 'data' / 'locks'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _heavy_slot():
+    """Yield True while holding a slot, False if all slots are busy."""
+    if fcntl is None:
+        acquired = _local_slots.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _local_slots.release()
+        return
+
+    slots_dir = _slots_dir()
+    for index in range(HEAVY_MAX_CONCURRENT):
+        slot_file = open(slots_dir / f"heavy-{index}.lock", 'w')
+        try:
+            fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            slot_file.close()
+            continue
+        try:
+            yield True
+        finally:
+            fcntl.flock(slot_file, fcntl.LOCK_UN)
+            slot_file.close()
+        return
+    yield False
+
+
+@contextmanager
+def _require_slot():
+    """Compute guard: hold a slot during the computation, or reject it."""
+    with _heavy_slot() as acquired:
+        if not acquired:
+            # Views turn exceptions into 500s: the flag lets the decorator answer 503
+            g.heavy_rejected = True
+            raise ComputeRejected('Aucun slot de calcul libre')
+        yield
+
+
+def _busy_response():
+    response = jsonify({
+        'success': False,
+        'message': 'Serveur occupé',
+        'error': 'Trop de calculs de statistiques en cours, réessayez dans quelques secondes'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response
+
+
+def limit_concurrency(view):
+    """Decorate a heavy endpoint: its cached computations share the concurrency cap."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = set_compute_guard(_require_slot)
+        try:
+            response = view(*args, **kwargs)
+        except ComputeRejected:
+            return _busy_response()
+        finally:
+            reset_compute_guard(token)
+            rejected = g.pop('heavy_rejected', False)
+        if rejected:
+            return _busy_response()
+        return response
+    return wrapper
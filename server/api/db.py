@@ -2,26 +2,47 @@
 Endpoints API pour la base SQLite dump (ingestion et stats).
 """
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, g, jsonify, request, send_file, stream_with_context
 from werkzeug.utils import secure_filename
-import os
-import shutil
+import logging
 from pathlib import Path
 
-from services.db import get_dump_connection, init_dump_db, get_dump_available_years
-from services.dump_ingest_service import ingest_dump_file
+from api.concurrency import limit_concurrency
+from api.http_cache import conditional_dump_response
+from services.db import init_dump_db, get_dump_available_years
+from services.query_executor import run_queries
+from services.report_service import get_job, get_output_dir, refresh_stale_report, start_report_job
+from services.warmup import start_warmup
+from services.dump_ingest_service import ingest_dump_file, remove_dump_file
+from services.dump_query_service import get_aggregate, QueryTimeout
+from services.dump_raw_service import get_raw_page, get_raw_options, iter_raw_export, parse_fields, EXPORT_FORMATS
 from services.dump_stats_service import (
-    build_stats_from_dump_db,
+    get_dump_stats,
+    get_stats_diagnostics,
+    get_year_over_year,
+    get_advanced_bundle,
+    get_weight_distribution,
+    get_calendar_heatmap,
+    get_flux_heatmap,
     get_time_series as get_dump_time_series,
     get_category_stats as get_dump_category_stats,
     get_flux_orientation_matrix as get_dump_flux_orientation_matrix,
     get_anomalies as get_dump_anomalies,
     get_missing_days as get_dump_missing_days,
-    get_comparison as get_dump_comparison
+    get_comparison as get_dump_comparison,
+    ANOMALY_WINDOW,
+    ANOMALY_THRESHOLD
+)
+from services.columnar import (
+    COLUMNAR_FORMAT,
+    parse_precision,
+    encode_stats_columnar,
+    encode_series_columnar
 )
 
 
 db_bp = Blueprint('db', __name__)
+logger = logging.getLogger(__name__)
 
 
 # ============================================================================
@@ -29,6 +50,15 @@ db_bp = Blueprint('db', __name__)
 # ============================================================================
 
 
+def _after_dump_change(year):
+    """Warm the caches and refresh the report once a dump change is committed (failures are only logged)."""
+    try:
+        start_warmup('import', [year])
+        refresh_stale_report(year)
+    except Exception as exc:
+        logger.warning(f"[DUMP] Actions post-import {year} en échec: {exc}")
+
+
 @db_bp.route('/db/dump/import', methods=['POST'])
 def import_dump():
     """Import dump file into dump database."""
@@ -40,7 +70,6 @@ def import_dump():
     try:
         year = int(year)
         result = ingest_dump_file(file_path=file_path, year=year, force=force)
-        return jsonify(result), 200
     except Exception as exc:
         return jsonify({
             'success': False,
@@ -48,21 +77,51 @@ def import_dump():
             'error': str(exc)
         }), 500
 
+    if result.get('success'):
+        _after_dump_change(year)
+    return jsonify(result), 200
+
+
+@db_bp.route('/db/dump/files/<int:file_id>', methods=['DELETE'])
+def remove_dump(file_id):
+    """Remove an imported dump file from dump database."""
+    try:
+        year = int(request.args.get('year', 2025))
+        result = remove_dump_file(file_id, year=year)
+    except Exception as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Erreur lors de la suppression du fichier',
+            'error': str(exc)
+        }), 500
+
+    if result.get('success'):
+        _after_dump_change(year)
+    return jsonify(result), 200 if result.get('success') else 404
+
 
 @db_bp.route('/db/dump/status', methods=['GET'])
+@conditional_dump_response
 def dump_status():
     """Get status of dump database."""
     year = request.args.get('year', 2025)
     try:
         year = int(year)
         init_dump_db(year)
-        with get_dump_connection(year) as conn:
-            cursor = conn.cursor()
-            row = cursor.execute("SELECT COUNT(*) AS count FROM raw_dump").fetchone()
-            file_row = cursor.execute("SELECT COUNT(*) AS count FROM import_dump_files").fetchone()
-            last_import = cursor.execute(
-                "SELECT filename, imported_at, row_count, sheet_count FROM import_dump_files ORDER BY imported_at DESC LIMIT 1"
-            ).fetchone()
+        results, timings = run_queries(year, {
+            'rows': ("SELECT COUNT(*) AS count FROM raw_dump", (), 'one'),
+            'files': ("SELECT COUNT(*) AS count FROM import_dump_files", (), 'one'),
+            'last_import': (
+                "SELECT filename, imported_at, row_count, sheet_count FROM import_dump_files ORDER BY imported_at DESC LIMIT 1",
+                (),
+                'one'
+            )
+        })
+        # Per-request timings: the body changes while the ETag does not
+        g.volatile_response = True
+        row = results['rows']
+        file_row = results['files']
+        last_import = results['last_import']
 
         return jsonify({
             'success': True,
@@ -73,7 +132,8 @@ def dump_status():
                 'imported_at': last_import['imported_at'],
                 'row_count': last_import['row_count'],
                 'sheet_count': last_import['sheet_count']
-            } if last_import else None
+            } if last_import else None,
+            'timings_ms': timings
         }), 200
     except Exception as exc:
         return jsonify({
@@ -84,12 +144,23 @@ def dump_status():
 
 
 @db_bp.route('/db/dump/stats', methods=['GET'])
+@conditional_dump_response
+@limit_concurrency
 def dump_stats():
     """Get statistics from dump database."""
+    try:
+        precision = parse_precision(request.args.get('precision'))
+    except ValueError as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Paramètres invalides',
+            'error': str(exc)
+        }), 400
     try:
         year = request.args.get('year', 2025)
         year = int(year)
-        result = build_stats_from_dump_db(year)
+        response_format = request.args.get('format')
+        result = get_dump_stats(year)
         if result.get('success') and result.get('stats'):
             # Vérification supplémentaire : s'assurer que global_totals existe
             stats = result.get('stats')
@@ -99,6 +170,8 @@ def dump_stats():
                     'message': 'Format de données invalide : global_totals manquant',
                     'error': 'Les statistiques ne contiennent pas global_totals'
                 }), 500
+            if response_format == COLUMNAR_FORMAT:
+                stats = encode_stats_columnar(stats, precision)
             return jsonify({
                 'success': True,
                 'stats': stats,
@@ -119,20 +192,66 @@ def dump_stats():
         }), 500
 
 
+@db_bp.route('/db/dump/stats/diagnostics', methods=['GET'])
+@conditional_dump_response
+def dump_stats_diagnostics():
+    """Get mapping diagnostics for the dump statistics."""
+    try:
+        year = request.args.get('year', 2025)
+        year = int(year)
+        data = get_stats_diagnostics(year)
+        return jsonify({'success': True, 'data': data}), 200
+    except Exception as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 500
+
+
+@db_bp.route('/db/dump/stats/yoy', methods=['GET'])
+@conditional_dump_response(multi_year=True)
+@limit_concurrency
+def dump_stats_yoy():
+    """Get year-over-year comparison from dump databases."""
+    try:
+        years_param = request.args.get('years')
+        years = [int(y) for y in years_param.split(',') if y.strip()] if years_param else None
+        data = get_year_over_year(years)
+        return jsonify({'success': True, 'data': data}), 200
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Paramètres invalides',
+            'error': 'years doit être une liste d\'années séparées par des virgules'
+        }), 400
+    except Exception as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 500
+
+
 @db_bp.route('/db/dump/stats/advanced/series', methods=['GET'])
+@conditional_dump_response
+@limit_concurrency
 def dump_advanced_series():
     """Get time series from dump database."""
     granularity = request.args.get('granularity', 'day')
+    try:
+        precision = parse_precision(request.args.get('precision'))
+    except ValueError as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Paramètres invalides',
+            'error': str(exc)
+        }), 400
     try:
         year = request.args.get('year', 2025)
         year = int(year)
         data = get_dump_time_series(granularity, year)
+        if request.args.get('format') == COLUMNAR_FORMAT:
+            data = encode_series_columnar(data, precision)
         return jsonify({'success': True, 'data': data}), 200
     except Exception as exc:
         return jsonify({'success': False, 'error': str(exc)}), 500
 
 
 @db_bp.route('/db/dump/stats/advanced/category', methods=['GET'])
+@conditional_dump_response
 def dump_advanced_category():
     """Get category statistics from dump database."""
     try:
@@ -145,6 +264,7 @@ def dump_advanced_category():
 
 
 @db_bp.route('/db/dump/stats/advanced/flux-orientation', methods=['GET'])
+@conditional_dump_response
 def dump_advanced_flux_orientation():
     """Get flux-orientation matrix from dump database."""
     try:
@@ -157,31 +277,38 @@ def dump_advanced_flux_orientation():
 
 
 @db_bp.route('/db/dump/stats/advanced/anomalies', methods=['GET'])
+@conditional_dump_response
+@limit_concurrency
 def dump_advanced_anomalies():
     """Get anomalies from dump database."""
     limit = int(request.args.get('limit', 10))
     try:
         year = request.args.get('year', 2025)
         year = int(year)
-        data = get_dump_anomalies(limit, year)
+        window = int(request.args.get('window', ANOMALY_WINDOW))
+        threshold = float(request.args.get('threshold', ANOMALY_THRESHOLD))
+        data = get_dump_anomalies(limit, year, window=max(3, window), threshold=threshold)
         return jsonify({'success': True, 'data': data}), 200
     except Exception as exc:
         return jsonify({'success': False, 'error': str(exc)}), 500
 
 
 @db_bp.route('/db/dump/stats/advanced/missing-days', methods=['GET'])
+@conditional_dump_response
 def dump_advanced_missing_days():
     """Get missing days from dump database."""
     try:
         year = request.args.get('year', 2025)
         year = int(year)
-        data = get_dump_missing_days(year)
+        use_calendar = request.args.get('calendar', 'false').lower() in ('1', 'true', 'yes')
+        data = get_dump_missing_days(year, use_calendar=use_calendar)
         return jsonify({'success': True, 'data': data}), 200
     except Exception as exc:
         return jsonify({'success': False, 'error': str(exc)}), 500
 
 
 @db_bp.route('/db/dump/stats/advanced/comparison', methods=['GET'])
+@conditional_dump_response
 def dump_advanced_comparison():
     """Get comparison statistics from dump database."""
     try:
@@ -193,16 +320,135 @@ def dump_advanced_comparison():
         return jsonify({'success': False, 'error': str(exc)}), 500
 
 
+@db_bp.route('/db/dump/stats/advanced/bundle', methods=['GET'])
+@conditional_dump_response
+@limit_concurrency
+def dump_advanced_bundle():
+    """Get all advanced statistics sections in one response."""
+    try:
+        year = int(request.args.get('year', 2025))
+        granularity = request.args.get('granularity', 'day')
+        limit = int(request.args.get('limit', 10))
+        use_calendar = request.args.get('calendar', 'false').lower() in ('1', 'true', 'yes')
+        data = get_advanced_bundle(year, granularity=granularity, limit=limit, use_calendar=use_calendar)
+        # Per-request timings: the body changes while the ETag does not
+        g.volatile_response = True
+        return jsonify({'success': True, 'data': data}), 200
+    except Exception as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 500
+
+
+@db_bp.route('/db/dump/stats/distribution', methods=['GET'])
+@conditional_dump_response
+@limit_concurrency
+def dump_weight_distribution():
+    """Get weight quantiles and histograms per category, flux or déchetterie."""
+    try:
+        year = int(request.args.get('year', 2025))
+        by = request.args.get('by', 'category')
+        bins = int(request.args.get('bins', 20))
+        scale = request.args.get('scale', 'linear')
+        data = get_weight_distribution(year, by=by, bins=bins, scale=scale)
+        return jsonify({'success': True, 'data': data}), 200
+    except ValueError as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Paramètres invalides',
+            'error': str(exc)
+        }), 400
+    except Exception as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 500
+
+
+@db_bp.route('/db/dump/stats/heatmap/calendar', methods=['GET'])
+@conditional_dump_response
+@limit_concurrency
+def dump_calendar_heatmap():
+    """Get the calendar heatmap grid (ISO week x weekday per layer)."""
+    try:
+        year = int(request.args.get('year', 2025))
+        data = get_calendar_heatmap(year, by=request.args.get('by', 'dechetterie'))
+        return jsonify({'success': True, 'data': data}), 200
+    except ValueError as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Paramètres invalides',
+            'error': str(exc)
+        }), 400
+    except Exception as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 500
+
+
+@db_bp.route('/db/dump/stats/heatmap/flux', methods=['GET'])
+@conditional_dump_response
+@limit_concurrency
+def dump_flux_heatmap():
+    """Get the déchetterie x flux heatmap matrix."""
+    try:
+        year = int(request.args.get('year', 2025))
+        data = get_flux_heatmap(year, by=request.args.get('by', 'category'))
+        return jsonify({'success': True, 'data': data}), 200
+    except ValueError as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Paramètres invalides',
+            'error': str(exc)
+        }), 400
+    except Exception as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 500
+
+
+@db_bp.route('/db/dump/aggregate', methods=['GET'])
+@conditional_dump_response
+@limit_concurrency
+def dump_aggregate():
+    """
+    Generic aggregation: dimensions x measures with filters.
+
+    Example: ``?dimensions=month,dechetterie&measures=sum:poids,count&category=Bois``.
+    See ``services.dump_query_service.parse_aggregate_request`` for parameters.
+    """
+    try:
+        year = int(request.args.get('year', 2025))
+        data = get_aggregate(year, request.args)
+        return jsonify({'success': True, 'data': data}), 200
+    except ValueError as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Paramètres invalides',
+            'error': str(exc)
+        }), 400
+    except QueryTimeout as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Requête trop longue',
+            'error': str(exc)
+        }), 504
+    except Exception as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 500
+
+
 @db_bp.route('/db/dump/raw', methods=['GET'])
+@conditional_dump_response
 def dump_raw_data():
-    """Get raw data from dump database with pagination and filters."""
+    """
+    Get raw data from dump database with pagination and filters.
+
+    Pagination is by offset (``offset``, legacy) or by keyset cursor
+    (``after`` / ``before`` from a previous ``next_cursor`` / ``prev_cursor``).
+    ``sort`` is one of date, poids, lieu_collecte, categorie and ``order``
+    asc or desc. The total is counted in offset mode, or with ``count=1``.
+    ``fields`` (comma separated) limits the returned columns.
+    """
     year = request.args.get('year', 2025)
     try:
         year = int(year)
         init_dump_db(year)
+        after = request.args.get('after') or None
+        before = request.args.get('before') or None
         try:
             limit = int(request.args.get('limit', 50))
-            offset = int(request.args.get('offset', 0))
+            offset = None if (after or before) else int(request.args.get('offset', 0))
         except ValueError:
             return jsonify({
                 'success': False,
@@ -210,70 +456,32 @@ def dump_raw_data():
                 'error': 'limit et offset doivent être des entiers'
             }), 400
 
-        limit = max(1, min(limit, 500))
-        offset = max(0, offset)
-
-        with get_dump_connection(year) as conn:
-            cursor = conn.cursor()
-            filters = []
-            params = []
-
-            query = request.args.get('q')
-            if query:
-                like = f"%{query}%"
-                filters.append(
-                    "("
-                    "lieu_collecte LIKE ? OR categorie LIKE ? OR sous_categorie LIKE ? "
-                    "OR flux LIKE ? OR orientation LIKE ? OR origine LIKE ? OR secteur_collecte LIKE ? "
-                    "OR source_file LIKE ? OR source_sheet LIKE ?"
-                    ")"
-                )
-                params.extend([like] * 9)
-
-            for key in ['lieu_collecte', 'categorie', 'sous_categorie', 'flux', 'orientation', 
-                       'origine', 'secteur_collecte', 'source_file', 'source_sheet']:
-                value = request.args.get(key)
-                if value:
-                    filters.append(f"{key} LIKE ?")
-                    params.append(f"%{value}%")
-
-            date_from = request.args.get('date_from')
-            date_to = request.args.get('date_to')
-            if date_from:
-                filters.append("date >= ?")
-                params.append(date_from)
-            if date_to:
-                filters.append("date <= ?")
-                params.append(date_to)
-
-            where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
-
-            total_row = cursor.execute(
-                f"SELECT COUNT(*) AS count FROM raw_dump {where_clause}",
-                params
-            ).fetchone()
-            total = total_row['count'] if total_row else 0
-
-            rows = cursor.execute(
-                f"""
-                SELECT id, date, date_raw, heure, lieu_collecte, categorie, sous_categorie, 
-                       flux, orientation, origine, secteur_collecte, compte, nombre, poids, 
-                       volume_m3, site, pole, tournee, source_file, source_sheet
-                FROM raw_dump
-                {where_clause}
-                ORDER BY date ASC, id ASC
-                LIMIT ? OFFSET ?
-                """,
-                [*params, limit, offset]
-            ).fetchall()
-
-        items = [dict(row) for row in rows]
+        count = request.args.get('count')
+        with_total = offset is not None if count is None else count.lower() in ('1', 'true', 'yes')
+
+        try:
+            page = get_raw_page(
+                year,
+                request.args,
+                limit=limit,
+                offset=offset,
+                after=after,
+                before=before,
+                sort=request.args.get('sort', 'date'),
+                order=request.args.get('order', 'asc').lower(),
+                with_total=with_total,
+                fields=parse_fields(request.args.get('fields'))
+            )
+        except ValueError as exc:
+            return jsonify({
+                'success': False,
+                'message': 'Paramètres invalides',
+                'error': str(exc)
+            }), 400
+
         return jsonify({
             'success': True,
-            'items': items,
-            'limit': limit,
-            'offset': offset,
-            'total': total
+            **page
         }), 200
     except Exception as exc:
         return jsonify({
@@ -283,44 +491,79 @@ def dump_raw_data():
         }), 500
 
 
+@db_bp.route('/db/dump/raw/export', methods=['GET'])
+@conditional_dump_response
+def dump_raw_export():
+    """
+    Export filtered raw data as a streamed CSV or NDJSON file.
+
+    Accepts the same filters and ``fields`` as /db/dump/raw, plus ``format`` (csv, ndjson),
+    ``sort``/``order`` and ``gzip`` (the stream is compressed on the fly when
+    the client accepts it, see api/compression.py; ``gzip=0`` disables it).
+    """
+    year = request.args.get('year', 2025)
+    try:
+        year = int(year)
+        init_dump_db(year)
+        fmt = request.args.get('format', 'csv').lower()
+        try:
+            chunks = iter_raw_export(
+                year,
+                request.args,
+                fmt=fmt,
+                sort=request.args.get('sort', 'date'),
+                order=request.args.get('order', 'asc').lower(),
+                fields=parse_fields(request.args.get('fields'))
+            )
+        except ValueError as exc:
+            return jsonify({
+                'success': False,
+                'message': 'Paramètres invalides',
+                'error': str(exc)
+            }), 400
+
+        if request.args.get('gzip', '1').lower() in ('0', 'false', 'no'):
+            g.skip_compression = True
+        body = (chunk.encode('utf-8') for chunk in chunks)
+        # content_type: EXPORT_FORMATS values already carry the charset
+        response = Response(stream_with_context(body), content_type=EXPORT_FORMATS[fmt])
+        response.headers['Content-Disposition'] = f'attachment; filename="dump-{year}.{fmt}"'
+        return response
+    except Exception as exc:
+        return jsonify({
+            'success': False,
+            'message': "Erreur lors de l'export des données",
+            'error': str(exc)
+        }), 500
+
+
 @db_bp.route('/db/dump/raw/options', methods=['GET'])
+@conditional_dump_response
 def dump_raw_data_options():
-    """Get filter options for dump raw data."""
+    """
+    Get filter options for dump raw data.
+
+    ``options`` lists the values of each filterable column; ``facets`` gives
+    the row count and total poids of each value, relative to the filters
+    passed (same parameters as /db/dump/raw).
+    """
     year = request.args.get('year', 2025)
     try:
         year = int(year)
         init_dump_db(year)
-
-        def fetch_distinct(cursor, column, limit=200):
-            rows = cursor.execute(
-                f"""
-                SELECT DISTINCT {column}
-                FROM raw_dump
-                WHERE {column} IS NOT NULL AND {column} != ''
-                ORDER BY {column} ASC
-                LIMIT ?
-                """,
-                (limit,)
-            ).fetchall()
-            return [row[column] for row in rows]
-
-        with get_dump_connection(year) as conn:
-            cursor = conn.cursor()
-            options = {
-                'lieu_collecte': fetch_distinct(cursor, 'lieu_collecte'),
-                'categorie': fetch_distinct(cursor, 'categorie'),
-                'sous_categorie': fetch_distinct(cursor, 'sous_categorie'),
-                'flux': fetch_distinct(cursor, 'flux'),
-                'orientation': fetch_distinct(cursor, 'orientation'),
-                'origine': fetch_distinct(cursor, 'origine'),
-                'secteur_collecte': fetch_distinct(cursor, 'secteur_collecte'),
-                'source_file': fetch_distinct(cursor, 'source_file'),
-                'source_sheet': fetch_distinct(cursor, 'source_sheet')
-            }
+        try:
+            facets = get_raw_options(year, request.args)
+        except ValueError as exc:
+            return jsonify({
+                'success': False,
+                'message': 'Paramètres invalides',
+                'error': str(exc)
+            }), 400
 
         return jsonify({
             'success': True,
-            'options': options
+            'options': {column: [entry['value'] for entry in entries] for column, entries in facets.items()},
+            'facets': facets
         }), 200
     except Exception as exc:
         return jsonify({
@@ -340,6 +583,71 @@ def dump_years():
     }), 200
 
 
+# ============================================================================
+# Report endpoints
+# ============================================================================
+
+
+def _report_download_url(filename):
+    return f"/api/files/output/download/{filename}"
+
+
+@db_bp.route('/reports/collectes', methods=['POST'])
+def generate_collectes_report():
+    """
+    Generate the COLLECTES workbook of a year in the background.
+
+    Returns 200 with the existing workbook when it matches the current data
+    version (unless ``force=true``), otherwise 202 with the job to poll at
+    /api/reports/jobs/<job_id>.
+    """
+    try:
+        year = int(request.args.get('year', 2025))
+        force = request.args.get('force', 'false').lower() in ('1', 'true', 'yes')
+        job, report = start_report_job(year, force=force)
+    except ValueError as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Paramètres invalides',
+            'error': str(exc)
+        }), 400
+    except Exception as exc:
+        return jsonify({
+            'success': False,
+            'message': 'Erreur lors du lancement de la génération',
+            'error': str(exc)
+        }), 500
+
+    if job is None:
+        return jsonify({
+            'success': True,
+            'cached': True,
+            'report': report,
+            'download_url': _report_download_url(report['filename'])
+        }), 200
+    return jsonify({
+        'success': True,
+        'cached': False,
+        'job': job,
+        'status_url': f"/api/reports/jobs/{job['id']}"
+    }), 202
+
+
+@db_bp.route('/reports/jobs/<job_id>', methods=['GET'])
+def report_job_status(job_id):
+    """Get the state of a report generation job."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Tâche introuvable',
+            'error': f"Aucune tâche {job_id}"
+        }), 404
+    if job['state'] == 'done':
+        job['download_url'] = _report_download_url(job['report']['filename'])
+    return jsonify({'success': True, 'job': job}), 200
+
+
 # ============================================================================
 # File management endpoints (Input/Output files)
 # ============================================================================
@@ -348,7 +656,7 @@ def dump_years():
 def list_output_files():
     """List available output files (Excel reports)."""
     try:
-        output_dir = Path(__file__).parent.parent.parent / 'output'
+        output_dir = get_output_dir()
         if not output_dir.exists():
             return jsonify({
                 'success': True,
@@ -383,7 +691,7 @@ def download_output_file(filename):
     try:
         # Sanitize filename
         filename = secure_filename(filename)
-        output_dir = Path(__file__).parent.parent.parent / 'output'
+        output_dir = get_output_dir()
         file_path = output_dir / filename
         
         # Security check
@@ -399,11 +707,14 @@ def download_output_file(filename):
                 'error': 'Invalid file path'
             }), 403
         
+        # conditional: ETag / Last-Modified validation and Range requests (206),
+        # so interrupted downloads of large workbooks can resume
         return send_file(
             file_path,
             as_attachment=True,
             download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            conditional=True
         )
     except Exception as exc:
         return jsonify({
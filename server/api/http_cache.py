@@ -0,0 +1,121 @@
+"""
+Validateurs HTTP (ETag) pour les endpoints de lecture dump.
+
+L'ETag d'une réponse dérive de la version des données de la ou des années
+concernées, de l'empreinte de ``mappings.py``, de l'empreinte du code du
+serveur (un déploiement qui change la forme d'une réponse invalide les
+copies des clients), du chemin et des paramètres de requête normalisés. Il
+est calculé avant la vue : une requête conditionnelle dont le validateur
+correspond reçoit un 304 sans qu'aucune requête SQL de la vue ne soit
+exécutée.
+
+Aucun Last-Modified n'est envoyé : la date du dernier import ne change ni
+à la suppression d'un fichier ni à la modification des mappings, et
+If-Modified-Since produirait alors des 304 erronés.
+"""
+
+from functools import wraps
+import hashlib
+from pathlib import Path
+
+from flask import make_response, request
+
+from services.db import get_dump_available_years, get_dump_data_state
+from services.dump_rollup_service import get_mapping_fingerprint
+
+
+CACHE_CONTROL = 'no-cache'
+
+
+def _code_fingerprint():
+    """Hash of the server's Python sources (tests excluded)."""
+    server_dir = Path(__file__).resolve().parents[1]
+    digest = hashlib.sha1()
+    for path in sorted(server_dir.rglob('*.py')):
+        relative = path.relative_to(server_dir)
+        if relative.parts[0] == 'tests':
+            continue
+        digest.update(str(relative).encode('utf-8'))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+# Computed once per process (in the gunicorn master with preload_app)
+BUILD_VERSION = _code_fingerprint()
+
+
+def _request_years(multi_year):
+    """Years whose data the current request depends on."""
+    if multi_year:
+        years_param = request.args.get('years')
+        if years_param:
+            try:
+                return sorted({int(y) for y in years_param.split(',') if y.strip()})
+            except ValueError:
+                return []
+        return get_dump_available_years()
+    try:
+        return [int(request.args.get('year', 2025))]
+    except ValueError:
+        return []
+
+
+def compute_validators(years):
+    """
+    Compute the ETag of the current request.
+
+    Args:
+        years: Years whose data the response depends on
+
+    Returns:
+        Opaque tag (unquoted)
+    """
+    versions = [(year, get_dump_data_state(year)['version']) for year in years]
+    args = sorted((key, value) for key in request.args for value in request.args.getlist(key))
+    signature = '|'.join([
+        ','.join(f"{year}:{version}" for year, version in versions),
+        get_mapping_fingerprint(),
+        BUILD_VERSION,
+        request.path,
+        repr(args)
+    ])
+    return hashlib.sha1(signature.encode('utf-8')).hexdigest()[:20]
+
+
+def _apply_validators(response, etag):
+    # Weak: the same data may be sent with different content encodings
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def _not_modified(etag):
+    """Whether the request's If-None-Match matches the current ETag."""
+    return bool(request.if_none_match) and request.if_none_match.contains_weak(etag)
+
+
+def conditional_dump_response(view=None, multi_year=False):
+    """
+    Decorate a GET dump endpoint with ETag validation.
+
+    Args:
+        view: Flask view function
+        multi_year: The response depends on the ``years`` parameter (all
+            available years by default) instead of ``year``
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            etag = compute_validators(_request_years(multi_year))
+            if _not_modified(etag):
+                return _apply_validators(make_response('', 304), etag)
+
+            response = make_response(func(*args, **kwargs))
+            if response.status_code == 200:
+                _apply_validators(response, etag)
+            return response
+        return wrapper
+
+    if view is not None:
+        return decorator(view)
+    return decorator
@@ -0,0 +1,69 @@
+"""
+Fournisseur JSON de l'application Flask.
+
+Utilise ``orjson`` lorsqu'il est installé (encodage natif des tableaux et
+scalaires numpy), sinon l'encodeur de la bibliothèque standard. Dans les deux
+cas les scalaires / tableaux numpy et les ``pandas.Timestamp`` sont sérialisés
+directement : les services peuvent renvoyer leurs résultats numpy sans
+conversion manuelle. La sortie reste celle du fournisseur Flask par défaut
+(clés triées, dates au format HTTP).
+
+numpy et pandas ne sont pas importés ici : un objet de ces types ne peut
+exister que si le module a déjà été chargé par un service.
+"""
+
+import sys
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj):
+    """Serialize values the encoders do not handle natively."""
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    np = sys.modules.get('numpy')
+    if np is not None:
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+    # Dates, decimals, UUIDs, dataclasses: Flask's default behaviour
+    return DefaultJSONProvider.default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson when available, stdlib otherwise."""
+
+    default = staticmethod(_default)
+
+    if orjson is not None:
+        _options = (
+            orjson.OPT_SERIALIZE_NUMPY
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SORT_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+
+        def dumps(self, obj, **kwargs):
+            # Custom encoder options (cls, indent, ...) are only supported by the stdlib path
+            if kwargs:
+                return super().dumps(obj, **kwargs)
+            return orjson.dumps(obj, default=_default, option=self._options).decode('utf-8')
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            if self.compact is False or (self.compact is None and self._app.debug):
+                return super().response(*args, **kwargs)
+            body = orjson.dumps(obj, default=_default, option=self._options)
+            return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def get_json_backend():
+    """Name of the encoder in use ('orjson' or 'json')."""
+    return 'orjson' if orjson is not None else 'json'
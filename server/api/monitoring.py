@@ -0,0 +1,76 @@
+"""
+Instrumentation HTTP et exposition des métriques (/api/metrics).
+
+Pour chaque requête : latence et temps SQL par route, taille de la réponse,
+compteur par statut et jauge des requêtes en cours. Les mesures sont agrégées
+entre workers par ``services.metrics``.
+"""
+
+from time import perf_counter
+
+from flask import Response, g, request
+
+from services import metrics
+
+
+def _route_label():
+    """Route template (e.g. /api/db/dump/files/<int:file_id>), bounded cardinality."""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _before_request():
+    g.metrics_started = perf_counter()
+    g.metrics_sql = True
+    metrics.start_request_sql()
+    metrics.gauge_add('http_requests_in_flight', 1)
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    route = _route_label()
+    metrics.observe(
+        'http_request_duration_seconds',
+        perf_counter() - started,
+        labels={'method': request.method, 'route': route}
+    )
+    metrics.inc(
+        'http_requests_total',
+        labels={'method': request.method, 'route': route, 'status': response.status_code}
+    )
+    # Streamed responses have no known size
+    if not response.is_streamed:
+        metrics.observe(
+            'http_response_size_bytes',
+            response.calculate_content_length() or 0,
+            labels={'route': route},
+            buckets=metrics.SIZE_BUCKETS
+        )
+    return response
+
+
+def _teardown_request(exc):
+    if not g.pop('metrics_sql', False):
+        return
+    metrics.observe('http_request_sql_seconds', metrics.end_request_sql(), labels={'route': _route_label()})
+    metrics.gauge_add('http_requests_in_flight', -1)
+    metrics.flush()
+
+
+def metrics_endpoint():
+    """Expose metrics of every worker in Prometheus text format."""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+def init_monitoring(app):
+    """
+    Register request instrumentation and the /api/metrics endpoint.
+
+    Must be registered before other after_request hooks (e.g. compression) so
+    that the recorded size is the one actually sent.
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/api/metrics', 'metrics', metrics_endpoint, methods=['GET'])
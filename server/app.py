@@ -10,20 +10,30 @@ import sys
 # Ajouter le chemin pour les imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from api.compression import init_compression
 from api.db import db_bp
+from api.json_provider import FastJSONProvider
+from api.monitoring import init_monitoring
 from services.db import init_dump_db
+from services.dump_rollup_service import ensure_all_rollups
+from services.warmup import ensure_warmup_started, get_warmup_status, start_warmup
 
 def create_app():
     """Crée et configure l'application Flask"""
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     
-    # Configuration du logging
+    # Configuration du logging (niveau via LOG_LEVEL, INFO par défaut)
     import logging
+    log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    valid_level = isinstance(logging.getLevelName(log_level), int)
     logging.basicConfig(
-        level=logging.DEBUG,  # CHANGED TO DEBUG
+        level=log_level if valid_level else logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     logger = logging.getLogger(__name__)
+    if not valid_level:
+        logger.warning(f"[APP] LOG_LEVEL invalide ({log_level}), niveau INFO utilisé")
     logger.info("[APP] Starting create_app()")
     
     # Configuration
@@ -64,10 +74,24 @@ def create_app():
     init_dump_db(2025)
     logger.info("[APP] Dump DB initialized")
 
+    # Pré-agrégats à jour (ex. après un changement de mappings.py) avant de
+    # servir : les routes de lecture ne les reconstruisent pas
+    ensure_all_rollups()
+
     # Enregistrer les blueprints
     logger.info("[APP] Registering blueprints...")
     app.register_blueprint(db_bp, url_prefix='/api')
     logger.info("[APP] Blueprints registered")
+
+    # Métriques par route (/api/metrics), avant la compression pour mesurer la taille envoyée
+    init_monitoring(app)
+
+    # Compression des réponses (gzip / brotli selon Accept-Encoding)
+    init_compression(app)
+
+    # Préchauffage des caches : lancé au démarrage du worker (gunicorn.conf.py),
+    # à défaut à la première requête du processus
+    app.before_request(ensure_warmup_started)
     
     # Route de base
     @app.route('/')
@@ -81,8 +105,10 @@ def create_app():
                 'dump_import': '/api/db/dump/import (POST)',
                 'dump_status': '/api/db/dump/status (GET)',
                 'dump_stats': '/api/db/dump/stats (GET)',
+                'dump_stats_diagnostics': '/api/db/dump/stats/diagnostics (GET)',
                 'dump_raw': '/api/db/dump/raw (GET)',
-                'dump_years': '/api/db/dump/years (GET)'
+                'dump_years': '/api/db/dump/years (GET)',
+                'metrics': '/api/metrics (GET)'
             }
         })
     
@@ -92,7 +118,8 @@ def create_app():
         return jsonify({
             'success': True,
             'status': 'online',
-            'message': 'Backend API is running'
+            'message': 'Backend API is running',
+            'warmup': get_warmup_status()
         }), 200
     
     # Gestion des erreurs
@@ -125,6 +152,7 @@ def create_app():
 
 if __name__ == '__main__':
     app = create_app()
+    start_warmup('boot')
     
     # Port par défaut
     port = int(os.environ.get('PORT', 5000))
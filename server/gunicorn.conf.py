@@ -0,0 +1,54 @@
+"""
+Configuration Gunicorn (production, Render).
+
+L'application est chargée une seule fois dans le processus maître
+(``preload_app``) : l'initialisation (DDL de la base dump, blueprints) n'est
+plus rejouée par chaque worker et les modules importés sont partagés en
+copy-on-write. Les bibliothèques lourdes sont importées dans le maître avant
+le fork, puis ``gc.freeze()`` sort ces objets du ramasse-miettes pour que
+ses passes n'écrivent pas dans les pages partagées.
+
+Variables d'environnement : PORT, WEB_CONCURRENCY (workers), GUNICORN_THREADS,
+GUNICORN_TIMEOUT, LOG_LEVEL, WARMUP_ENABLED / WARMUP_YEARS (préchauffage des
+caches au démarrage de chaque worker).
+"""
+
+import gc
+import importlib
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+# The preloaded app derives its heavy-request cap from these (api/concurrency.py)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+preload_app = True
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+# Imported in the master so that workers share them instead of loading them
+# on their first stats request
+SHARED_MODULES = ('numpy', 'pandas')
+
+
+def when_ready(server):
+    for name in SHARED_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as exc:
+            server.log.warning(f"Préchargement de {name} impossible: {exc}")
+
+
+def pre_fork(server, worker):
+    # Everything allocated so far is shared with the worker: keep it out of
+    # garbage collection passes so that its pages stay shared
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    from services.warmup import start_warmup
+
+    start_warmup('boot')
@@ -0,0 +1,240 @@
+"""
+Cache des résultats calculés, indexé par version des données.
+
+Une entrée est identifiée par (namespace, année, version des données,
+paramètres). La version combine l'état des imports de l'année et l'empreinte
+de ``mappings.py`` : un nouvel import ou un changement de règles de mapping
+rend donc automatiquement les anciennes entrées inaccessibles. Chaque
+namespace a sa propre borne LRU en mémoire.
+
+Les calculs sont dédupliqués (single-flight) : des appels concurrents sur la
+même clé attendent le calcul en cours au lieu de le relancer. Pour les
+namespaces partagés (``shared=True``), le résultat est aussi écrit sur disque
+sous un verrou ``flock`` par clé, ce qui étend la déduplication aux autres
+workers gunicorn.
+
+Un garde (``set_compute_guard``, par ex. la limite de concurrence des
+endpoints lourds) peut encadrer les calculs effectifs : il n'est pris ni sur
+un hit, ni pendant l'attente d'un calcul en cours, ni pour une lecture du
+cache disque.
+"""
+
+from collections import OrderedDict
+import contextvars
+import hashlib
+import logging
+import os
+from pathlib import Path
+import pickle
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: no cross-process tier
+    fcntl = None
+
+from services.db import get_dump_data_version
+from services import metrics
+from services.dump_rollup_service import get_mapping_fingerprint
+
+
+# Bounds are per namespace: per-query entries (filters, free-form aggregations)
+# must not evict the few per-year statistics entries
+MAX_ENTRIES = 16
+NAMESPACE_MAX_ENTRIES = {
+    'raw_options': 128,
+    'raw_option_groups': 64,
+    'aggregate': 64,
+}
+
+logger = logging.getLogger(__name__)
+
+_entries = {}  # namespace -> OrderedDict (LRU)
+_inflight = {}
+_lock = threading.Lock()
+_compute_guard = contextvars.ContextVar('compute_guard', default=None)
+
+
+class ComputeRejected(Exception):
+    """Raised by a compute guard that refuses to start a computation."""
+
+
+class _Flight:
+    """One in-progress computation shared by concurrent callers."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _disk_cache_dir():
+    return Path(__file__).resolve().parents[1] / 'data' / 'cache'
+
+
+def get_cache_version(year=2025):
+    """Get the cache version for a given year (data version + mapping fingerprint)."""
+    return f"{get_dump_data_version(year)}-{get_mapping_fingerprint()}"
+
+
+def set_compute_guard(guard):
+    """
+    Run the computations started from the current context under ``guard``.
+
+    Args:
+        guard: Zero-argument callable returning a context manager, entered
+            around each actual computation; it may raise ComputeRejected
+
+    Returns:
+        Token for reset_compute_guard
+    """
+    return _compute_guard.set(guard)
+
+
+def reset_compute_guard(token):
+    """Restore the compute guard replaced by set_compute_guard."""
+    _compute_guard.reset(token)
+
+
+def _guarded(compute):
+    guard = _compute_guard.get()
+    if guard is None:
+        return compute()
+    # Nested cached computations run under the guard already held
+    token = _compute_guard.set(None)
+    try:
+        with guard():
+            return compute()
+    finally:
+        _compute_guard.reset(token)
+
+
+def _freeze(params):
+    """Turn a params dict into a hashable, order-independent key."""
+    if not params:
+        return ()
+    return tuple(sorted((key, str(value)) for key, value in params.items()))
+
+
+def _read_pickle(path):
+    try:
+        with open(path, 'rb') as fh:
+            return True, pickle.load(fh)
+    except FileNotFoundError:
+        return False, None
+    except (OSError, pickle.UnpicklingError, EOFError) as exc:
+        logger.warning(f"[CACHE] Entrée disque illisible {path.name}: {exc}")
+        return False, None
+
+
+def _compute_shared(key, compute):
+    """Compute through the disk tier, one process at a time per key."""
+    namespace, year, version, frozen = key
+    params_hash = hashlib.sha1(repr(frozen).encode('utf-8')).hexdigest()[:12]
+    cache_dir = _disk_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{namespace}-{year}-{version}-{params_hash}.pkl"
+
+    found, result = _read_pickle(path)
+    if found:
+        metrics.inc('dump_cache_requests_total', labels={'namespace': namespace, 'result': 'disk'})
+        return result
+
+    with open(cache_dir / f"{path.stem}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            # Another worker may have computed it while we were waiting
+            found, result = _read_pickle(path)
+            if found:
+                metrics.inc('dump_cache_requests_total', labels={'namespace': namespace, 'result': 'disk'})
+                return result
+            result = compute()
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as fh:
+                pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Entries of older versions of this namespace/year are obsolete
+    for old in cache_dir.glob(f"{namespace}-{year}-*"):
+        if version not in old.name:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    return result
+
+
+def cached_for_version(namespace, year, compute, params=None, shared=False):
+    """
+    Return the cached result of ``compute()`` for the current data version.
+
+    Concurrent calls with the same key wait for a single computation. If it
+    raises, the error is propagated to every waiting caller and nothing is
+    cached.
+
+    Args:
+        namespace: Name of the cached computation (e.g. 'stats_diagnostics')
+        year: Year of the dump database
+        compute: Zero-argument callable producing the result
+        params: Optional dict of parameters that affect the result
+        shared: Also share the result with other processes through the disk
+            cache (for expensive, picklable results)
+    """
+    key = (namespace, int(year), get_cache_version(year), _freeze(params))
+    while True:
+        with _lock:
+            entries = _entries.get(namespace)
+            if entries is not None and key in entries:
+                entries.move_to_end(key)
+                metrics.inc('dump_cache_requests_total', labels={'namespace': namespace, 'result': 'hit'})
+                return entries[key]
+            flight = _inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _inflight[key] = _Flight()
+
+        if leader:
+            break
+        metrics.inc('dump_cache_requests_total', labels={'namespace': namespace, 'result': 'coalesced'})
+        flight.event.wait()
+        # The leader's guard refused to compute: try again under our own guard
+        if isinstance(flight.error, ComputeRejected):
+            continue
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    metrics.inc('dump_cache_requests_total', labels={'namespace': namespace, 'result': 'miss'})
+    try:
+        if shared and fcntl is not None:
+            result = _compute_shared(key, lambda: _guarded(compute))
+        else:
+            result = _guarded(compute)
+        flight.result = result
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _lock:
+            if flight.error is None:
+                entries = _entries.setdefault(namespace, OrderedDict())
+                entries[key] = flight.result
+                entries.move_to_end(key)
+                while len(entries) > NAMESPACE_MAX_ENTRIES.get(namespace, MAX_ENTRIES):
+                    entries.popitem(last=False)
+            _inflight.pop(key, None)
+        flight.event.set()
+    return result
+
+
+def clear_cache(year=None):
+    """Drop cached entries (all, or only those of one year)."""
+    with _lock:
+        if year is None:
+            _entries.clear()
+            return
+        for entries in _entries.values():
+            for key in [k for k in entries if k[1] == int(year)]:
+                del entries[key]
@@ -0,0 +1,123 @@
+"""
+Encodage JSON colonnaire compact pour les réponses stats et séries.
+
+Le format ``columnar`` envoie chaque dimension une seule fois (listes de
+libellés) et les valeurs sous forme de tableaux plats, arrondis à une
+précision configurable. L'ordre des valeurs est toujours row-major, dans
+l'ordre des dimensions annoncé par le champ ``layout`` :
+
+- stats  : ``values[(d * P + p) * C + c]`` pour déchetterie ``d``,
+  période ``p`` et colonne ``c`` ; ``totals[d * C + c]``.
+- series : ``values[p * D + d]`` pour période ``p`` et déchetterie ``d``.
+
+Le décodeur correspondant se trouve dans ``vite/src/services/api.js``.
+"""
+
+COLUMNAR_FORMAT = 'columnar'
+DEFAULT_PRECISION = 2
+MAX_PRECISION = 6
+
+
+def parse_precision(value, default=DEFAULT_PRECISION):
+    """
+    Parse the ``precision`` query parameter, clamped to [0, MAX_PRECISION].
+
+    Raises:
+        ValueError: If the value is not an integer
+    """
+    if value is None or value == '':
+        return default
+    try:
+        precision = int(value)
+    except ValueError:
+        raise ValueError("precision doit être un entier")
+    return max(0, min(precision, MAX_PRECISION))
+
+
+def _rounder(precision):
+    """Return a float rounding function for the given precision."""
+    if precision == 0:
+        return lambda value: int(round(value or 0))
+    return lambda value: round(value or 0, precision)
+
+
+def encode_stats_columnar(stats, precision=DEFAULT_PRECISION):
+    """
+    Encode the stats document built by build_stats_from_dump_db.
+
+    Per-déchetterie ``months`` and ``total`` dicts are replaced by flat value
+    matrices; every other (small) field is passed through unchanged.
+    """
+    rnd = _rounder(precision)
+    dechetteries = list(stats.get('dechetteries', {}).keys())
+    periods = list(stats.get('months_order', []))
+    columns = list(stats.get('category_columns', [])) + list(stats.get('final_fluxes', [])) + ['TOTAL']
+
+    values = []
+    totals = []
+    for dech in dechetteries:
+        data = stats['dechetteries'][dech]
+        months = data.get('months', {})
+        for period in periods:
+            month_data = months.get(period)
+            if month_data is None:
+                values.extend([0] * len(columns))
+            else:
+                values.extend(rnd(month_data.get(col, 0)) for col in columns)
+        dech_total = data.get('total', {})
+        totals.extend(rnd(dech_total.get(col, 0)) for col in columns)
+
+    encoded = {key: value for key, value in stats.items() if key != 'dechetteries'}
+    encoded.update({
+        'format': COLUMNAR_FORMAT,
+        'precision': precision,
+        'layout': {
+            'values': ['dechetteries', 'periods', 'columns'],
+            'totals': ['dechetteries', 'columns']
+        },
+        'dimensions': {
+            'dechetteries': dechetteries,
+            'periods': periods,
+            'columns': columns
+        },
+        'values': values,
+        'totals': totals
+    })
+    return encoded
+
+
+def encode_series_columnar(series, precision=DEFAULT_PRECISION):
+    """
+    Encode the list of {period, dechetterie, total} rows from get_time_series.
+
+    Missing (period, déchetterie) pairs are encoded as 0.
+    """
+    rnd = _rounder(precision)
+    periods = []
+    dechetteries = []
+    period_index = {}
+    dech_index = {}
+    for row in series:
+        if row['period'] not in period_index:
+            period_index[row['period']] = len(periods)
+            periods.append(row['period'])
+        if row['dechetterie'] not in dech_index:
+            dech_index[row['dechetterie']] = len(dechetteries)
+            dechetteries.append(row['dechetterie'])
+
+    width = len(dechetteries)
+    values = [0] * (len(periods) * width)
+    for row in series:
+        idx = period_index[row['period']] * width + dech_index[row['dechetterie']]
+        values[idx] = rnd(row['total'])
+
+    return {
+        'format': COLUMNAR_FORMAT,
+        'precision': precision,
+        'layout': {'values': ['periods', 'dechetteries']},
+        'dimensions': {
+            'periods': periods,
+            'dechetteries': dechetteries
+        },
+        'values': values
+    }
@@ -2,9 +2,13 @@
 SQLite database utilities for dump data.
 """
 
+import hashlib
 import sqlite3
 from pathlib import Path
 import re
+from time import perf_counter
+
+from services.metrics import record_sql_time
 
 
 def _data_dir():
@@ -38,17 +42,122 @@ def get_dump_available_years():
     return sorted(set(years))
 
 
+class _TimedCursor(sqlite3.Cursor):
+    """Cursor adding its execute/fetch time to the current request's SQL time."""
+
+    def _timed(self, method, *args):
+        started = perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record_sql_time(perf_counter() - started)
+
+    def execute(self, *args):
+        return self._timed(super().execute, *args)
+
+    def executemany(self, *args):
+        return self._timed(super().executemany, *args)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+
+class _TimedConnection(sqlite3.Connection):
+    """Connection whose cursors are timed (see services.metrics)."""
+
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+
 def get_dump_connection(year=2025):
     """Get a connection to the dump database for a given year."""
     db_path = get_dump_db_path(year)
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), factory=_TimedConnection)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
     return conn
 
 
+_data_state_cache = {}
+
+
+def get_dump_data_state(year=2025):
+    """
+    Get the data version and last import time of a given year.
+
+    The state is re-read only when the database file changes on disk (size or
+    modification time), so checking it usually costs a single ``stat``.
+
+    Returns:
+        dict with ``version`` (short string, 'empty' without data) and
+        ``last_import`` (ISO UTC timestamp of the latest import, or None)
+    """
+    db_path = get_dump_db_path(year)
+    if not db_path.exists():
+        return {'version': 'empty', 'last_import': None}
+    stat = db_path.stat()
+    signature_key = (stat.st_mtime_ns, stat.st_size)
+    cached = _data_state_cache.get(str(db_path))
+    if cached and cached[0] == signature_key:
+        return cached[1]
+
+    with get_dump_connection(year) as conn:
+        try:
+            row = conn.execute(
+                """
+                SELECT COUNT(*) AS files,
+                       COALESCE(MAX(id), 0) AS max_id,
+                       COALESCE(MAX(imported_at), '') AS last_import,
+                       COALESCE(SUM(row_count), 0) AS rows
+                FROM import_dump_files
+                """
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return {'version': 'empty', 'last_import': None}
+    signature = f"{row['files']}:{row['max_id']}:{row['last_import']}:{row['rows']}"
+    state = {
+        'version': hashlib.sha1(signature.encode('utf-8')).hexdigest()[:12],
+        'last_import': row['last_import'] or None
+    }
+    _data_state_cache[str(db_path)] = (signature_key, state)
+    return state
+
+
+def get_dump_data_version(year=2025):
+    """
+    Get a short version string for the data of a given year.
+
+    The version changes whenever a file is imported, re-imported or removed,
+    and is used to key cached results.
+    """
+    return get_dump_data_state(year)['version']
+
+
+_initialized_dbs = set()
+
+
 def init_dump_db(year=2025):
-    """Initialize the dump database schema for a given year."""
+    """
+    Initialize the dump database schema for a given year.
+
+    The DDL runs once per process and database file; later calls only check
+    that the file still exists.
+    """
+    db_path = get_dump_db_path(year)
+    if str(db_path) in _initialized_dbs and db_path.exists():
+        return
     with get_dump_connection(year) as conn:
         cursor = conn.cursor()
         
@@ -104,5 +213,61 @@ def init_dump_db(year=2025):
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_dump_origine ON raw_dump(origine)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_dump_secteur ON raw_dump(secteur_collecte)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_dump_tournee ON raw_dump(tournee)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_dump_file ON raw_dump(file_id)")
+        # Keyset pagination sort (the rowid id is implicitly part of each index)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_dump_poids ON raw_dump(poids)")
+        # Covering index for narrow raw views sorted by date (fields=date,lieu_collecte,categorie,flux,poids):
+        # id comes second so that ORDER BY date, id and keyset seeks are served by the index alone
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_dump_narrow ON raw_dump(date, id, lieu_collecte, categorie, flux, poids)"
+        )
+
+        # Key/value metadata (mapping fingerprint, ...)
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dump_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+            """
+        )
+
+        # Dimension tables: raw values -> mapped values (derived from mappings.py)
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dump_dechetterie_map (
+                lieu_collecte TEXT PRIMARY KEY,
+                dechetterie TEXT NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dump_category_map (
+                categorie TEXT NOT NULL,
+                sous_categorie TEXT NOT NULL,
+                flux TEXT NOT NULL,
+                orientation TEXT NOT NULL,
+                category TEXT NOT NULL,
+                PRIMARY KEY (categorie, sous_categorie, flux, orientation)
+            )
+            """
+        )
+
+        # Partial aggregates per imported file, folded into the stats
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dump_stats_partials (
+                file_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                dechetterie TEXT NOT NULL,
+                category TEXT NOT NULL,
+                poids REAL NOT NULL,
+                row_count INTEGER NOT NULL,
+                PRIMARY KEY (file_id, date, dechetterie, category)
+            )
+            """
+        )
         
         conn.commit()
+    _initialized_dbs.add(str(db_path))
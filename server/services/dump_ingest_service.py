@@ -6,9 +6,9 @@ import hashlib
 from pathlib import Path
 from datetime import datetime
 
-import pandas as pd
-
 from services.db import get_dump_connection, init_dump_db
+from services import metrics
+from services.dump_rollup_service import ensure_rollups, fold_file_partials, remove_file_partials
 
 
 def _get_project_paths():
@@ -48,6 +48,8 @@ def _normalize_column_name(name):
 
 def _format_date_iso(value):
     """Format date to ISO format (YYYY-MM-DD)."""
+    import pandas as pd
+
     if value is None or (isinstance(value, float) and pd.isna(value)):
         return None
     try:
@@ -61,6 +63,8 @@ def _format_date_iso(value):
 
 def _format_date_fr(value):
     """Format date to French format (dd/mm/yyyy)."""
+    import pandas as pd
+
     if value is None or (isinstance(value, float) and pd.isna(value)):
         return None
     try:
@@ -74,6 +78,8 @@ def _format_date_fr(value):
 
 def _format_time(value):
     """Format time to HH:MM:SS format."""
+    import pandas as pd
+
     if value is None or (isinstance(value, float) and pd.isna(value)):
         return None
     try:
@@ -105,6 +111,8 @@ def ingest_dump_file(file_path=None, year=2025, force=False, progress=None):
     Returns:
         dict with import results
     """
+    import pandas as pd
+
     init_dump_db(year)
     
     # Determine file path
@@ -318,6 +326,7 @@ def ingest_dump_file(file_path=None, year=2025, force=False, progress=None):
             }
         
         if existing and force:
+            remove_file_partials(conn, existing['id'])
             cursor.execute("DELETE FROM raw_dump WHERE file_id = ?", (existing['id'],))
             cursor.execute("DELETE FROM import_dump_files WHERE id = ?", (existing['id'],))
             conn.commit()
@@ -351,8 +360,13 @@ def ingest_dump_file(file_path=None, year=2025, force=False, progress=None):
             """,
             [(file_id,) + row for row in rows_to_insert]
         )
-        
+
+        # Only the new file's contribution is folded into the stats rollups
+        fold_file_partials(conn, file_id)
         conn.commit()
+        ensure_rollups(conn)
+
+    metrics.inc('dump_rows_ingested_total', len(rows_to_insert), labels={'year': year})
     
     return {
         'success': True,
@@ -364,3 +378,38 @@ def ingest_dump_file(file_path=None, year=2025, force=False, progress=None):
         'error_count': len(errors),
         'sheet': sheet_name
     }
+
+
+def remove_dump_file(file_id, year=2025):
+    """
+    Remove an imported dump file and its rows from the dump database.
+
+    Returns:
+        dict with removal results
+    """
+    init_dump_db(year)
+    with get_dump_connection(year) as conn:
+        cursor = conn.cursor()
+        existing = cursor.execute(
+            "SELECT id, filename FROM import_dump_files WHERE id = ?",
+            (file_id,)
+        ).fetchone()
+        if not existing:
+            return {
+                'success': False,
+                'message': f'Fichier introuvable: {file_id}',
+                'file_id': file_id
+            }
+
+        remove_file_partials(conn, file_id)
+        deleted = cursor.execute("DELETE FROM raw_dump WHERE file_id = ?", (file_id,)).rowcount
+        cursor.execute("DELETE FROM import_dump_files WHERE id = ?", (file_id,))
+        conn.commit()
+
+    return {
+        'success': True,
+        'message': 'Fichier supprimé',
+        'filename': existing['filename'],
+        'file_id': file_id,
+        'rows': deleted
+    }
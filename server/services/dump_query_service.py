@@ -0,0 +1,296 @@
+"""
+Requêtes d'agrégation génériques sur la base dump.
+
+Une requête se compose de dimensions (date au jour / semaine / mois,
+déchetterie et catégorie mappées, colonnes brutes), de mesures
+(sum / count / avg de poids, volume_m3, nombre) et de filtres. Elle est
+compilée en une seule requête SQL paramétrée :
+
+- sur ``dump_stats_partials`` (pré-agrégats) lorsque seules la date, la
+  déchetterie et la catégorie sont utilisées et que les mesures portent sur
+  ``poids`` ;
+- sinon sur ``raw_dump`` (filtres bruts dans une sous-requête, donc utilisables
+  par les index), jointe aux tables de dimension si nécessaire.
+
+Le nombre de lignes et la durée d'exécution sont bornés ; les résultats sont
+mis en cache par version des données.
+"""
+
+from time import perf_counter
+
+from services.cache import cached_for_version
+from services.db import get_dump_connection, init_dump_db
+from services.dump_raw_service import build_raw_filters, FILTER_COLUMNS
+
+
+# Dimension -> (expression on raw rows, expression on partials or None)
+DIMENSIONS = {
+    'day': ("r.date", "p.date"),
+    'week': ("date(r.date, 'weekday 0', '-6 days')", "date(p.date, 'weekday 0', '-6 days')"),
+    'month': ("substr(r.date, 1, 7)", "substr(p.date, 1, 7)"),
+    'dechetterie': ("dm.dechetterie", "p.dechetterie"),
+    'category': ("cm.category", "p.category"),
+    'flux': ("r.flux", None),
+    'orientation': ("r.orientation", None),
+    'origine': ("r.origine", None),
+    'secteur': ("r.secteur_collecte", None),
+    'tournee': ("r.tournee", None),
+}
+
+MEASURE_COLUMNS = ('poids', 'volume_m3', 'nombre')
+MEASURE_FUNCTIONS = ('sum', 'count', 'avg')
+
+# Filters on mapped values (exact, repeatable)
+MAPPED_FILTERS = {
+    'dechetterie': ("dm.dechetterie", "p.dechetterie"),
+    'category': ("cm.category", "p.category"),
+}
+
+DEFAULT_ROW_LIMIT = 1000
+MAX_ROW_LIMIT = 10000
+MAX_DIMENSIONS = 4
+QUERY_TIME_LIMIT = 10.0
+
+
+class QueryTimeout(Exception):
+    """Raised when an aggregation query exceeds QUERY_TIME_LIMIT."""
+
+
+def _split(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def _arg_list(args, key):
+    values = args.getlist(key) if hasattr(args, 'getlist') else args.get(key)
+    if values is None:
+        return []
+    if isinstance(values, str):
+        values = [values]
+    return [value for value in values if value]
+
+
+def parse_aggregate_request(args):
+    """
+    Validate and normalize aggregation parameters.
+
+    Args:
+        args: Request arguments:
+            dimensions: comma separated keys of DIMENSIONS (at most one date grain)
+            measures: comma separated ``count`` or ``<sum|count|avg>:<poids|volume_m3|nombre>``
+                (default ``sum:poids``)
+            order: output column, ``-`` prefix for descending (default: dimensions)
+            limit: maximum number of rows
+            dechetterie / category: mapped values (repeatable, exact)
+            plus the raw filters of /db/dump/raw (columns, match modes, q, date_from, date_to)
+
+    Returns:
+        dict spec (hashable values only), used as cache key
+
+    Raises:
+        ValueError: On unknown dimensions, measures, order or invalid limit
+    """
+    dimensions = _split(args.get('dimensions'))
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Dimensions inconnues: {', '.join(unknown)}")
+    if len(set(dimensions)) != len(dimensions):
+        raise ValueError("Dimension répétée")
+    if len(dimensions) > MAX_DIMENSIONS:
+        raise ValueError(f"{MAX_DIMENSIONS} dimensions au maximum")
+    if len([name for name in dimensions if name in ('day', 'week', 'month')]) > 1:
+        raise ValueError("Une seule granularité de date à la fois")
+
+    measures = []
+    for token in _split(args.get('measures')) or ['sum:poids']:
+        if token == 'count':
+            measures.append(('count', '*'))
+            continue
+        function, _, column = token.partition(':')
+        if function not in MEASURE_FUNCTIONS or column not in MEASURE_COLUMNS:
+            raise ValueError(f"Mesure invalide: {token}")
+        measures.append((function, column))
+    if len(set(measures)) != len(measures):
+        raise ValueError("Mesure répétée")
+
+    outputs = dimensions + [_measure_alias(measure) for measure in measures]
+    order = _split(args.get('order'))
+    for item in order:
+        if item.lstrip('-') not in outputs:
+            raise ValueError(f"Tri invalide: {item}")
+
+    try:
+        limit = int(args.get('limit') or DEFAULT_ROW_LIMIT)
+    except ValueError:
+        raise ValueError("limit doit être un entier")
+    if limit < 1:
+        raise ValueError("limit doit être positif")
+
+    raw_keys = ['q', 'match', 'date_from', 'date_to']
+    raw_keys += FILTER_COLUMNS + [f"{column}_match" for column in FILTER_COLUMNS]
+    raw_filters = tuple(
+        (key, tuple(_arg_list(args, key)))
+        for key in raw_keys
+        if _arg_list(args, key)
+    )
+    mapped_filters = tuple(
+        (key, tuple(_arg_list(args, key)))
+        for key in MAPPED_FILTERS
+        if _arg_list(args, key)
+    )
+
+    return {
+        'dimensions': tuple(dimensions),
+        'measures': tuple(measures),
+        'order': tuple(order),
+        'limit': min(limit, MAX_ROW_LIMIT),
+        'raw_filters': raw_filters,
+        'mapped_filters': mapped_filters
+    }
+
+
+def _measure_alias(measure):
+    function, column = measure
+    return 'count' if column == '*' else f"{function}_{column}"
+
+
+def _uses_partials(spec):
+    """Whether the request can be answered from dump_stats_partials."""
+    if any(DIMENSIONS[name][1] is None for name in spec['dimensions']):
+        return False
+    if any(column not in ('*', 'poids') for _, column in spec['measures']):
+        return False
+    return all(key in ('date_from', 'date_to') for key, _ in spec['raw_filters'])
+
+
+def _raw_filter_args(spec):
+    """Rebuild filter arguments for build_raw_filters (single values unwrapped)."""
+    args = {}
+    for key, values in spec['raw_filters']:
+        args[key] = list(values) if key in FILTER_COLUMNS else values[0]
+    return args
+
+
+def compile_aggregate_query(spec):
+    """
+    Compile a normalized spec into (sql, params, source).
+
+    ``source`` is 'partials' or 'raw'. One extra row is requested to detect
+    truncation.
+    """
+    partials = _uses_partials(spec)
+    index = 1 if partials else 0
+    select = [f"{DIMENSIONS[name][index]} AS {name}" for name in spec['dimensions']]
+    for measure in spec['measures']:
+        function, column = measure
+        alias = _measure_alias(measure)
+        if partials:
+            if column == '*' or function == 'count':
+                expr = "SUM(p.row_count)"
+            elif function == 'sum':
+                expr = "SUM(p.poids)"
+            else:
+                expr = "SUM(p.poids) / SUM(p.row_count)"
+        else:
+            expr = f"{function.upper()}(r.{column})" if column != '*' else "COUNT(*)"
+        select.append(f"{expr} AS {alias}")
+
+    where = []
+    params = []
+    if partials:
+        source_sql = "dump_stats_partials p"
+        raw_args = _raw_filter_args(spec)
+        if raw_args.get('date_from'):
+            where.append("p.date >= ?")
+            params.append(raw_args['date_from'])
+        if raw_args.get('date_to'):
+            where.append("p.date <= ?")
+            params.append(raw_args['date_to'])
+    else:
+        raw_where, raw_params = build_raw_filters(_raw_filter_args(spec))
+        source_sql = f"(SELECT * FROM raw_dump {raw_where}) r"
+        params.extend(raw_params)
+        mapped_keys = {key for key, _ in spec['mapped_filters']}
+        if 'dechetterie' in spec['dimensions'] or 'dechetterie' in mapped_keys:
+            source_sql += " JOIN dump_dechetterie_map dm ON dm.lieu_collecte = r.lieu_collecte"
+        if 'category' in spec['dimensions'] or 'category' in mapped_keys:
+            source_sql += """
+                JOIN dump_category_map cm
+                  ON cm.categorie = r.categorie
+                 AND cm.sous_categorie = COALESCE(r.sous_categorie, '')
+                 AND cm.flux = r.flux
+                 AND cm.orientation = COALESCE(r.orientation, '')"""
+
+    for key, values in spec['mapped_filters']:
+        column = MAPPED_FILTERS[key][index]
+        where.append(f"{column} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+
+    # Positional references: output names such as flux or orientation are also
+    # columns of the category map, hence ambiguous once it is joined
+    outputs = list(spec['dimensions']) + [_measure_alias(measure) for measure in spec['measures']]
+    where_clause = f"WHERE {' AND '.join(where)}" if where else ""
+    positions = [str(position) for position in range(1, len(spec['dimensions']) + 1)]
+    group_clause = f"GROUP BY {', '.join(positions)}" if positions else ""
+    if spec['order']:
+        order_items = [
+            f"{outputs.index(item.lstrip('-')) + 1} {'DESC' if item.startswith('-') else 'ASC'}"
+            for item in spec['order']
+        ]
+    else:
+        order_items = [f"{position} ASC" for position in positions]
+    order_clause = f"ORDER BY {', '.join(order_items)}" if order_items else ""
+
+    sql = f"""
+        SELECT {', '.join(select)}
+        FROM {source_sql}
+        {where_clause}
+        {group_clause}
+        {order_clause}
+        LIMIT ?
+    """
+    params.append(spec['limit'] + 1)
+    return sql, params, 'partials' if partials else 'raw'
+
+
+def _run_aggregate(year, spec):
+    sql, params, source = compile_aggregate_query(spec)
+    started = perf_counter()
+    deadline = started + QUERY_TIME_LIMIT
+
+    init_dump_db(year)
+    with get_dump_connection(year) as conn:
+        # Abort the statement once the time budget is spent
+        conn.set_progress_handler(lambda: 1 if perf_counter() > deadline else 0, 10000)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except Exception as exc:
+            if perf_counter() > deadline:
+                raise QueryTimeout(f"Requête interrompue après {QUERY_TIME_LIMIT:g} s") from exc
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    truncated = len(rows) > spec['limit']
+    rows = rows[:spec['limit']]
+    columns = list(spec['dimensions']) + [_measure_alias(measure) for measure in spec['measures']]
+    return {
+        'dimensions': list(spec['dimensions']),
+        'measures': [_measure_alias(measure) for measure in spec['measures']],
+        'rows': [dict(zip(columns, tuple(row))) for row in rows],
+        'row_count': len(rows),
+        'truncated': truncated,
+        'source': source,
+        'elapsed_ms': round((perf_counter() - started) * 1000, 2)
+    }
+
+
+def get_aggregate(year, args):
+    """
+    Run a generic aggregation (cached per data version).
+
+    Raises:
+        ValueError: On invalid parameters
+        QueryTimeout: When the query exceeds QUERY_TIME_LIMIT
+    """
+    spec = parse_aggregate_request(args)
+    return cached_for_version('aggregate', year, lambda: _run_aggregate(year, spec), spec)
@@ -0,0 +1,509 @@
+"""
+Consultation paginée des lignes brutes de la base dump.
+
+Deux modes de pagination coexistent :
+- ``offset`` (historique) : ``LIMIT ? OFFSET ?``, dont le coût croît avec la
+  profondeur de la page ;
+- curseur (keyset) : ``after`` / ``before`` contiennent un curseur opaque
+  encodant (valeur de tri, id) de la dernière / première ligne vue. La page
+  suivante est lue par un seek ``(col, id) > (?, ?)`` sur l'index de la
+  colonne de tri (qui contient implicitement le rowid ``id``).
+
+Chaque filtre de colonne a un mode de correspondance (``<colonne>_match`` ou
+``match`` global) : ``exact`` (``=`` / ``IN``) et ``prefix`` (intervalle
+``>= v AND < v'``) utilisent les index ; ``contains`` (``LIKE '%v%'``,
+historique et par défaut) impose un parcours complet. Un filtre peut être
+répété pour accepter plusieurs valeurs.
+
+Le paramètre ``fields`` restreint les colonnes lues et renvoyées (liste
+blanche ``RAW_COLUMNS``) ; une vue étroite triée par date
+(date, lieu_collecte, categorie, flux, poids) est couverte par l'index
+``idx_dump_narrow`` et ne lit pas la table.
+
+L'export (CSV / NDJSON) parcourt les mêmes filtres par lots ``fetchmany`` et
+produit le fichier par morceaux, sans jamais charger le résultat complet.
+
+Les options de filtre (facettes) sont calculées en un seul ``GROUP BY`` sur
+les colonnes filtrables, mis en cache par version des données ; chaque facette
+est ensuite agrégée en mémoire en appliquant tous les filtres actifs sauf le
+sien. Seuls les filtres de dates imposent de repasser par SQL.
+"""
+
+import base64
+import csv
+import io
+import json
+import string
+
+from services.cache import cached_for_version
+from services.db import get_dump_connection
+
+
+RAW_COLUMNS = [
+    'id', 'date', 'date_raw', 'heure', 'lieu_collecte', 'categorie', 'sous_categorie',
+    'flux', 'orientation', 'origine', 'secteur_collecte', 'compte', 'nombre', 'poids',
+    'volume_m3', 'site', 'pole', 'tournee', 'source_file', 'source_sheet'
+]
+
+FILTER_COLUMNS = [
+    'lieu_collecte', 'categorie', 'sous_categorie', 'flux', 'orientation',
+    'origine', 'secteur_collecte', 'source_file', 'source_sheet'
+]
+
+# Sort key -> column, each backed by an index on that column (see init_dump_db)
+SORT_COLUMNS = {
+    'date': 'date',
+    'poids': 'poids',
+    'lieu_collecte': 'lieu_collecte',
+    'categorie': 'categorie'
+}
+
+MATCH_MODES = ('exact', 'prefix', 'contains')
+DEFAULT_MATCH = 'contains'
+
+DEFAULT_SORT = 'date'
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8'
+}
+EXPORT_BATCH_SIZE = 2000
+
+
+def _arg_values(args, key):
+    """Non-empty values of a (possibly repeated) argument."""
+    values = args.getlist(key) if hasattr(args, 'getlist') else args.get(key)
+    if values is None:
+        return []
+    if isinstance(values, str):
+        values = [values]
+    return [value for value in values if value]
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix (binary collation)."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _column_filter(column, values, mode):
+    """Build the predicate and parameters of one column filter."""
+    if mode == 'exact':
+        if len(values) == 1:
+            return f"{column} = ?", values
+        return f"{column} IN ({', '.join('?' * len(values))})", values
+    if mode == 'prefix':
+        clauses = [f"({column} >= ? AND {column} < ?)" for _ in values]
+        params = [bound for value in values for bound in (value, _prefix_upper_bound(value))]
+    else:
+        clauses = [f"{column} LIKE ?" for _ in values]
+        params = [f"%{value}%" for value in values]
+    clause = clauses[0] if len(clauses) == 1 else "(" + " OR ".join(clauses) + ")"
+    return clause, params
+
+
+def build_raw_filters(args):
+    """
+    Build the WHERE clause for raw data filters.
+
+    Args:
+        args: Request arguments: q, one (repeatable) entry per FILTER_COLUMNS
+            with an optional ``<column>_match`` mode, ``match`` (default mode
+            for all columns), date_from, date_to
+
+    Returns:
+        (where_clause, params): clause starting with ``WHERE`` (or empty) and its parameters
+
+    Raises:
+        ValueError: On an unknown match mode
+    """
+    filters = []
+    params = []
+
+    query = args.get('q')
+    if query:
+        like = f"%{query}%"
+        filters.append("(" + " OR ".join(f"{column} LIKE ?" for column in FILTER_COLUMNS) + ")")
+        params.extend([like] * len(FILTER_COLUMNS))
+
+    default_mode = (args.get('match') or DEFAULT_MATCH).lower()
+    for key in FILTER_COLUMNS:
+        values = _arg_values(args, key)
+        if not values:
+            continue
+        mode = (args.get(f"{key}_match") or default_mode).lower()
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Mode de correspondance invalide pour {key}: {mode}")
+        clause, clause_params = _column_filter(key, values, mode)
+        filters.append(clause)
+        params.extend(clause_params)
+
+    date_from = args.get('date_from')
+    date_to = args.get('date_to')
+    if date_from:
+        filters.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        filters.append("date <= ?")
+        params.append(date_to)
+
+    where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
+    return where_clause, params
+
+
+def encode_cursor(sort, order, value, row_id):
+    """Encode an opaque pagination cursor for a row."""
+    payload = json.dumps([sort, order, value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort, order):
+    """
+    Decode a pagination cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed or was built for another sort/order
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, cursor_order, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Curseur invalide")
+    if cursor_sort != sort or cursor_order != order or not isinstance(row_id, int):
+        raise ValueError("Curseur incompatible avec le tri demandé")
+    return value, row_id
+
+
+def parse_fields(value):
+    """
+    Parse the ``fields`` parameter (comma separated) against RAW_COLUMNS.
+
+    Returns:
+        List of columns in RAW_COLUMNS order (all columns when empty)
+
+    Raises:
+        ValueError: On an unknown column
+    """
+    if not value:
+        return list(RAW_COLUMNS)
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(RAW_COLUMNS)
+    if unknown:
+        raise ValueError(f"Champs inconnus: {', '.join(sorted(unknown))}")
+    return [column for column in RAW_COLUMNS if column in requested]
+
+
+def _row_cursor(row, sort, order):
+    return encode_cursor(sort, order, row[SORT_COLUMNS[sort]], row['id'])
+
+
+def get_raw_page(year, args, limit=DEFAULT_LIMIT, offset=None, after=None, before=None,
+                 sort=DEFAULT_SORT, order='asc', with_total=True, fields=None):
+    """
+    Get one page of raw rows.
+
+    Args:
+        year: Year of the dump database
+        args: Filter arguments (see build_raw_filters)
+        limit: Page size (clamped to [1, MAX_LIMIT])
+        offset: Offset mode when set (ignored if a cursor is given)
+        after: Cursor of the last row of the previous page
+        before: Cursor of the first row of the next page (backward paging)
+        sort: One of SORT_COLUMNS
+        order: 'asc' or 'desc'
+        with_total: Also count matching rows (full filtered count)
+        fields: Columns returned for each item (see parse_fields); ``id`` is
+            always included
+
+    Returns:
+        dict with items, limit, sort, order, next_cursor, prev_cursor and,
+        depending on the mode, offset / total
+
+    Raises:
+        ValueError: On invalid sort, order, cursor or match mode
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Tri invalide: {sort}")
+    if order not in ('asc', 'desc'):
+        raise ValueError(f"Ordre invalide: {order}")
+    if after and before:
+        raise ValueError("after et before sont exclusifs")
+
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    column = SORT_COLUMNS[sort]
+    fields = list(fields or RAW_COLUMNS)
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    # The sort column is needed for cursors, even when it is not returned
+    selected = fields if column in fields else fields + [column]
+    where_clause, params = build_raw_filters(args)
+    keyset = after or before
+    # Backward pages are read in reverse order, then flipped
+    backward = bool(before)
+    descending = (order == 'desc') != backward
+    direction = 'DESC' if descending else 'ASC'
+
+    page_params = list(params)
+    if keyset:
+        value, row_id = decode_cursor(keyset, sort, order)
+        seek = f"({column}, id) {'<' if descending else '>'} (?, ?)"
+        where_clause = f"{where_clause} AND {seek}" if where_clause else f"WHERE {seek}"
+        page_params.extend([value, row_id])
+
+    sql = f"""
+        SELECT {', '.join(selected)}
+        FROM raw_dump
+        {where_clause}
+        ORDER BY {column} {direction}, id {direction}
+        LIMIT ?
+    """
+    if keyset or offset is None:
+        page_params.append(limit + 1)
+    else:
+        offset = max(0, int(offset))
+        sql += " OFFSET ?"
+        page_params.extend([limit + 1, offset])
+
+    with get_dump_connection(year) as conn:
+        cursor = conn.cursor()
+        rows = cursor.execute(sql, page_params).fetchall()
+        total = None
+        if with_total:
+            base_where, base_params = build_raw_filters(args)
+            total_row = cursor.execute(
+                f"SELECT COUNT(*) AS count FROM raw_dump {base_where}",
+                base_params
+            ).fetchone()
+            total = total_row['count'] if total_row else 0
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+
+    if backward:
+        has_next, has_prev = True, has_more
+    elif keyset:
+        has_next, has_prev = has_more, True
+    elif offset is not None:
+        has_next, has_prev = has_more, offset > 0
+    else:
+        has_next, has_prev = has_more, False
+
+    result = {
+        'items': [{field: row[field] for field in fields} for row in rows],
+        'limit': limit,
+        'sort': sort,
+        'order': order,
+        'next_cursor': _row_cursor(rows[-1], sort, order) if rows and has_next else None,
+        'prev_cursor': _row_cursor(rows[0], sort, order) if rows and has_prev else None
+    }
+    if offset is not None and not keyset:
+        result['offset'] = offset
+    if total is not None:
+        result['total'] = total
+    return result
+
+
+def iter_raw_export(year, args, fmt='csv', sort=DEFAULT_SORT, order='asc', batch_size=EXPORT_BATCH_SIZE,
+                    fields=None):
+    """
+    Stream filtered raw rows as CSV or NDJSON text chunks.
+
+    Filters and sort are validated before the first chunk is produced, so
+    errors can still be reported as a regular response. The connection is
+    held by the generator and closed when it is exhausted or discarded.
+
+    Args:
+        year: Year of the dump database
+        args: Filter arguments (see build_raw_filters)
+        fmt: One of EXPORT_FORMATS
+        sort: One of SORT_COLUMNS
+        order: 'asc' or 'desc'
+        batch_size: Rows fetched per batch (one chunk per batch)
+        fields: Exported columns (see parse_fields), all by default
+
+    Raises:
+        ValueError: On invalid format, sort, order or filters
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format invalide: {fmt}")
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Tri invalide: {sort}")
+    if order not in ('asc', 'desc'):
+        raise ValueError(f"Ordre invalide: {order}")
+
+    column = SORT_COLUMNS[sort]
+    direction = order.upper()
+    fields = list(fields or RAW_COLUMNS)
+    where_clause, params = build_raw_filters(args)
+    sql = f"""
+        SELECT {', '.join(fields)}
+        FROM raw_dump
+        {where_clause}
+        ORDER BY {column} {direction}, id {direction}
+    """
+
+    def generate():
+        conn = get_dump_connection(year)
+        try:
+            cursor = conn.execute(sql, params)
+            if fmt == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(fields)
+                yield buffer.getvalue()
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if fmt == 'csv':
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    writer.writerows(tuple(row) for row in rows)
+                    yield buffer.getvalue()
+                else:
+                    yield ''.join(json.dumps(dict(row), ensure_ascii=False) + '\n' for row in rows)
+        finally:
+            conn.close()
+
+    return generate()
+
+
+def _filter_params(args):
+    """Normalized filter arguments (used as cache key)."""
+    keys = ['q', 'match', 'date_from', 'date_to']
+    keys += FILTER_COLUMNS + [f"{column}_match" for column in FILTER_COLUMNS]
+    params = {}
+    for key in keys:
+        values = _arg_values(args, key)
+        if values:
+            params[key] = tuple(values) if key in FILTER_COLUMNS else values[0]
+    return params
+
+
+def _load_option_groups(year):
+    """Row count and total poids per combination of filterable values (one scan)."""
+    import pandas as pd
+
+    columns = ', '.join(FILTER_COLUMNS)
+    with get_dump_connection(year) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {columns}, COUNT(*) AS count, SUM(poids) AS poids
+            FROM raw_dump
+            GROUP BY {columns}
+            """
+        ).fetchall()
+    return pd.DataFrame([tuple(row) for row in rows], columns=FILTER_COLUMNS + ['count', 'poids'])
+
+
+# SQLite's LIKE only folds ASCII letters ('É' LIKE 'é' is false)
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _like_contains(series, value):
+    """Pandas equivalent of ``column LIKE '%value%'``, with the same case folding."""
+    return series.str.translate(_ASCII_LOWER).str.contains(value.translate(_ASCII_LOWER), regex=False)
+
+
+def _frame_mask(groups, params, exclude=None):
+    """Boolean mask of the option groups matching the filters (except one column)."""
+    import pandas as pd
+
+    mask = pd.Series(True, index=groups.index)
+    query = params.get('q')
+    if query:
+        text_match = pd.Series(False, index=groups.index)
+        for column in FILTER_COLUMNS:
+            text_match |= _like_contains(groups[column].fillna(''), query)
+        mask &= text_match
+
+    default_mode = params.get('match', DEFAULT_MATCH).lower()
+    for column in FILTER_COLUMNS:
+        values = params.get(column)
+        if not values or column == exclude:
+            continue
+        mode = params.get(f"{column}_match", default_mode).lower()
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Mode de correspondance invalide pour {column}: {mode}")
+        series = groups[column].fillna('')
+        if mode == 'exact':
+            mask &= series.isin(values)
+        elif mode == 'prefix':
+            mask &= series.str.startswith(tuple(values))
+        else:
+            column_match = pd.Series(False, index=groups.index)
+            for value in values:
+                column_match |= _like_contains(series, value)
+            mask &= column_match
+    return mask
+
+
+def _facet_entries(totals):
+    """Format (value, count, poids) rows as facet entries sorted by value."""
+    entries = [
+        {'value': value, 'count': int(count), 'poids': round(float(poids or 0), 2)}
+        for value, count, poids in totals
+        if value not in (None, '')
+    ]
+    return sorted(entries, key=lambda entry: entry['value'])
+
+
+def _facets_from_groups(year, params):
+    groups = cached_for_version('raw_option_groups', year, lambda: _load_option_groups(year))
+    facets = {}
+    for column in FILTER_COLUMNS:
+        subset = groups[_frame_mask(groups, params, exclude=column)]
+        totals = subset.groupby(column, dropna=True)[['count', 'poids']].sum()
+        facets[column] = _facet_entries(
+            (value, row['count'], row['poids']) for value, row in totals.iterrows()
+        )
+    return facets
+
+
+def _facets_from_sql(year, params):
+    facets = {}
+    with get_dump_connection(year) as conn:
+        for column in FILTER_COLUMNS:
+            facet_params = {key: value for key, value in params.items() if key != column}
+            where_clause, where_params = build_raw_filters(facet_params)
+            rows = conn.execute(
+                f"""
+                SELECT {column} AS value, COUNT(*) AS count, SUM(poids) AS poids
+                FROM raw_dump
+                {where_clause}
+                GROUP BY {column}
+                """,
+                where_params
+            ).fetchall()
+            facets[column] = _facet_entries(tuple(row) for row in rows)
+    return facets
+
+
+def get_raw_options(year, args=None):
+    """
+    Get filter options with row count and total poids per value.
+
+    Each facet is relative to the applied filters, ignoring the facet's own
+    filter (so the other values of a filtered column stay selectable).
+
+    Args:
+        year: Year of the dump database
+        args: Filter arguments (see build_raw_filters), optional
+
+    Returns:
+        dict column -> list of {value, count, poids}, sorted by value
+
+    Raises:
+        ValueError: On an unknown match mode
+    """
+    params = _filter_params(args or {})
+
+    def compute():
+        if params.get('date_from') or params.get('date_to'):
+            return _facets_from_sql(year, params)
+        return _facets_from_groups(year, params)
+
+    return cached_for_version('raw_options', year, compute, params)
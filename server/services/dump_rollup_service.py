@@ -0,0 +1,190 @@
+"""
+Pré-agrégats (rollups) de la base dump.
+
+Maintient dans chaque base annuelle :
+- ``dump_dechetterie_map`` / ``dump_category_map`` : tables de dimension
+  dérivées de ``mappings.py`` (valeur brute -> valeur mappée) ;
+- ``dump_stats_partials`` : poids agrégés par (file_id, date, déchetterie,
+  catégorie mappée).
+
+Un import n'ajoute que la contribution du nouveau fichier, une réimportation
+ou une suppression retire celle de l'ancien. Une reconstruction complète n'a
+lieu que lorsque ``mappings.py`` change (empreinte stockée dans ``dump_meta``).
+
+Les rollups ne sont écrits qu'à l'import et au démarrage (``ensure_all_rollups``,
+appelé par ``create_app`` dans le processus maître gunicorn) : les lectures ne
+les modifient jamais, ce qui évite que plusieurs workers se disputent une
+reconstruction pendant des requêtes.
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+import sys
+
+from services.db import get_dump_connection, init_dump_db, get_dump_available_years
+
+current_file = Path(__file__).resolve()
+project_root = current_file.parent.parent.parent
+scripts_dir = project_root / 'scripts'
+if scripts_dir.exists() and str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+import mappings
+from mappings import map_category_to_collectes, map_dechetterie
+
+
+MAPPING_FINGERPRINT_KEY = 'mapping_fingerprint'
+
+logger = logging.getLogger(__name__)
+
+_mapping_fingerprint = None
+
+
+def get_mapping_fingerprint():
+    """Fingerprint of mappings.py, used to detect mapping rule changes."""
+    global _mapping_fingerprint
+    if _mapping_fingerprint is None:
+        source = Path(mappings.__file__).read_bytes()
+        _mapping_fingerprint = hashlib.sha256(source).hexdigest()[:16]
+    return _mapping_fingerprint
+
+
+def _sync_dimension_maps(cursor, file_id=None):
+    """Add raw values not yet present in the dimension tables."""
+    file_filter = "AND r.file_id = ?" if file_id is not None else ""
+    params = (file_id,) if file_id is not None else ()
+
+    lieux = cursor.execute(
+        f"""
+        SELECT DISTINCT r.lieu_collecte
+        FROM raw_dump r
+        LEFT JOIN dump_dechetterie_map m ON m.lieu_collecte = r.lieu_collecte
+        WHERE m.lieu_collecte IS NULL {file_filter}
+        """,
+        params
+    ).fetchall()
+    cursor.executemany(
+        "INSERT OR REPLACE INTO dump_dechetterie_map (lieu_collecte, dechetterie) VALUES (?, ?)",
+        [(row[0], map_dechetterie(row[0])) for row in lieux]
+    )
+
+    combos = cursor.execute(
+        f"""
+        SELECT DISTINCT r.categorie,
+               COALESCE(r.sous_categorie, '') AS sous_categorie,
+               r.flux,
+               COALESCE(r.orientation, '') AS orientation
+        FROM raw_dump r
+        LEFT JOIN dump_category_map m
+          ON m.categorie = r.categorie
+         AND m.sous_categorie = COALESCE(r.sous_categorie, '')
+         AND m.flux = r.flux
+         AND m.orientation = COALESCE(r.orientation, '')
+        WHERE m.category IS NULL {file_filter}
+        """,
+        params
+    ).fetchall()
+    cursor.executemany(
+        """
+        INSERT OR REPLACE INTO dump_category_map (categorie, sous_categorie, flux, orientation, category)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                row[0], row[1], row[2], row[3],
+                map_category_to_collectes(row[0], row[1] or None, row[2], row[3] or None) or 'AUTRES'
+            )
+            for row in combos
+        ]
+    )
+
+
+def fold_file_partials(conn, file_id):
+    """Fold the contribution of one imported file into the partial aggregates."""
+    cursor = conn.cursor()
+    _sync_dimension_maps(cursor, file_id)
+    cursor.execute("DELETE FROM dump_stats_partials WHERE file_id = ?", (file_id,))
+    cursor.execute(
+        """
+        INSERT INTO dump_stats_partials (file_id, date, dechetterie, category, poids, row_count)
+        SELECT r.file_id, r.date, dm.dechetterie, cm.category, SUM(r.poids), COUNT(*)
+        FROM raw_dump r
+        JOIN dump_dechetterie_map dm ON dm.lieu_collecte = r.lieu_collecte
+        JOIN dump_category_map cm
+          ON cm.categorie = r.categorie
+         AND cm.sous_categorie = COALESCE(r.sous_categorie, '')
+         AND cm.flux = r.flux
+         AND cm.orientation = COALESCE(r.orientation, '')
+        WHERE r.file_id = ?
+        GROUP BY r.file_id, r.date, dm.dechetterie, cm.category
+        """,
+        (file_id,)
+    )
+
+
+def remove_file_partials(conn, file_id):
+    """Subtract the contribution of one imported file from the partial aggregates."""
+    conn.execute("DELETE FROM dump_stats_partials WHERE file_id = ?", (file_id,))
+
+
+def rebuild_rollups(conn):
+    """Rebuild dimension tables and partial aggregates from scratch."""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM dump_stats_partials")
+    cursor.execute("DELETE FROM dump_dechetterie_map")
+    cursor.execute("DELETE FROM dump_category_map")
+    file_ids = [row[0] for row in cursor.execute("SELECT id FROM import_dump_files ORDER BY id").fetchall()]
+    for file_id in file_ids:
+        fold_file_partials(conn, file_id)
+    cursor.execute(
+        "INSERT OR REPLACE INTO dump_meta (key, value) VALUES (?, ?)",
+        (MAPPING_FINGERPRINT_KEY, get_mapping_fingerprint())
+    )
+
+
+def ensure_rollups(conn):
+    """
+    Make sure rollups are up to date for an open connection.
+
+    Rebuilds everything when the mapping rules changed, otherwise only folds
+    files that have no partial aggregates yet (e.g. databases created before
+    rollups existed).
+    """
+    cursor = conn.cursor()
+    row = cursor.execute(
+        "SELECT value FROM dump_meta WHERE key = ?",
+        (MAPPING_FINGERPRINT_KEY,)
+    ).fetchone()
+    if not row or row[0] != get_mapping_fingerprint():
+        rebuild_rollups(conn)
+        conn.commit()
+        return
+
+    pending = cursor.execute(
+        """
+        SELECT f.id
+        FROM import_dump_files f
+        WHERE NOT EXISTS (SELECT 1 FROM dump_stats_partials p WHERE p.file_id = f.id)
+          AND EXISTS (SELECT 1 FROM raw_dump r WHERE r.file_id = f.id)
+        """
+    ).fetchall()
+    if pending:
+        for pending_row in pending:
+            fold_file_partials(conn, pending_row[0])
+        conn.commit()
+
+
+def ensure_year_rollups(year=2025):
+    """Make sure rollups are up to date for a given year."""
+    init_dump_db(year)
+    with get_dump_connection(year) as conn:
+        ensure_rollups(conn)
+
+
+def ensure_all_rollups():
+    """Bring the rollups of every year up to date (startup; failures are only logged)."""
+    for year in get_dump_available_years():
+        try:
+            ensure_year_rollups(year)
+        except Exception as exc:
+            logger.warning(f"[ROLLUPS] Mise à jour des pré-agrégats {year} en échec: {exc}")
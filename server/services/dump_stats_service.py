@@ -2,60 +2,142 @@
 Service de statistiques pour la base de données dump.
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
 import sys
+from time import perf_counter
 
-import pandas as pd
-
-from services.db import get_dump_connection, init_dump_db
+from services.db import get_dump_connection, init_dump_db, get_dump_available_years
+from services.cache import cached_for_version
+from services.query_executor import run_queries
 
 current_file = Path(__file__).resolve()
 project_root = current_file.parent.parent.parent
 scripts_dir = project_root / 'scripts'
 if scripts_dir.exists() and str(scripts_dir) not in sys.path:
     sys.path.insert(0, str(scripts_dir))
-from mappings import DECHETTERIE_MAPPING, map_category_to_collectes, map_dechetterie, CATEGORY_COLUMNS, FINAL_FLUXES
+from mappings import (
+    STANDARD_DECHETTERIES, CATEGORY_COLUMNS, FINAL_FLUXES, get_closed_weekdays
+)
 
 
-def _resolve_dechetterie_name(row):
-    """Resolve déchetterie name from row data."""
-    lieu = str(row.get('lieu_collecte') or '').strip()
-    sheet = str(row.get('source_sheet') or '').strip()
+def _order_dechetteries(names):
+    """Order déchetteries: standard ones first, then the others alphabetically."""
+    unique = sorted(set(str(name) for name in names if name is not None))
+    special_cases = [d for d in unique if d not in STANDARD_DECHETTERIES]
+    return [d for d in STANDARD_DECHETTERIES if d in unique] + sorted(special_cases)
 
-    if sheet and 'BYM' in sheet.upper():
-        return 'BYM'
 
-    if lieu.upper() == 'APPORT VOLONTAIRE':
-        return 'Pépinière'
+def _compute_stats_diagnostics(year):
+    """Compute mapping diagnostics from the raw data (one grouped scan per dimension)."""
+    init_dump_db(year)
+    results, _ = run_queries(year, {
+        'locations': (
+            """
+            SELECT r.lieu_collecte, m.dechetterie, COUNT(*) AS nb_lignes, SUM(r.poids) AS poids
+            FROM raw_dump r
+            LEFT JOIN dump_dechetterie_map m ON m.lieu_collecte = r.lieu_collecte
+            GROUP BY r.lieu_collecte
+            ORDER BY poids DESC
+            """,
+            ()
+        ),
+        'combos': (
+            """
+            SELECT r.categorie, r.sous_categorie, r.flux, r.orientation, m.category,
+                   COUNT(*) AS nb_lignes, SUM(r.poids) AS poids
+            FROM raw_dump r
+            JOIN dump_category_map m
+              ON m.categorie = r.categorie
+             AND m.sous_categorie = COALESCE(r.sous_categorie, '')
+             AND m.flux = r.flux
+             AND m.orientation = COALESCE(r.orientation, '')
+            GROUP BY r.categorie, r.sous_categorie, r.flux, r.orientation
+            ORDER BY poids DESC
+            """,
+            ()
+        )
+    })
+    location_rows = results['locations']
+    combo_rows = results['combos']
+
+    locations = [
+        {
+            'lieu_collecte': row['lieu_collecte'],
+            'dechetterie': row['dechetterie'],
+            'nb_lignes': row['nb_lignes'],
+            'poids_tonnes': round((row['poids'] or 0) / 1000, 3)
+        }
+        for row in location_rows
+    ]
+
+    totals_by_category = {}
+    autres_combinations = []
+    total_ultimes_brut = 0
+    for row in combo_rows:
+        poids = row['poids'] or 0
+        totals_by_category[row['category']] = totals_by_category.get(row['category'], 0) + poids
+        if row['category'] == 'AUTRES':
+            autres_combinations.append({
+                'categorie': row['categorie'],
+                'sous_categorie': row['sous_categorie'],
+                'flux': row['flux'],
+                'orientation': row['orientation'],
+                'poids_tonnes': round(poids / 1000, 3),
+                'nb_lignes': row['nb_lignes']
+            })
+        categorie = str(row['categorie'] or '').upper().strip()
+        orientation = str(row['orientation'] or '').upper().strip()
+        if categorie == 'EVACUATION DECHETS' and orientation == 'DECHETS ULTIMES':
+            total_ultimes_brut += poids
+
+    total_brut = sum(totals_by_category.values())
+    return {
+        'locations': locations,
+        'dechetteries': _order_dechetteries(row['dechetterie'] for row in locations),
+        'autres_combinations': autres_combinations,
+        'totals': {
+            'total_brut_tonnes': round(total_brut / 1000, 2),
+            'total_autres_tonnes': round(totals_by_category.get('AUTRES', 0) / 1000, 2),
+            'total_dechets_ultimes_brut_tonnes': round(total_ultimes_brut / 1000, 2),
+            'nb_lignes': sum(row['nb_lignes'] for row in locations),
+            'by_category_tonnes': {
+                category: round(total / 1000, 2)
+                for category, total in sorted(totals_by_category.items(), key=lambda x: x[1], reverse=True)
+            }
+        }
+    }
+
 
-    mapped = DECHETTERIE_MAPPING.get(lieu)
-    if mapped:
-        return mapped
-    return None
+def get_stats_diagnostics(year=2025):
+    """Get mapping diagnostics for the stats (cached per data version)."""
+    return cached_for_version('stats_diagnostics', year, lambda: _compute_stats_diagnostics(year))
 
 
 def build_stats_from_dump_db(year=2025):
-    """Build statistics from dump database, using the same format as build_stats_from_db."""
+    """
+    Build statistics from dump database, using the same format as build_stats_from_db.
+
+    Reads the per-file partial aggregates maintained by dump_rollup_service, so
+    the cost depends on the number of (date, déchetterie, catégorie) groups and
+    not on the number of raw rows. Mapping diagnostics are served separately by
+    get_stats_diagnostics.
+    """
     import logging
+    import pandas as pd
     logger = logging.getLogger(__name__)
     
     try:
-        # map_category_to_collectes is already imported at module level
-        
         init_dump_db(year)
         with get_dump_connection(year) as conn:
             df = pd.read_sql(
                 """
-                SELECT date, lieu_collecte, categorie, sous_categorie, flux, orientation, poids, source_sheet
-                FROM raw_dump
+                SELECT date, dechetterie, category, SUM(poids) AS poids
+                FROM dump_stats_partials
+                GROUP BY date, dechetterie, category
                 """,
                 conn
             )
-        
-        # Total brut depuis la base de données
-        total_brut_db = df['poids'].sum() / 1000  # en tonnes
-        logger.info(f"[DUMP STATS] Total brut depuis DB: {total_brut_db:.2f} tonnes ({len(df)} lignes)")
 
         if df.empty:
             return {
@@ -67,9 +149,10 @@ def build_stats_from_dump_db(year=2025):
         df['Date'] = pd.to_datetime(df['date'], errors='coerce')
         total_avant_filtre_date = df['poids'].sum() / 1000
         df = df[df['Date'].notna()].copy()
-        total_apres_filtre_date = df['poids'].sum() / 1000 if not df.empty else 0
-        total_exclu_date = total_avant_filtre_date - total_apres_filtre_date
-        logger.info(f"[DUMP STATS] Total exclu par dates invalides: {total_exclu_date:.2f} tonnes")
+        total_exclu_date = total_avant_filtre_date - (df['poids'].sum() / 1000 if not df.empty else 0)
+        logger.info(f"[DUMP STATS] Total brut depuis DB: {total_avant_filtre_date:.2f} tonnes")
+        if total_exclu_date > 0:
+            logger.info(f"[DUMP STATS] Total exclu par dates invalides: {total_exclu_date:.2f} tonnes")
         if df.empty:
             return {
                 'success': False,
@@ -77,215 +160,46 @@ def build_stats_from_dump_db(year=2025):
                 'error': "Aucune date valide dans les données brutes."
             }
 
-        df['Dechetterie'] = df['lieu_collecte'].apply(map_dechetterie)
-        # Log unique locations and mappings for debugging
-        unique_locations = df['lieu_collecte'].unique()
-        logger.info(f"[DUMP STATS] Unique locations in raw data: {list(unique_locations)}")
-        unique_dechetteries_mapped = df['Dechetterie'].unique()
-        logger.info(f"[DUMP STATS] Unique déchetteries after mapping: {list(unique_dechetteries_mapped)}")
-        # Fallback: if still unmapped, use original lieu_collecte
-        # Attribuer les lieux de collecte vides à Pépinière
-        empty_mask = df['lieu_collecte'].isna() | (df['lieu_collecte'].astype(str).str.strip() == '')
-        df.loc[empty_mask, 'Dechetterie'] = 'Pépinière'
-        # Attribuer "APPORT VOLONTAIRE" et "APPORT SUR SITE" à Pépinière
-        apport_mask = (
-            df['lieu_collecte'].astype(str).str.upper().eq('APPORT VOLONTAIRE') |
-            df['lieu_collecte'].astype(str).str.upper().eq('APPORT SUR SITE')
-        )
-        df.loc[apport_mask, 'Dechetterie'] = 'Pépinière'
-        # Attribuer toutes les lignes sans déchetterie (NaN ou chaîne "nan") à Pépinière
-        nan_mask = (
-            df['Dechetterie'].isna() |
-            (df['Dechetterie'].astype(str).str.upper().str.strip().eq('NAN')) |
-            (df['Dechetterie'].astype(str).str.upper().str.strip().eq(''))
-        )
-        df.loc[nan_mask, 'Dechetterie'] = 'Pépinière'
-        
-        # Log unique déchetteries after mapping
-        logger.info(f"[DUMP STATS] Total avant filtrage des données: {df['poids'].sum() / 1000:.2f} tonnes")
-
-        df['DateKey'] = df['Date'].dt.strftime('%Y-%m-%d')
-        total_avant_filtre_datekey = df['poids'].sum() / 1000
-        df = df[df['DateKey'].notna()].copy()
-        total_apres_filtre_datekey = df['poids'].sum() / 1000 if not df.empty else 0
-        total_exclu_datekey = total_avant_filtre_datekey - total_apres_filtre_datekey
-        if total_exclu_datekey > 0:
-            logger.info(f"[DUMP STATS] Total exclu par DateKey invalide: {total_exclu_datekey:.2f} tonnes")
-
         date_start = df['Date'].min()
         date_end = df['Date'].max()
-        if pd.isna(date_start) or pd.isna(date_end):
-            return {
-                'success': False,
-                'stats': None,
-                'error': "Impossible de déterminer la plage de dates."
-            }
-
         full_range = pd.date_range(date_start, date_end, freq='D')
         date_order = [d.strftime('%Y-%m-%d') for d in full_range]
+        df['DateKey'] = df['Date'].dt.strftime('%Y-%m-%d')
 
-        # Calculer le total brut avant filtrage pour diagnostic
-        total_brut_avant_filtrage = df['poids'].sum() / 1000  # en tonnes
-        
         # Catégories standard (récupérées depuis mappings.py)
         category_columns = CATEGORY_COLUMNS.copy() if CATEGORY_COLUMNS else []
         final_fluxes = FINAL_FLUXES.copy() if FINAL_FLUXES else ['DECHETS ULTIMES']
+        value_columns = category_columns + [flux for flux in final_fluxes if flux not in category_columns]
 
-        if map_category_to_collectes is None:
-            return {
-                'success': False,
-                'stats': None,
-                'error': "Mapping des catégories indisponible."
-            }
+        total_brut_avant_filtrage = df['poids'].sum() / 1000  # en tonnes
+        total_autres = df.loc[df['category'] == 'AUTRES', 'poids'].sum() / 1000
 
-        # Mapper les catégories vers les grandes catégories de flux
-        df['MappedCategory'] = df.apply(
-            lambda row: map_category_to_collectes(
-                row['categorie'],
-                row['sous_categorie'],
-                row['flux'],
-                row['orientation']
-            ),
-            axis=1
-        )
-        
-        # Identifier les données non mappées (qui iront dans AUTRES)
-        non_mappees = df[df['MappedCategory'].isna()].copy()
-        if not non_mappees.empty:
-            logger.info(f"[DUMP STATS] {len(non_mappees)} lignes non mappées (iront dans AUTRES)")
-            # Analyser les combinaisons non mappées
-            autres_combinations = non_mappees.groupby(['categorie', 'sous_categorie', 'flux', 'orientation']).agg({
-                'poids': ['sum', 'count']
-            }).reset_index()
-            autres_combinations.columns = ['categorie', 'sous_categorie', 'flux', 'orientation', 'poids_total', 'nb_lignes']
-            autres_combinations['poids_tonnes'] = autres_combinations['poids_total'] / 1000
-            autres_combinations = autres_combinations.sort_values('poids_tonnes', ascending=False)
-            total_autres_tonnes = autres_combinations['poids_tonnes'].sum()
-            logger.info(f"[DUMP STATS] Total dans AUTRES: {total_autres_tonnes:.2f} tonnes")
-            logger.info(f"[DUMP STATS] Toutes les combinaisons dans AUTRES (par poids):")
-            for idx, row in autres_combinations.iterrows():
-                logger.info(f"  - {row['categorie']} / {row['sous_categorie']} / {row['flux']} / {row['orientation']}: {row['poids_tonnes']:.2f} tonnes ({row['nb_lignes']} lignes)")
-        else:
-            logger.info(f"[DUMP STATS] Aucune ligne non mappée - AUTRES sera vide")
-        
-        # Inclure toutes les données : celles non mappées vont dans "AUTRES"
-        df.loc[df['MappedCategory'].isna(), 'MappedCategory'] = 'AUTRES'
-        mapped_df = df.copy()  # Toutes les données sont incluses
-        
-        # Calculer le total après mapping
-        total_apres_mapping = mapped_df['poids'].sum() / 1000  # en tonnes
-        total_autres = (df[df['MappedCategory'] == 'AUTRES']['poids'].sum() / 1000) if len(df[df['MappedCategory'] == 'AUTRES']) > 0 else 0
-        
-        # Vérifier le total des déchets ultimes mappés
-        total_ultimes_mappes = (mapped_df[mapped_df['MappedCategory'] == 'DECHETS ULTIMES']['poids'].sum() / 1000) if len(mapped_df[mapped_df['MappedCategory'] == 'DECHETS ULTIMES']) > 0 else 0
-        logger.info(f"[DUMP STATS] Total déchets ultimes mappés: {total_ultimes_mappes:.2f} tonnes")
-
-        # Déchets ultimes : maintenant mappés directement dans MappedCategory
-        # On garde cette détection pour référence, mais ils sont déjà dans mapped_df
-        ultimes_mask = (
-            df['categorie'].astype(str).str.upper().str.strip().eq('EVACUATION DECHETS')
-            & df['orientation'].astype(str).str.upper().str.strip().eq('DECHETS ULTIMES')
-        )
-        ultimes_df = df[ultimes_mask].copy()
-        total_ultimes_brut = ultimes_df['poids'].sum() / 1000 if not ultimes_df.empty else 0
-        logger.info(f"[DUMP STATS] Total déchets ultimes (brut, avant mapping): {total_ultimes_brut:.2f} tonnes")
-        
-        # Log pour diagnostic
-        logger.info(f"[DUMP STATS] Total brut avant filtrage: {total_brut_avant_filtrage:.2f} tonnes")
-        logger.info(f"[DUMP STATS] Total après mapping catégories (inclut AUTRES): {total_apres_mapping:.2f} tonnes")
-        logger.info(f"[DUMP STATS] Total dans catégorie AUTRES (non mappé): {total_autres:.2f} tonnes")
-        logger.info(f"[DUMP STATS] Total déchets ultimes: {ultimes_df['poids'].sum() / 1000:.2f} tonnes")
+        ordered_dechetteries = _order_dechetteries(df['dechetterie'].unique())
 
-        unique_dechetteries = [str(d) for d in df['Dechetterie'].unique() if pd.notna(d)]
-        unique_dechetteries = sorted(set(unique_dechetteries))
-        standard_order = ['Pépinière', 'Sanssac', 'St Germain', 'Polignac', 'Yssingeaux', 'Bas-en-Basset', 'Monistrol']
-        special_cases = [d for d in unique_dechetteries if d not in standard_order]
-        ordered_dechetteries = [d for d in standard_order if d in unique_dechetteries] + sorted(special_cases)
+        # Matrice (déchetterie, date) x colonne ; les catégories hors colonnes (AUTRES) sont ignorées
+        pivot = df.pivot_table(
+            index=['dechetterie', 'DateKey'],
+            columns='category',
+            values='poids',
+            aggfunc='sum',
+            fill_value=0
+        ).reindex(columns=value_columns, fill_value=0)
 
         dechetteries_data = {}
-
         for dech in ordered_dechetteries:
-            dech_df = mapped_df[mapped_df['Dechetterie'] == dech].copy()
-            if dech_df.empty and ultimes_df[ultimes_df['Dechetterie'] == dech].empty:
-                continue
-
-            # MASSICOT et DEMANTELEMENT sont maintenant dans category_columns, donc inclus dans le pivot normal
-            # DECHETS ULTIMES reste un flux final séparé et ne doit PAS être dans le pivot des catégories
-            dech_df_categories = dech_df[~dech_df['MappedCategory'].isin(final_fluxes)].copy()
-            dech_df_final_fluxes = dech_df[dech_df['MappedCategory'].isin(final_fluxes)].copy()
-            
-            # Pivot pour toutes les catégories (inclut maintenant MASSICOT et DEMANTELEMENT, mais PAS DECHETS ULTIMES)
-            summary = dech_df_categories.groupby(['DateKey', 'MappedCategory'])['poids'].sum().reset_index()
-            pivot_df = summary.pivot_table(
-                index='DateKey',
-                columns='MappedCategory',
-                values='poids',
-                aggfunc='sum',
-                fill_value=0
-            ).reset_index()
-            
-            # S'assurer que DECHETS ULTIMES n'est pas dans le pivot (au cas où il serait mappé comme catégorie)
-            if 'DECHETS ULTIMES' in pivot_df.columns:
-                pivot_df = pivot_df.drop(columns=['DECHETS ULTIMES'])
-            
-            # Ajouter les flux finaux séparément (seulement DECHETS ULTIMES maintenant)
-            if not dech_df_final_fluxes.empty:
-                final_fluxes_summary = dech_df_final_fluxes.groupby(['DateKey', 'MappedCategory'])['poids'].sum().reset_index()
-                final_fluxes_pivot = final_fluxes_summary.pivot_table(
-                    index='DateKey',
-                    columns='MappedCategory',
-                    values='poids',
-                    aggfunc='sum',
-                    fill_value=0
-                ).reset_index()
-                # Fusionner les flux finaux dans le pivot principal
-                for flux in final_fluxes:
-                    if flux in final_fluxes_pivot.columns:
-                        pivot_df = pivot_df.merge(
-                            final_fluxes_pivot[['DateKey', flux]],
-                            on='DateKey',
-                            how='outer'
-                        ).fillna(0)
-                    else:
-                        pivot_df[flux] = 0
-            else:
-                for flux in final_fluxes:
-                    pivot_df[flux] = 0
-
-            ordered_df = pd.DataFrame({'DateKey': date_order})
-            result_df = ordered_df.merge(pivot_df, on='DateKey', how='left').fillna(0)
-
+            dech_matrix = pivot.xs(dech, level='dechetterie').reindex(date_order, fill_value=0)
+            values = dech_matrix.to_numpy(dtype=float)
+            row_totals = values.sum(axis=1)
             months_data = {}
-            for _, row in result_df.iterrows():
-                month_name = row['DateKey']
-                # Extraire toutes les catégories (inclut maintenant MASSICOT et DEMANTELEMENT)
-                month_data = {col: float(row[col]) if col in row else 0 for col in category_columns}
-                # Extraire les flux finaux séparément (seulement DECHETS ULTIMES maintenant)
-                for flux in final_fluxes:
-                    month_data[flux] = float(row[flux]) if flux in row else 0
+            for date_key, row_values, row_total in zip(date_order, values.tolist(), row_totals.tolist()):
+                month_data = dict(zip(value_columns, row_values))
                 # Le TOTAL est la somme de toutes les catégories + tous les flux finaux
-                # Cela correspond au total du dump Excel (somme de toutes les lignes)
-                month_total = sum(month_data[col] for col in category_columns) + sum(month_data.get(flux, 0) for flux in final_fluxes)
-                month_data['TOTAL'] = month_total
-                months_data[month_name] = month_data
-
-            # Totaux par déchetterie
-            totals_by_category = {col: 0 for col in category_columns}
-            totals_by_final_flux = {flux: 0 for flux in final_fluxes}
-            total_sum = 0
-            for month_data in months_data.values():
-                for col in category_columns:
-                    totals_by_category[col] += month_data.get(col, 0)
-                for flux in final_fluxes:
-                    totals_by_final_flux[flux] += month_data.get(flux, 0)
-                total_sum += month_data.get('TOTAL', 0)
-
-            # Le TOTAL inclut déjà toutes les catégories + tous les flux finaux (calculé dans month_data['TOTAL'])
-            # Donc total_sum contient déjà tout, pas besoin d'ajouter les flux finaux à nouveau
-            totals_by_category['TOTAL'] = total_sum
-            # Ajouter les flux finaux au total par déchetterie (pour affichage séparé)
-            for flux in final_fluxes:
-                totals_by_category[flux] = totals_by_final_flux[flux]
+                month_data['TOTAL'] = row_total
+                months_data[date_key] = month_data
+
+            column_totals = values.sum(axis=0).tolist()
+            totals_by_category = dict(zip(value_columns, column_totals))
+            totals_by_category['TOTAL'] = row_totals.sum()
 
             dechetteries_data[dech] = {
                 'months': months_data,
@@ -294,19 +208,12 @@ def build_stats_from_dump_db(year=2025):
             }
 
         # Totaux globaux
-        global_totals = {col: 0 for col in category_columns}
-        for flux in final_fluxes:
-            global_totals[flux] = 0
-        global_totals['TOTAL'] = 0
-
+        global_totals = {col: 0 for col in value_columns}
         for data in dechetteries_data.values():
-            for col in category_columns:
+            for col in value_columns:
                 global_totals[col] += data['total'].get(col, 0)
-            for flux in final_fluxes:
-                global_totals[flux] += data['total'].get(flux, 0)
-        
         # Calculer le TOTAL à partir des catégories + flux finaux (pas de double-comptage)
-        global_totals['TOTAL'] = sum(global_totals[col] for col in category_columns) + sum(global_totals[flux] for flux in final_fluxes)
+        global_totals['TOTAL'] = sum(global_totals[col] for col in value_columns)
 
         dataset_year = None
         date_range_label = None
@@ -317,21 +224,10 @@ def build_stats_from_dump_db(year=2025):
             else:
                 dataset_year = f"{date_start.year}-{date_end.year}"
 
-        # Calculer le total final pour diagnostic
-        # Le TOTAL inclut maintenant toutes les catégories + tous les flux finaux
-        total_categories_only = sum(global_totals[col] / 1000 for col in category_columns if col not in ['MASSICOT', 'DEMANTELEMENT'])  # en tonnes
-        total_massicot_demantelement = (global_totals.get('MASSICOT', 0) + global_totals.get('DEMANTELEMENT', 0)) / 1000  # en tonnes
-        total_final_fluxes = sum(global_totals[flux] / 1000 for flux in final_fluxes)  # en tonnes (seulement DECHETS ULTIMES)
         total_final_calcule = global_totals['TOTAL'] / 1000  # en tonnes (déjà inclut tout)
-        logger.info(f"[DUMP STATS] Total catégories (sans MASSICOT/DEMANTELEMENT): {total_categories_only:.2f} tonnes")
-        logger.info(f"[DUMP STATS] Total MASSICOT + DEMANTELEMENT: {total_massicot_demantelement:.2f} tonnes")
-        for flux in final_fluxes:
-            logger.info(f"[DUMP STATS] Total {flux}: {global_totals[flux] / 1000:.2f} tonnes")
-        logger.info(f"[DUMP STATS] Total flux finaux (DECHETS ULTIMES): {total_final_fluxes:.2f} tonnes")
         logger.info(f"[DUMP STATS] Total final (TOTAL, inclut tout): {total_final_calcule:.2f} tonnes")
-        logger.info(f"[DUMP STATS] Total brut attendu: {total_brut_avant_filtrage:.2f} tonnes")
-        logger.info(f"[DUMP STATS] Différence: {total_brut_avant_filtrage - total_final_calcule:.2f} tonnes")
-        
+        logger.info(f"[DUMP STATS] Total dans catégorie AUTRES (non mappé): {total_autres:.2f} tonnes")
+
         # Calculer les totaux par flux final
         final_flux_totals = {}
         for flux in final_fluxes:
@@ -353,7 +249,7 @@ def build_stats_from_dump_db(year=2025):
             # Informations de diagnostic
             '_diagnostic': {
                 'total_brut_tonnes': round(total_brut_avant_filtrage, 2),
-                'total_apres_mapping_tonnes': round(total_apres_mapping, 2),
+                'total_apres_mapping_tonnes': round(total_brut_avant_filtrage, 2),
                 'total_autres_tonnes': round(total_autres, 2),
                 'total_final_calcule_tonnes': round(total_final_calcule, 2),
                 'total_dechets_ultimes_tonnes': round(global_totals.get('DECHETS ULTIMES', 0) / 1000, 2),
@@ -375,102 +271,133 @@ def build_stats_from_dump_db(year=2025):
         }
 
 
-def get_time_series(granularity='day', year=2025):
-    """Get time series data from dump database."""
-    init_dump_db(year)
-    with get_dump_connection(year) as conn:
-        cursor = conn.cursor()
+class _StatsUnavailable(Exception):
+    """Stats could not be built; carries the error result (never cached)."""
 
-        if granularity == 'week':
-            date_expr = "strftime('%Y-W%W', date)"
-        elif granularity == 'month':
-            date_expr = "substr(date,1,7)"
-        else:
-            date_expr = "date"
+    def __init__(self, result):
+        super().__init__(result.get('error'))
+        self.result = result
 
-        date_bounds = cursor.execute(
-            "SELECT MIN(date) AS start_date, MAX(date) AS end_date FROM raw_dump"
-        ).fetchone()
-        if not date_bounds or not date_bounds['start_date'] or not date_bounds['end_date']:
-            return []
 
-        start_date = datetime.strptime(date_bounds['start_date'], '%Y-%m-%d').date()
-        end_date = datetime.strptime(date_bounds['end_date'], '%Y-%m-%d').date()
+def get_dump_stats(year=2025):
+    """
+    Get the result of build_stats_from_dump_db, cached per data version.
 
-        if granularity == 'week':
-            period_start = start_date - timedelta(days=start_date.weekday())
-            periods = []
-            cursor_date = period_start
-            while cursor_date <= end_date:
-                year_val, week, _ = cursor_date.isocalendar()
-                periods.append(f"{year_val}-W{week:02d}")
-                cursor_date += timedelta(days=7)
-        elif granularity == 'month':
-            periods = []
-            cursor_date = start_date.replace(day=1)
-            while cursor_date <= end_date:
-                periods.append(cursor_date.strftime('%Y-%m'))
-                month = cursor_date.month + 1
-                year_val = cursor_date.year + (1 if month == 13 else 0)
-                month = 1 if month == 13 else month
-                cursor_date = cursor_date.replace(year=year_val, month=month)
-        else:
-            periods = [
-                (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
-                for i in range((end_date - start_date).days + 1)
-            ]
+    Concurrent requests (in any worker) share a single computation; failed
+    builds are returned but not cached.
+    """
+    def compute():
+        result = build_stats_from_dump_db(year)
+        if not result.get('success'):
+            raise _StatsUnavailable(result)
+        return result
 
-        # Get unique déchetteries
-        dech_rows = cursor.execute(
-            """
-            SELECT DISTINCT lieu_collecte
-            FROM raw_dump
-            WHERE lieu_collecte IS NOT NULL
-            ORDER BY lieu_collecte ASC
-            """
-        ).fetchall()
-        dechetteries = [row['lieu_collecte'] for row in dech_rows]
+    try:
+        return cached_for_version('dump_stats', year, compute, shared=True)
+    except _StatsUnavailable as exc:
+        return exc.result
 
-        # Map to standard names
-        mapped_dechetteries = []
-        for dech in dechetteries:
-            mapped = DECHETTERIE_MAPPING.get(dech, dech)
-            if dech.upper() == 'APPORT VOLONTAIRE':
-                mapped = 'Pépinière'
-            if mapped not in mapped_dechetteries:
-                mapped_dechetteries.append(mapped)
 
-        rows = cursor.execute(
+def get_time_series(granularity='day', year=2025):
+    """
+    Get time series data from dump database (cached per data version).
+
+    Déchetteries are mapped in SQL (partial aggregates built by joining
+    dump_dechetterie_map), so the query returns final per-déchetterie groups.
+    Weeks are ISO weeks, grouped on their Monday.
+    """
+    if granularity not in ('week', 'month'):
+        granularity = 'day'
+    return cached_for_version(
+        'time_series',
+        year,
+        lambda: _compute_time_series(granularity, year),
+        {'granularity': granularity}
+    )
+
+
+def _compute_time_series(granularity, year):
+    init_dump_db(year)
+
+    if granularity == 'week':
+        date_expr = "date(date, 'weekday 0', '-6 days')"
+    elif granularity == 'month':
+        date_expr = "substr(date,1,7)"
+    else:
+        date_expr = "date"
+
+    results, _ = run_queries(year, {
+        'bounds': (
+            "SELECT MIN(date) AS start_date, MAX(date) AS end_date FROM dump_stats_partials",
+            (),
+            'one'
+        ),
+        'rows': (
             f"""
             SELECT {date_expr} AS period,
-                   lieu_collecte,
+                   dechetterie,
                    SUM(poids) AS total
-            FROM raw_dump
-            GROUP BY period, lieu_collecte
-            ORDER BY period ASC, lieu_collecte ASC
-            """
-        ).fetchall()
-
-    # Map to standard déchetterie names
-    by_key = {}
-    for row in rows:
-        dech = row['lieu_collecte']
-        mapped = DECHETTERIE_MAPPING.get(dech, dech)
-        if dech.upper() == 'APPORT VOLONTAIRE':
-            mapped = 'Pépinière'
-        key = (row['period'], mapped)
-        by_key[key] = by_key.get(key, 0) + row['total']
-
-    filled = []
-    for period in periods:
-        for dech in mapped_dechetteries:
-            filled.append({
-                'period': period,
-                'dechetterie': dech,
-                'total': by_key.get((period, dech), 0)
-            })
-
-    return filled
+            FROM dump_stats_partials
+            GROUP BY period, dechetterie
+            """,
+            ()
+        )
+    })
+    date_bounds = results['bounds']
+    rows = results['rows']
+    if not date_bounds or not date_bounds['start_date'] or not date_bounds['end_date']:
+        return []
+
+    return _fill_time_series(
+        {(row['period'], row['dechetterie']): row['total'] for row in rows},
+        datetime.strptime(date_bounds['start_date'], '%Y-%m-%d').date(),
+        datetime.strptime(date_bounds['end_date'], '%Y-%m-%d').date(),
+        granularity
+    )
+
+
+def _fill_time_series(period_totals, start_date, end_date, granularity='day'):
+    """
+    Expand {(period key, déchetterie): total} to a zero-filled series.
+
+    Period keys are the ISO date for days, the Monday's ISO date for weeks and
+    YYYY-MM for months.
+    """
+    if granularity == 'week':
+        # (clé SQL = lundi de la semaine, libellé ISO)
+        periods = []
+        cursor_date = start_date - timedelta(days=start_date.weekday())
+        while cursor_date <= end_date:
+            year_val, week, _ = cursor_date.isocalendar()
+            periods.append((cursor_date.isoformat(), f"{year_val}-W{week:02d}"))
+            cursor_date += timedelta(days=7)
+    elif granularity == 'month':
+        periods = []
+        cursor_date = start_date.replace(day=1)
+        while cursor_date <= end_date:
+            key = cursor_date.strftime('%Y-%m')
+            periods.append((key, key))
+            month = cursor_date.month + 1
+            year_val = cursor_date.year + (1 if month == 13 else 0)
+            month = 1 if month == 13 else month
+            cursor_date = cursor_date.replace(year=year_val, month=month)
+    else:
+        periods = []
+        for i in range((end_date - start_date).days + 1):
+            key = (start_date + timedelta(days=i)).isoformat()
+            periods.append((key, key))
+
+    dechetteries = _order_dechetteries(dech for _, dech in period_totals)
+
+    return [
+        {
+            'period': label,
+            'dechetterie': dech,
+            'total': period_totals.get((key, dech), 0)
+        }
+        for key, label in periods
+        for dech in dechetteries
+    ]
 
 
 def get_category_stats(year=2025):
@@ -511,67 +438,271 @@ def get_flux_orientation_matrix(year=2025):
     return [dict(row) for row in rows]
 
 
-def get_anomalies(limit=10, year=2025):
-    """Get anomalies from dump database."""
-    init_dump_db(year)
+ANOMALY_WINDOW = 28
+ANOMALY_THRESHOLD = 3.5
+# 0.6745 = quantile 75 % de la loi normale : rend le score MAD comparable à un z-score
+MAD_SCALE = 0.6745
+# Un jour à zéro n'est signalé que si son score passe le seuil ou si les zéros
+# représentent au plus cette part de la fenêtre (flux habituellement collecté)
+ZERO_RARE_SHARE = 0.1
+
+
+def _load_daily_flux_matrix(year):
+    """Load daily totals as a (day x (déchetterie, flux)) matrix, zero-filled."""
+    import pandas as pd
+
     with get_dump_connection(year) as conn:
-        cursor = conn.cursor()
-        rows = cursor.execute(
+        daily = pd.read_sql(
             """
-            SELECT
-              date,
-              lieu_collecte,
-              flux,
-              SUM(poids) AS total
-            FROM raw_dump
-            GROUP BY date, lieu_collecte, flux
-            ORDER BY total DESC
-            LIMIT ?
+            SELECT r.date, m.dechetterie, r.flux, SUM(r.poids) AS total
+            FROM raw_dump r
+            JOIN dump_dechetterie_map m ON m.lieu_collecte = r.lieu_collecte
+            GROUP BY r.date, m.dechetterie, r.flux
             """,
-            (limit,)
-        ).fetchall()
-    return [dict(row) for row in rows]
+            conn
+        )
+    return _daily_flux_matrix(daily)
+
+
+def _daily_flux_matrix(daily):
+    """Pivot (date, dechetterie, flux, total) rows to a zero-filled daily matrix."""
+    import pandas as pd
+
+    if daily.empty:
+        return None
+    daily = daily.copy()
+    daily['date'] = pd.to_datetime(daily['date'], errors='coerce')
+    daily = daily[daily['date'].notna()]
+    matrix = daily.pivot_table(
+        index='date', columns=['dechetterie', 'flux'], values='total', aggfunc='sum', fill_value=0
+    )
+    full_range = pd.date_range(matrix.index.min(), matrix.index.max(), freq='D')
+    return matrix.reindex(full_range, fill_value=0)
+
+
+def _window_median_mad(values, window, min_periods):
+    """
+    Median, MAD and share of zeros over the previous ``window`` days of each series.
+
+    The MAD is taken around the median of the same window. NaN values are
+    ignored; days with fewer than ``min_periods`` past values get NaN.
+    """
+    import warnings
+
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    # Row t of the windows holds days t - window .. t - 1
+    padded = np.vstack([np.full((window, values.shape[1]), np.nan), values[:-1]])
+    windows = sliding_window_view(padded, window, axis=0)
+    counts = np.sum(~np.isnan(windows), axis=2)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN windows of the first days
+        median = np.nanmedian(windows, axis=2)
+        mad = np.nanmedian(np.abs(windows - median[..., None]), axis=2)
+        zero_share = np.sum(windows == 0, axis=2) / np.maximum(counts, 1)
+    short = counts < min_periods
+    median[short] = np.nan
+    mad[short] = np.nan
+    zero_share[short] = np.nan
+    return median, mad, zero_share
+
+
+def _detect_anomalies(matrix, window=ANOMALY_WINDOW, threshold=ANOMALY_THRESHOLD):
+    """
+    Flag spikes, drops and zero-days on every series of the daily matrix at once.
+
+    Each day is compared with the median and MAD of the previous ``window``
+    days of the same series (robust z-score); days the déchetterie was
+    closed (nothing collected at all) are left out of that history. A zero
+    day is reported when its score passes ``-threshold`` or when zeros are
+    rare in the window.
+    """
+    import numpy as np
+
+    min_periods = max(3, window // 2)
+    values = matrix.to_numpy(dtype=float)
+    site_active = matrix.T.groupby(level='dechetterie').transform('sum').T.to_numpy(dtype=float) > 0
+    med, mad, zero_share = _window_median_mad(np.where(site_active, values, np.nan), window, min_periods)
+    # Plancher du MAD : évite les scores infinis sur les séries très régulières
+    mad_floor = np.maximum(mad, np.maximum(0.05 * np.abs(med), 1.0))
+    scores = MAD_SCALE * (values - med) / mad_floor
+
+    # Jour sans collecte pour un flux alors que la déchetterie a collecté d'autres flux
+    unusual_zero = (scores <= -threshold) | (zero_share <= ZERO_RARE_SHARE)
+    zero_days = (values == 0) & (med > 0) & site_active & unusual_zero
+    spikes = scores >= threshold
+    drops = (scores <= -threshold) & (values > 0)
+    flagged = np.nan_to_num(spikes | drops | zero_days, nan=False)
+
+    day_idx, col_idx = np.nonzero(flagged)
+    if len(day_idx) == 0:
+        return []
+    kinds = np.where(zero_days[day_idx, col_idx], 'zero', np.where(spikes[day_idx, col_idx], 'spike', 'drop'))
+    flagged_scores = scores[day_idx, col_idx]
+    order = np.argsort(-np.abs(flagged_scores), kind='stable')
+
+    dates = matrix.index.strftime('%Y-%m-%d')
+    columns = matrix.columns
+    return [
+        {
+            'date': dates[day_idx[i]],
+            'dechetterie': columns[col_idx[i]][0],
+            'flux': columns[col_idx[i]][1],
+            'total': round(float(values[day_idx[i], col_idx[i]]), 2),
+            'expected': round(float(med[day_idx[i], col_idx[i]]), 2),
+            'score': round(float(flagged_scores[i]), 2),
+            'type': str(kinds[i])
+        }
+        for i in order
+    ]
+
 
+def get_anomalies(limit=10, year=2025, window=ANOMALY_WINDOW, threshold=ANOMALY_THRESHOLD):
+    """
+    Get statistical anomalies from dump database, ranked by |score|.
 
-def get_missing_days(year=2025):
-    """Get missing days from dump database."""
+    Series are déchetterie x flux daily totals; results are cached per data
+    version so only ``limit`` varies between calls.
+    """
     init_dump_db(year)
-    with get_dump_connection(year) as conn:
-        cursor = conn.cursor()
-        date_rows = cursor.execute(
-            "SELECT DISTINCT date FROM raw_dump ORDER BY date ASC"
-        ).fetchall()
-        if not date_rows:
+
+    def compute():
+        matrix = _load_daily_flux_matrix(year)
+        if matrix is None:
             return []
+        return _detect_anomalies(matrix, window=window, threshold=threshold)
+
+    anomalies = cached_for_version(
+        'anomalies', year, compute, {'window': window, 'threshold': threshold}
+    )
+    return anomalies[:limit]
+
+
+def _easter_sunday(year):
+    """Compute Easter Sunday (Gregorian calendar, anonymous algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _french_public_holidays(start, end):
+    """List French public holidays between two dates (inclusive)."""
+    holidays = []
+    for year_val in range(start.year, end.year + 1):
+        easter = _easter_sunday(year_val)
+        holidays.extend([
+            date(year_val, 1, 1),
+            easter + timedelta(days=1),    # Lundi de Pâques
+            date(year_val, 5, 1),
+            date(year_val, 5, 8),
+            easter + timedelta(days=39),   # Ascension
+            easter + timedelta(days=50),   # Lundi de Pentecôte
+            date(year_val, 7, 14),
+            date(year_val, 8, 15),
+            date(year_val, 11, 1),
+            date(year_val, 11, 11),
+            date(year_val, 12, 25),
+        ])
+    return [d for d in holidays if start <= d <= end]
+
+
+def _missing_ranges(day_index, present, expected, start):
+    """
+    Encode missing expected days as ranges.
+
+    Closed (non-expected) days neither count as gaps nor split a range: a site
+    missing Saturday and Monday around a closed Sunday yields a single range.
+    """
+    import numpy as np
+
+    open_offsets = day_index[expected]
+    missing = ~present[expected]
+    if not missing.any():
+        return []
+    flags = np.concatenate(([0], missing.astype(np.int8), [0]))
+    edges = np.diff(flags)
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1) - 1
+    return [
+        {
+            'start': (start + timedelta(days=int(open_offsets[s]))).isoformat(),
+            'end': (start + timedelta(days=int(open_offsets[e]))).isoformat(),
+            'length': int(e - s + 1)
+        }
+        for s, e in zip(run_starts, run_ends)
+    ]
+
 
-        dates = [datetime.strptime(row['date'], '%Y-%m-%d').date() for row in date_rows]
-        start = dates[0]
-        end = dates[-1]
-        all_days = set(start + timedelta(days=i) for i in range((end - start).days + 1))
+def get_missing_days(year=2025, use_calendar=False):
+    """
+    Get missing days from dump database, encoded as ranges per déchetterie.
 
-        dech_rows = cursor.execute(
+    Args:
+        year: Year of the dump database
+        use_calendar: If True, closed weekdays (mappings.py) and French public
+            holidays are expected closures and are not reported as gaps
+    """
+    init_dump_db(year)
+    with get_dump_connection(year) as conn:
+        dech_rows = conn.execute(
             """
-            SELECT DISTINCT lieu_collecte, date
-            FROM raw_dump
-            WHERE lieu_collecte IS NOT NULL
+            SELECT DISTINCT dechetterie, date
+            FROM dump_stats_partials
             """
         ).fetchall()
-
-    # Map to standard déchetterie names
-    by_dech = {}
-    for row in dech_rows:
-        dech = row['lieu_collecte']
-        mapped = DECHETTERIE_MAPPING.get(dech, dech)
-        if dech.upper() == 'APPORT VOLONTAIRE':
-            mapped = 'Pépinière'
-        by_dech.setdefault(mapped, set()).add(datetime.strptime(row['date'], '%Y-%m-%d').date())
-
+    return _missing_days_from_pairs(
+        [row['date'] for row in dech_rows],
+        [row['dechetterie'] for row in dech_rows],
+        use_calendar
+    )
+
+
+def _missing_days_from_pairs(dates, dech_names, use_calendar=False):
+    """Compute missing-day ranges from parallel lists of ISO dates and déchetteries."""
+    import numpy as np
+
+    if len(dates) == 0:
+        return []
+
+    # Décalages en jours depuis le premier jour (parsing vectorisé numpy)
+    days = np.array(dates, dtype='datetime64[D]')
+    first_day = days.min()
+    offsets = (days - first_day).astype(np.int64)
+    num_days = int(offsets.max()) + 1
+    start = first_day.astype(date)
+    end = start + timedelta(days=num_days - 1)
+
+    day_index = np.arange(num_days)
+    weekdays = (day_index + start.weekday()) % 7
+    holiday_mask = np.zeros(num_days, dtype=bool)
+    if use_calendar:
+        holiday_offsets = [(d - start).days for d in _french_public_holidays(start, end)]
+        holiday_mask[holiday_offsets] = True
+
+    dech_array = np.array(dech_names, dtype=object)
     results = []
-    for dech, dates_set in by_dech.items():
-        missing = sorted(all_days - dates_set)
+    for dech in _order_dechetteries(set(dech_names)):
+        present = np.zeros(num_days, dtype=bool)
+        present[offsets[dech_array == dech]] = True
+        if use_calendar:
+            expected = ~np.isin(weekdays, get_closed_weekdays(dech)) & ~holiday_mask
+        else:
+            expected = np.ones(num_days, dtype=bool)
+        ranges = _missing_ranges(day_index, present, expected, start)
         results.append({
             'dechetterie': dech,
-            'missing_days': [d.isoformat() for d in missing]
+            'expected_days': int(expected.sum()),
+            'missing_count': sum(r['length'] for r in ranges),
+            'missing_ranges': ranges
         })
 
     return results
@@ -584,31 +715,459 @@ def get_comparison(year=2025):
         cursor = conn.cursor()
         rows = cursor.execute(
             """
-            SELECT lieu_collecte, SUM(poids) AS total
-            FROM raw_dump
-            GROUP BY lieu_collecte
+            SELECT dechetterie, SUM(poids) AS total
+            FROM dump_stats_partials
+            GROUP BY dechetterie
             ORDER BY total DESC
             """
         ).fetchall()
 
-    # Map to standard déchetterie names and aggregate
-    by_dech = {}
-    for row in rows:
-        dech = row['lieu_collecte']
-        mapped = DECHETTERIE_MAPPING.get(dech, dech)
-        if dech.upper() == 'APPORT VOLONTAIRE':
-            mapped = 'Pépinière'
-        by_dech[mapped] = by_dech.get(mapped, 0) + row['total']
+    return _comparison_from_totals([(row['dechetterie'], row['total']) for row in rows])
 
-    total_sum = sum(by_dech.values()) if by_dech else 0
-    avg = total_sum / len(by_dech) if by_dech else 0
 
-    results = []
-    for dech, total in sorted(by_dech.items(), key=lambda x: x[1], reverse=True):
-        results.append({
+def _comparison_from_totals(totals):
+    """Build the comparison rows from (déchetterie, total) pairs sorted by total."""
+    total_sum = sum(total for _, total in totals) if totals else 0
+    avg = total_sum / len(totals) if totals else 0
+
+    return [
+        {
             'dechetterie': dech,
             'total': total,
             'delta_vs_avg': total - avg
+        }
+        for dech, total in totals
+    ]
+
+
+def _load_year_aggregates(year):
+    """Load (month, déchetterie, category) totals of one year in a single scan."""
+    init_dump_db(year)
+    with get_dump_connection(year) as conn:
+        rows = conn.execute(
+            """
+            SELECT substr(date, 6, 2) AS period, dechetterie, category, SUM(poids) AS total
+            FROM dump_stats_partials
+            GROUP BY period, dechetterie, category
+            """
+        ).fetchall()
+    value_columns = set(CATEGORY_COLUMNS) | set(FINAL_FLUXES)
+    return [
+        (row['period'], row['dechetterie'], row['category'], row['total'])
+        for row in rows
+        if row['category'] in value_columns
+    ]
+
+
+def _with_deltas(totals_by_key, years):
+    """Build rows of per-year totals with deltas vs the previous year of the list."""
+    rows = []
+    for key, totals in totals_by_key.items():
+        per_year = {str(y): round(totals.get(y, 0), 2) for y in years}
+        deltas = {}
+        for prev_year, cur_year in zip(years, years[1:]):
+            prev_total = totals.get(prev_year, 0)
+            cur_total = totals.get(cur_year, 0)
+            deltas[str(cur_year)] = {
+                'vs': prev_year,
+                'abs': round(cur_total - prev_total, 2),
+                'pct': round((cur_total - prev_total) / prev_total * 100, 2) if prev_total else None
+            }
+        rows.append({'key': key, 'totals': per_year, 'deltas': deltas})
+    return rows
+
+
+def get_year_over_year(years=None):
+    """
+    Compare years per déchetterie, per category and per month.
+
+    Each year database is scanned once (cached per data version); deltas are
+    computed against the previous year of the (sorted) list.
+    """
+    available = get_dump_available_years()
+    years = sorted(set(int(y) for y in years)) if years else available
+    years = [y for y in years if y in available]
+
+    by_dechetterie = {}
+    by_category = {}
+    by_period = {}
+    totals = {}
+    for year in years:
+        for period, dech, category, total in cached_for_version(
+            'yoy_year', year, lambda year=year: _load_year_aggregates(year), shared=True
+        ):
+            by_dechetterie.setdefault(dech, {})
+            by_dechetterie[dech][year] = by_dechetterie[dech].get(year, 0) + total
+            by_category.setdefault(category, {})
+            by_category[category][year] = by_category[category].get(year, 0) + total
+            by_period.setdefault(period, {})
+            by_period[period][year] = by_period[period].get(year, 0) + total
+            totals[year] = totals.get(year, 0) + total
+
+    category_order = CATEGORY_COLUMNS + [f for f in FINAL_FLUXES if f not in CATEGORY_COLUMNS]
+    return {
+        'years': years,
+        'total': _with_deltas({'TOTAL': totals}, years)[0] if years else None,
+        'by_dechetterie': _with_deltas(
+            {d: by_dechetterie[d] for d in _order_dechetteries(by_dechetterie)}, years
+        ),
+        'by_category': _with_deltas(
+            {c: by_category[c] for c in category_order if c in by_category}, years
+        ),
+        'by_period': _with_deltas(
+            {p: by_period[p] for p in sorted(by_period)}, years
+        )
+    }
+
+
+def _load_daily_aggregate(year):
+    """
+    Load the shared daily aggregate used by the advanced stats bundle.
+
+    One grouped scan of raw_dump at (date, déchetterie, categorie,
+    sous_categorie, flux, orientation) grain; every advanced section can be
+    derived from it.
+    """
+    import pandas as pd
+
+    init_dump_db(year)
+    with get_dump_connection(year) as conn:
+        return pd.read_sql(
+            """
+            SELECT r.date, m.dechetterie, r.categorie, r.sous_categorie, r.flux,
+                   COALESCE(r.orientation, 'NON DEFINI') AS orientation,
+                   SUM(r.poids) AS total
+            FROM raw_dump r
+            JOIN dump_dechetterie_map m ON m.lieu_collecte = r.lieu_collecte
+            GROUP BY r.date, m.dechetterie, r.categorie, r.sous_categorie, r.flux,
+                     COALESCE(r.orientation, 'NON DEFINI')
+            """,
+            conn
+        )
+
+
+def _grouped_totals(daily, columns):
+    """Sum the daily aggregate by columns, sorted by total (descending)."""
+    grouped = daily.groupby(columns, dropna=False, sort=False)['total'].sum().reset_index()
+    grouped = grouped.sort_values('total', ascending=False, kind='stable')
+    return grouped.astype(object).where(grouped.notna(), None).to_dict(orient='records')
+
+
+def get_advanced_bundle(year=2025, granularity='day', limit=10, use_calendar=False,
+                        window=ANOMALY_WINDOW, threshold=ANOMALY_THRESHOLD):
+    """
+    Compute all advanced stats sections from one shared daily aggregate.
+
+    Returns series, category, flux_orientation, anomalies, missing_days and
+    comparison (same shapes as the individual endpoints) plus per-section
+    timings in milliseconds.
+    """
+    import pandas as pd
+
+    timings = {}
+
+    def timed(name, compute):
+        started = perf_counter()
+        result = compute()
+        timings[name] = round((perf_counter() - started) * 1000, 2)
+        return result
+
+    daily = timed('load', lambda: cached_for_version('daily_aggregate', year, lambda: _load_daily_aggregate(year), shared=True))
+    if daily.empty:
+        return {
+            'series': [], 'category': [], 'flux_orientation': [], 'anomalies': [],
+            'missing_days': [], 'comparison': [], 'timings_ms': timings
+        }
+
+    def series():
+        by_day = daily.groupby(['date', 'dechetterie'])['total'].sum().reset_index()
+        days = pd.to_datetime(by_day['date'])
+        if granularity == 'week':
+            keys = (days - pd.to_timedelta(days.dt.weekday, unit='D')).dt.strftime('%Y-%m-%d')
+        elif granularity == 'month':
+            keys = by_day['date'].str[:7]
+        else:
+            keys = by_day['date']
+        totals = by_day.groupby([keys.rename('period'), 'dechetterie'])['total'].sum()
+        return _fill_time_series(
+            totals.to_dict(), days.min().date(), days.max().date(), granularity
+        )
+
+    def anomalies():
+        detected = cached_for_version(
+            'anomalies', year,
+            lambda: _detect_anomalies(
+                _daily_flux_matrix(daily.groupby(['date', 'dechetterie', 'flux'])['total'].sum().reset_index()),
+                window=window, threshold=threshold
+            ),
+            {'window': window, 'threshold': threshold}
+        )
+        return detected[:limit]
+
+    def missing_days():
+        pairs = daily[['date', 'dechetterie']].drop_duplicates()
+        return _missing_days_from_pairs(pairs['date'].tolist(), pairs['dechetterie'].tolist(), use_calendar)
+
+    def comparison():
+        totals = daily.groupby('dechetterie')['total'].sum().sort_values(ascending=False)
+        return _comparison_from_totals(list(totals.items()))
+
+    return {
+        'series': timed('series', series),
+        'category': timed('category', lambda: _grouped_totals(daily, ['categorie', 'sous_categorie'])),
+        'flux_orientation': timed('flux_orientation', lambda: _grouped_totals(daily, ['flux', 'orientation'])),
+        'anomalies': timed('anomalies', anomalies),
+        'missing_days': timed('missing_days', missing_days),
+        'comparison': timed('comparison', comparison),
+        'timings_ms': timings
+    }
+
+
+DISTRIBUTION_DIMENSIONS = {
+    'category': 'cm.category',
+    'flux': 'r.flux',
+    'dechetterie': 'dm.dechetterie'
+}
+DISTRIBUTION_QUANTILES = [('p5', 0.05), ('p25', 0.25), ('p50', 0.5), ('p75', 0.75), ('p95', 0.95)]
+MAX_DISTRIBUTION_BINS = 200
+
+
+def _load_weights(year, by):
+    """Load (group, poids) pairs, projected to the two needed columns."""
+    import numpy as np
+
+    group_expr = DISTRIBUTION_DIMENSIONS[by]
+    with get_dump_connection(year) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {group_expr} AS grp, r.poids
+            FROM raw_dump r
+            JOIN dump_dechetterie_map dm ON dm.lieu_collecte = r.lieu_collecte
+            JOIN dump_category_map cm
+              ON cm.categorie = r.categorie
+             AND cm.sous_categorie = COALESCE(r.sous_categorie, '')
+             AND cm.flux = r.flux
+             AND cm.orientation = COALESCE(r.orientation, '')
+            """
+        ).fetchall()
+    groups = np.array([row[0] for row in rows], dtype=object)
+    weights = np.array([row[1] for row in rows], dtype=float)
+    return groups, weights
+
+
+def _compute_weight_distribution(year, by, bins, scale):
+    """Quantiles and histograms of individual weights for every group in one pass."""
+    import numpy as np
+
+    groups, weights = _load_weights(year, by)
+    if len(weights) == 0:
+        return {'by': by, 'scale': scale, 'bin_edges': [], 'groups': []}
+
+    labels, codes = np.unique(groups.astype(str), return_inverse=True)
+    # Tri par (groupe, poids) : chaque groupe devient une tranche triée contiguë
+    order = np.lexsort((weights, codes))
+    sorted_weights = weights[order]
+    counts = np.bincount(codes, minlength=len(labels))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ends = starts + counts - 1
+
+    def quantile(q):
+        position = starts + q * (counts - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, ends)
+        fraction = position - lower
+        return sorted_weights[lower] * (1 - fraction) + sorted_weights[upper] * fraction
+
+    quantiles = {name: quantile(q) for name, q in DISTRIBUTION_QUANTILES}
+    sums = np.bincount(codes, weights=weights, minlength=len(labels))
+
+    # Histogrammes : bornes communes à tous les groupes, une seule passe bincount
+    max_weight = float(weights.max())
+    if scale == 'log':
+        positive = weights[weights > 0]
+        low = float(positive.min()) if len(positive) else 1.0
+        edges = np.geomspace(low, max(max_weight, low * 10), bins + 1)
+        in_range = weights > 0
+    else:
+        low = min(float(weights.min()), 0.0)
+        edges = np.linspace(low, max(max_weight, low + 1), bins + 1)
+        in_range = np.ones(len(weights), dtype=bool)
+    bin_index = np.clip(np.searchsorted(edges, weights, side='right') - 1, 0, bins - 1)
+    histograms = np.bincount(
+        codes[in_range] * bins + bin_index[in_range], minlength=len(labels) * bins
+    ).reshape(len(labels), bins)
+    non_positive = np.bincount(codes[~in_range], minlength=len(labels))
+
+    results = []
+    for idx, label in enumerate(labels):
+        results.append({
+            'key': str(label),
+            'count': counts[idx],
+            'mean': round(float(sums[idx] / counts[idx]), 3),
+            'min': round(float(sorted_weights[starts[idx]]), 3),
+            **{name: round(float(values[idx]), 3) for name, values in quantiles.items()},
+            'max': round(float(sorted_weights[ends[idx]]), 3),
+            'histogram': histograms[idx],
+            'non_positive': non_positive[idx]
         })
+    results.sort(key=lambda item: item['count'], reverse=True)
+
+    return {
+        'by': by,
+        'scale': scale,
+        'bin_edges': [round(float(edge), 3) for edge in edges],
+        'groups': results
+    }
+
+
+def get_weight_distribution(year=2025, by='category', bins=20, scale='linear'):
+    """
+    Get quantiles (p5/p25/p50/p75/p95/max) and histograms of individual weights.
+
+    Args:
+        year: Year of the dump database
+        by: Grouping dimension ('category', 'flux' or 'dechetterie')
+        bins: Number of histogram bins (shared edges across groups)
+        scale: 'linear' or 'log' bins; with 'log', weights <= 0 are counted
+            in ``non_positive`` instead of the histogram
+    """
+    if by not in DISTRIBUTION_DIMENSIONS:
+        raise ValueError(f"Dimension inconnue: {by}")
+    if scale not in ('linear', 'log'):
+        raise ValueError(f"Échelle inconnue: {scale}")
+    bins = max(1, min(int(bins), MAX_DISTRIBUTION_BINS))
+    init_dump_db(year)
+    return cached_for_version(
+        'weight_distribution', year,
+        lambda: _compute_weight_distribution(year, by, bins, scale),
+        {'by': by, 'bins': bins, 'scale': scale}
+    )
 
-    return results
+
+HEATMAP_LAYERS = ('dechetterie', 'category')
+
+
+def _compute_calendar_heatmap(year, by):
+    """Build the (layer x ISO week x weekday) grid from the partial aggregates."""
+    import numpy as np
+
+    with get_dump_connection(year) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT date, {by} AS layer, SUM(poids) AS total
+            FROM dump_stats_partials
+            GROUP BY date, {by}
+            """
+        ).fetchall()
+    if not rows:
+        return {'by': by, 'layers': [], 'weeks': [], 'week_starts': [], 'values': []}
+
+    days = np.array([row['date'] for row in rows], dtype='datetime64[D]')
+    layer_names = np.array([row['layer'] for row in rows], dtype=object)
+    totals = np.array([row['total'] for row in rows], dtype=float)
+
+    start = days.min().astype(date)
+    end = days.max().astype(date)
+    first_monday = np.datetime64(start - timedelta(days=start.weekday()), 'D')
+    offsets = (days - first_monday).astype(np.int64)
+    num_weeks = int(offsets.max()) // 7 + 1
+
+    if by == 'dechetterie':
+        layers = _order_dechetteries(set(layer_names))
+    else:
+        present = set(layer_names)
+        layers = [c for c in CATEGORY_COLUMNS + FINAL_FLUXES if c in present]
+        layers += sorted(present - set(layers))
+    layer_index = {name: idx for idx, name in enumerate(layers)}
+    layer_idx = np.array([layer_index[name] for name in layer_names], dtype=np.int64)
+
+    grid = np.zeros((len(layers), num_weeks, 7))
+    np.add.at(grid, (layer_idx, offsets // 7, offsets % 7), totals)
+
+    week_starts = [first_monday.astype(date) + timedelta(days=7 * w) for w in range(num_weeks)]
+    return {
+        'by': by,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'layout': {'values': ['layers', 'weeks', 'weekdays']},
+        'layers': layers,
+        'weeks': [f"{d.isocalendar()[0]}-W{d.isocalendar()[1]:02d}" for d in week_starts],
+        'week_starts': [d.isoformat() for d in week_starts],
+        'weekdays': ['Lun', 'Mar', 'Mer', 'Jeu', 'Ven', 'Sam', 'Dim'],
+        'max': [round(float(v), 2) for v in grid.reshape(len(layers), -1).max(axis=1)],
+        'values': np.round(grid, 2).ravel()
+    }
+
+
+def get_calendar_heatmap(year=2025, by='dechetterie'):
+    """
+    Get a dense calendar heatmap grid (cached per data version).
+
+    ``values`` is row-major over (layer, ISO week, weekday); weeks start on the
+    Monday given by ``week_starts`` and days outside [start, end] are 0.
+    """
+    if by not in HEATMAP_LAYERS:
+        raise ValueError(f"Dimension inconnue: {by}")
+    init_dump_db(year)
+    return cached_for_version('calendar_heatmap', year, lambda: _compute_calendar_heatmap(year, by), {'by': by})
+
+
+def _compute_flux_heatmap(year, by):
+    """Build the (déchetterie x flux/category) total matrix."""
+    import numpy as np
+
+    with get_dump_connection(year) as conn:
+        if by == 'flux':
+            rows = conn.execute(
+                """
+                SELECT m.dechetterie, r.flux AS col, SUM(r.poids) AS total
+                FROM raw_dump r
+                JOIN dump_dechetterie_map m ON m.lieu_collecte = r.lieu_collecte
+                GROUP BY m.dechetterie, r.flux
+                """
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                """
+                SELECT dechetterie, category AS col, SUM(poids) AS total
+                FROM dump_stats_partials
+                GROUP BY dechetterie, category
+                """
+            ).fetchall()
+
+    dechetteries = _order_dechetteries(set(row['dechetterie'] for row in rows))
+    column_totals = {}
+    for row in rows:
+        column_totals[row['col']] = column_totals.get(row['col'], 0) + row['total']
+    if by == 'flux':
+        columns = sorted(column_totals, key=lambda col: column_totals[col], reverse=True)
+    else:
+        columns = [c for c in CATEGORY_COLUMNS + FINAL_FLUXES if c in column_totals]
+        columns += sorted(set(column_totals) - set(columns))
+
+    dech_index = {name: idx for idx, name in enumerate(dechetteries)}
+    col_index = {name: idx for idx, name in enumerate(columns)}
+    matrix = np.zeros((len(dechetteries), len(columns)))
+    for row in rows:
+        matrix[dech_index[row['dechetterie']], col_index[row['col']]] += row['total']
+
+    return {
+        'by': by,
+        'layout': {'values': ['dechetteries', 'columns']},
+        'dechetteries': dechetteries,
+        'columns': columns,
+        'values': np.round(matrix, 2).ravel()
+    }
+
+
+def get_flux_heatmap(year=2025, by='category'):
+    """
+    Get the déchetterie x flux matrix (cached per data version).
+
+    ``by='category'`` uses mapped categories, ``by='flux'`` the raw flux column;
+    ``values`` is row-major over (déchetterie, column).
+    """
+    if by not in ('category', 'flux'):
+        raise ValueError(f"Dimension inconnue: {by}")
+    init_dump_db(year)
+    return cached_for_version('flux_heatmap', year, lambda: _compute_flux_heatmap(year, by), {'by': by})
@@ -0,0 +1,290 @@
+"""
+Métriques applicatives (compteurs, histogrammes, jauges) partagées entre workers.
+
+Chaque processus accumule ses mesures en mémoire et un thread de fond les
+reverse toutes les ``FLUSH_INTERVAL`` secondes dans une petite base SQLite
+commune (UPSERT additif), ce qui agrège les workers gunicorn sans dépendance
+externe, y compris les mesures d'un worker devenu inactif. Les jauges
+(requêtes en cours) sont stockées par pid ; les lignes des processus morts
+sont supprimées au rendu.
+Le rendu suit le format texte Prometheus.
+
+Le temps SQL d'une requête HTTP est cumulé dans une variable de contexte
+(``start_request_sql`` / ``record_sql_time``) alimentée par les connexions
+dump chronométrées.
+"""
+
+import atexit
+import contextvars
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+
+FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)
+
+METRIC_HELP = {
+    'http_requests_total': ('counter', 'HTTP requests by method, route and status'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency'),
+    'http_response_size_bytes': ('histogram', 'HTTP response body size'),
+    'http_request_sql_seconds': ('histogram', 'SQL time spent per HTTP request'),
+    'http_requests_in_flight': ('gauge', 'HTTP requests being processed'),
+    'dump_rows_ingested_total': ('counter', 'Rows inserted into dump databases'),
+    'dump_cache_requests_total': ('counter', 'Result cache lookups by namespace and result'),
+}
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = {}
+_gauges = {}
+_last_flush = time.monotonic()
+_flusher_pid = None
+_sql_time = contextvars.ContextVar('request_sql_time', default=None)
+
+
+def _metrics_db_path():
+    default = Path(__file__).resolve().parents[1] / 'data' / 'metrics.db'
+    return Path(os.environ.get('METRICS_DB_PATH', default))
+
+
+def _label_key(labels):
+    """Canonical Prometheus label string for a labels dict."""
+    if not labels:
+        return ''
+    parts = []
+    for key in sorted(labels):
+        value = str(labels[key]).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return ','.join(parts)
+
+
+def _ensure_flusher():
+    """Start this process's background flush thread (once per pid)."""
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush(force=True)
+
+
+def _after_fork():
+    """Forked worker: fresh lock and buffers (the parent flushes its own), no flusher yet."""
+    global _lock, _flusher_pid
+    _lock = threading.Lock()
+    _pending.clear()
+    _gauges.clear()
+    _flusher_pid = None
+
+
+def _add(name, labels, suffix, value):
+    _ensure_flusher()
+    key = (name, _label_key(labels), suffix)
+    with _lock:
+        _pending[key] = _pending.get(key, 0) + value
+
+
+def inc(name, value=1, labels=None):
+    """Increment a counter."""
+    _add(name, labels, '', value)
+
+
+def observe(name, value, labels=None, buckets=LATENCY_BUCKETS):
+    """Record one observation in a histogram."""
+    for bound in buckets:
+        # Exact bound (1048576, not 1.04858e+06): the label must match the bucket
+        _add(name, labels, f'le={_format_value(bound)}', 1 if value <= bound else 0)
+    _add(name, labels, 'le=+Inf', 1)
+    _add(name, labels, 'sum', value)
+    _add(name, labels, 'count', 1)
+
+
+def gauge_add(name, delta, labels=None):
+    """Change a per-process gauge."""
+    _ensure_flusher()
+    key = (name, _label_key(labels))
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + delta
+
+
+def start_request_sql():
+    """Start accumulating SQL time for the current request context."""
+    _sql_time.set([0.0])
+
+
+def end_request_sql():
+    """Stop accumulating and return the SQL time (s) of the current request."""
+    total = _sql_time.get()
+    _sql_time.set(None)
+    return total[0] if total else 0.0
+
+
+def record_sql_time(seconds):
+    """Add SQL time to the current request (no-op outside a request)."""
+    total = _sql_time.get()
+    if total is not None:
+        total[0] += seconds
+
+
+def _connect():
+    path = _metrics_db_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=5)
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS metric_values (
+            name TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            suffix TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (name, labels, suffix)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS metric_gauges (
+            name TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            pid INTEGER NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (name, labels, pid)
+        )
+        """
+    )
+    return conn
+
+
+def flush(force=False):
+    """Write pending measurements to the shared store (at most every FLUSH_INTERVAL)."""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    with _lock:
+        pending = list(_pending.items())
+        _pending.clear()
+        gauges = list(_gauges.items())
+        _last_flush = now
+    if not pending and not gauges:
+        return
+
+    pid = os.getpid()
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO metric_values (name, labels, suffix, value) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(name, labels, suffix) DO UPDATE SET value = value + excluded.value
+                    """,
+                    [(name, labels, suffix, value) for (name, labels, suffix), value in pending]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO metric_gauges (name, labels, pid, value) VALUES (?, ?, ?, ?)",
+                    [(name, labels, pid, value) for (name, labels), value in gauges]
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as exc:
+        # Measurements are dropped rather than failing the request
+        logger.warning(f"[METRICS] Échec de l'écriture des métriques: {exc}")
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus():
+    """Render all metrics (every worker) in Prometheus text format."""
+    flush(force=True)
+    conn = _connect()
+    try:
+        values = conn.execute(
+            "SELECT name, labels, suffix, value FROM metric_values ORDER BY name, labels"
+        ).fetchall()
+        gauge_rows = conn.execute("SELECT name, labels, pid, value FROM metric_gauges").fetchall()
+        alive = {pid: pid == os.getpid() or _pid_alive(pid) for pid in {row[2] for row in gauge_rows}}
+        dead = [(pid,) for pid, is_alive in alive.items() if not is_alive]
+        if dead:
+            with conn:
+                conn.executemany("DELETE FROM metric_gauges WHERE pid = ?", dead)
+    finally:
+        conn.close()
+
+    series = {}
+    for name, labels, suffix, value in values:
+        series.setdefault(name, []).append((labels, suffix, value))
+    gauges = {}
+    for name, labels, pid, value in gauge_rows:
+        if alive[pid]:
+            gauges[(name, labels)] = gauges.get((name, labels), 0) + value
+    for (name, labels), value in gauges.items():
+        series.setdefault(name, []).append((labels, '', value))
+
+    def sample_order(sample):
+        labels, suffix, _ = sample
+        if suffix.startswith('le='):
+            return (labels, 0, float(suffix[3:]))
+        return (labels, 1, suffix)
+
+    lines = []
+    for name in sorted(series):
+        kind, help_text = METRIC_HELP.get(name, ('untyped', name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, suffix, value in sorted(series[name], key=sample_order):
+            if suffix.startswith('le='):
+                bound = suffix[3:]
+                label_str = f'{labels},le="{bound}"' if labels else f'le="{bound}"'
+                lines.append(f"{name}_bucket{{{label_str}}} {_format_value(value)}")
+            else:
+                metric = f"{name}_{suffix}" if suffix else name
+                lines.append(f"{metric}{{{labels}}} {_format_value(value)}" if labels else f"{metric} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+def _at_exit():
+    """Flush the last measurements and drop this process's gauges."""
+    flush(force=True)
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM metric_gauges WHERE pid = ?", (os.getpid(),))
+        finally:
+            conn.close()
+    except sqlite3.Error as exc:
+        logger.warning(f"[METRICS] Échec du nettoyage des jauges: {exc}")
+
+
+atexit.register(_at_exit)
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,106 @@
+"""
+Exécution concurrente de requêtes SQLite en lecture seule.
+
+Les requêtes indépendantes d'un même endpoint sont soumises à un pool de
+threads borné ; chaque thread garde sa propre connexion en lecture par année
+(SQLite relâche le GIL pendant l'exécution). Cette connexion est fermée et
+rouverte dès que la version des données change ou que le fichier est remplacé
+(import, suppression). Les durées de chaque requête et le temps mur total
+sont mesurés pour suivre le gain réel.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import sqlite3
+import threading
+from time import perf_counter
+
+from services.db import get_dump_data_version, get_dump_db_path
+from services.metrics import record_sql_time
+
+
+MAX_WORKERS = int(os.environ.get('DUMP_QUERY_WORKERS', 4))
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_executor():
+    """Get the shared bounded thread pool (created lazily, after any fork)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='dump-query')
+    return _executor
+
+
+def _connection_key(year):
+    """Identify the database file and its data version (a change needs a new connection)."""
+    db_path = get_dump_db_path(year)
+    inode = db_path.stat().st_ino if db_path.exists() else None
+    return inode, get_dump_data_version(year)
+
+
+def _thread_connection(year, key):
+    """Get this thread's read-only connection to the dump database of a year."""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    cached = connections.get(year)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    conn = sqlite3.connect(str(get_dump_db_path(year)))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON;")
+    connections[year] = (key, conn)
+    return conn
+
+
+def _run_query(year, key, sql, params, fetch):
+    """Run one query on the calling thread's connection and time it."""
+    started = perf_counter()
+    cursor = _thread_connection(year, key).execute(sql, params)
+    rows = cursor.fetchone() if fetch == 'one' else cursor.fetchall()
+    return rows, (perf_counter() - started) * 1000
+
+
+def run_queries(year, queries):
+    """
+    Run independent read queries in parallel.
+
+    Args:
+        year: Year of the dump database
+        queries: dict name -> (sql, params) or (sql, params, 'one'|'all')
+
+    Returns:
+        (results, timings): results maps each name to its rows (or single row
+        for 'one'); timings maps each name to its duration in ms, plus
+        'wall' (elapsed time) and 'sum' (sequential equivalent).
+    """
+    started = perf_counter()
+    executor = _get_executor()
+    key = _connection_key(year)
+    futures = {}
+    for name, query in queries.items():
+        sql, params = query[0], query[1]
+        fetch = query[2] if len(query) > 2 else 'all'
+        futures[name] = executor.submit(_run_query, int(year), key, sql, params, fetch)
+
+    results = {}
+    timings = {}
+    for name, future in futures.items():
+        results[name], timings[name] = future.result()
+    timings = {name: round(ms, 2) for name, ms in timings.items()}
+    timings['sum'] = round(sum(timings.values()), 2)
+    timings['wall'] = round((perf_counter() - started) * 1000, 2)
+    # Worker threads run outside the request context: account for their total SQL time here
+    record_sql_time(timings['sum'] / 1000)
+    logger.debug(f"[QUERY EXECUTOR] {len(queries)} requêtes en {timings['wall']} ms (séquentiel: {timings['sum']} ms)")
+    return results, timings
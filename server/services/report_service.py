@@ -0,0 +1,267 @@
+"""
+Génération des classeurs COLLECTES en tâche de fond.
+
+La synthèse (``scripts/synthesize_dump.py``) est lancée dans un thread ; le
+classeur produit dans ``output/`` est accompagné d'un fichier ``.version``
+contenant la version des données (et des mappings) à partir de laquelle il a
+été généré. Tant que cette version ne change pas, une nouvelle demande
+renvoie directement le fichier existant.
+
+L'état des tâches est écrit dans ``data/jobs/`` pour être lisible depuis
+n'importe quel worker ; la génération d'une même année est sérialisée entre
+processus par un verrou ``flock``.
+"""
+
+from datetime import datetime, timezone
+import json
+import logging
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+import uuid
+
+from services.cache import get_cache_version
+from services.db import get_dump_available_years
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: per-process serialization only
+    fcntl = None
+
+
+REPORT_FILENAME = 'COLLECTES_RECYCLERIE_DUMP_{year}.xlsx'
+JOB_RETENTION_SECONDS = 24 * 3600
+
+logger = logging.getLogger(__name__)
+
+_project_root = Path(__file__).resolve().parents[2]
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def get_output_dir():
+    """Directory of generated workbooks (listed by /files/output/list)."""
+    return _project_root / 'output'
+
+
+def _jobs_dir():
+    path = Path(__file__).resolve().parents[1] / 'data' / 'jobs'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def _report_path(year):
+    return get_output_dir() / REPORT_FILENAME.format(year=int(year))
+
+
+def _version_path(report_path):
+    return report_path.with_name(f"{report_path.name}.version")
+
+
+def _write_report_version(report_path, version):
+    path = _version_path(report_path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(version, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def _read_report_version(report_path):
+    try:
+        return _version_path(report_path).read_text(encoding='utf-8').strip()
+    except OSError:
+        return None
+
+
+def get_report_state(year=2025):
+    """
+    Describe the workbook of a year.
+
+    Returns:
+        dict with filename, exists, up_to_date, version (current data
+        version), size and generated_at
+    """
+    path = _report_path(year)
+    version = get_cache_version(year)
+    exists = path.exists()
+    stat = path.stat() if exists else None
+    return {
+        'year': int(year),
+        'filename': path.name,
+        'exists': exists,
+        'up_to_date': exists and _read_report_version(path) == version,
+        'version': version,
+        'size': stat.st_size if stat else None,
+        'generated_at': datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(timespec='seconds') if stat else None
+    }
+
+
+def _write_job(job):
+    path = _jobs_dir() / f"{job['id']}.json"
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(job), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def get_job(job_id):
+    """
+    Return the state of a report job, or None if unknown.
+
+    A running job whose process died (worker restart during the synthesis)
+    is reported, and recorded, as failed so that clients stop polling.
+    """
+    if not all(char in '0123456789abcdef' for char in job_id):
+        return None
+    try:
+        job = json.loads((_jobs_dir() / f"{job_id}.json").read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if job.get('state') == 'running' and not _pid_alive(job.get('pid', 0)):
+        job.update({
+            'state': 'error',
+            'error': "Le processus de génération s'est arrêté avant la fin",
+            'finished_at': _now()
+        })
+        _write_job(job)
+    return job
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _running_job(year, version):
+    """
+    Running job (any worker) generating this year and version.
+
+    Finished jobs older than JOB_RETENTION_SECONDS are removed on the way.
+    """
+    expired = time.time() - JOB_RETENTION_SECONDS
+    for path in _jobs_dir().glob('*.json'):
+        try:
+            job = json.loads(path.read_text(encoding='utf-8'))
+            if job.get('state') != 'running' and path.stat().st_mtime < expired:
+                path.unlink()
+                continue
+        except (OSError, ValueError):
+            continue
+        if (job.get('state') == 'running' and job.get('year') == year
+                and job.get('version') == version and _pid_alive(job.get('pid', 0))):
+            return job
+    return None
+
+
+def _year_lock(year):
+    with _local_locks_guard:
+        return _local_locks.setdefault(year, threading.Lock())
+
+
+def _synthesize(year, version, force=False):
+    """
+    Generate the workbook of a year.
+
+    Returns True when it was skipped because another process generated the
+    same version meanwhile.
+    """
+    scripts_dir = _project_root / 'scripts'
+    if str(scripts_dir) not in sys.path:
+        sys.path.insert(0, str(scripts_dir))
+    from synthesize_dump import synthesize_dump
+
+    path = _report_path(year)
+    tmp_dir = get_output_dir() / '.tmp'
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    with _year_lock(year):
+        lock_file = open(tmp_dir / f"{path.name}.lock", 'w')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Another worker may have generated it while we waited for the lock
+            if not force and path.exists() and _read_report_version(path) == version:
+                return True
+            # Written aside then moved, so downloads never see a partial file
+            tmp_path = tmp_dir / f"{os.getpid()}-{path.name}"
+            if synthesize_dump(str(tmp_path), year=year) is None:
+                raise ValueError(f"Aucune donnée exploitable pour {year}")
+            # No version while the workbook is swapped: never a new file with the old version
+            _version_path(path).unlink(missing_ok=True)
+            os.replace(tmp_path, path)
+            _write_report_version(path, version)
+            return False
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+
+def _run_job(job):
+    try:
+        job['cached'] = _synthesize(job['year'], job['version'], job['force'])
+        job['state'] = 'done'
+        job['report'] = get_report_state(job['year'])
+    except Exception as exc:
+        logger.warning(f"[REPORT] Génération {job['year']} en échec: {exc}")
+        job['state'] = 'error'
+        job['error'] = str(exc)
+    job['finished_at'] = _now()
+    _write_job(job)
+
+
+def start_report_job(year=2025, force=False):
+    """
+    Start generating the COLLECTES workbook of a year.
+
+    Args:
+        year: Year of the dump database
+        force: Regenerate even if the workbook matches the data version
+
+    Returns:
+        (job, report) — job is None when the existing workbook is up to date,
+        report is the current report state
+
+    Raises:
+        ValueError: If no dump database exists for the year
+    """
+    year = int(year)
+    if year not in get_dump_available_years():
+        raise ValueError(f"Aucune base dump pour l'année {year}")
+    report = get_report_state(year)
+    if report['up_to_date'] and not force:
+        return None, report
+
+    job = _running_job(year, report['version'])
+    if job is not None:
+        return job, report
+
+    job = {
+        'id': uuid.uuid4().hex,
+        'year': year,
+        'version': report['version'],
+        'force': bool(force),
+        'state': 'running',
+        'pid': os.getpid(),
+        'started_at': _now(),
+        'finished_at': None
+    }
+    _write_job(job)
+    threading.Thread(target=_run_job, args=(dict(job),), name=f"report-{year}", daemon=True).start()
+    return job, report
+
+
+def refresh_stale_report(year):
+    """Regenerate the workbook of a year after an import, if one was generated before."""
+    report = get_report_state(year)
+    if report['exists'] and not report['up_to_date']:
+        return start_report_job(year)[0]
+    return None
@@ -0,0 +1,171 @@
+"""
+Préchauffage des caches de statistiques.
+
+Après un démarrage (redémarrage Render, nouveau worker) ou un import, les
+résultats par défaut des années les plus récentes (stats, bundle avancé,
+séries, options du tableau brut) sont calculés en tâche de fond, afin que
+le premier visiteur ne paie pas le calcul à froid. Les résultats partagés
+(``shared=True``) sont écrits dans le cache disque : entre workers, le calcul
+n'est fait qu'une fois.
+
+Une seule passe tourne à la fois par processus ; une demande reçue pendant
+une passe est rejouée à la fin de celle-ci. L'état est exposé par
+``get_warmup_status`` (/api/status).
+"""
+
+from datetime import datetime, timezone
+import logging
+import os
+import threading
+from time import perf_counter
+
+
+WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', '1').lower() not in ('0', 'false', 'no')
+WARMUP_YEARS = int(os.environ.get('WARMUP_YEARS', 2))
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {
+    'state': 'idle',
+    'reason': None,
+    'years': [],
+    'started_at': None,
+    'finished_at': None,
+    'duration_ms': None,
+    'error': None,
+    'tasks': []
+}
+_pending = None
+_started_pid = None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def _warmup_tasks():
+    """Default results served to the dashboard: (name, callable(year))."""
+    from services.dump_raw_service import get_raw_options
+    from services.dump_stats_service import get_advanced_bundle, get_dump_stats, get_time_series
+
+    return [
+        ('stats', get_dump_stats),
+        ('bundle', get_advanced_bundle),
+        ('series', lambda year: get_time_series('day', year)),
+        ('options', lambda year: get_raw_options(year, {}))
+    ]
+
+
+def _recent_years(years=None):
+    from services.db import get_dump_available_years
+
+    available = get_dump_available_years()
+    if years:
+        return [year for year in years if year in available]
+    return sorted(available, reverse=True)[:WARMUP_YEARS]
+
+
+def _warm(years, tasks):
+    """Compute every warm-up task of the given years; returns True if one failed."""
+    failed = False
+    for year in years:
+        for name, compute in _warmup_tasks():
+            task_started = perf_counter()
+            entry = {'year': year, 'name': name}
+            try:
+                compute(year)
+            except Exception as exc:
+                # A failing section must not prevent warming the others
+                failed = True
+                entry['error'] = str(exc)
+                logger.warning(f"[WARMUP] {name} {year} en échec: {exc}")
+            entry['ms'] = round((perf_counter() - task_started) * 1000, 2)
+            with _lock:
+                tasks.append(entry)
+    return failed
+
+
+def _run(reason, years):
+    global _pending
+    while True:
+        started = perf_counter()
+        tasks = []
+        with _lock:
+            _state.update({
+                'state': 'running',
+                'reason': reason,
+                'years': [],
+                'started_at': _now(),
+                'finished_at': None,
+                'duration_ms': None,
+                'error': None,
+                'tasks': tasks
+            })
+
+        failed = True
+        error = None
+        try:
+            warm_years = _recent_years(years)
+            with _lock:
+                _state['years'] = warm_years
+            logger.info(f"[WARMUP] Démarrage ({reason}) pour {warm_years}")
+            failed = _warm(warm_years, tasks)
+        except Exception as exc:
+            error = str(exc)
+            logger.warning(f"[WARMUP] Passe en échec: {exc}")
+        finally:
+            # Whatever happens, the pass ends: a stuck 'running' would only queue later requests
+            with _lock:
+                _state.update({
+                    'state': 'error' if failed else 'done',
+                    'finished_at': _now(),
+                    'duration_ms': round((perf_counter() - started) * 1000, 2),
+                    'error': error
+                })
+                replay, _pending = _pending, None
+                if replay is not None:
+                    _state['state'] = 'running'
+        logger.info(f"[WARMUP] Terminé en {_state['duration_ms']} ms")
+        if replay is None:
+            return
+        reason, years = replay
+
+
+def start_warmup(reason='boot', years=None):
+    """
+    Warm the caches in a background thread.
+
+    Args:
+        reason: Why the warm-up runs ('boot', 'import', ...), for the status
+        years: Years to warm (default: the WARMUP_YEARS most recent years)
+
+    Returns:
+        True if a pass was started or queued, False when disabled
+    """
+    global _pending, _started_pid
+    if not WARMUP_ENABLED:
+        return False
+    with _lock:
+        _started_pid = os.getpid()
+        if _state['state'] == 'running':
+            _pending = (reason, years)
+            return True
+        _state['state'] = 'running'
+    threading.Thread(target=_run, args=(reason, years), name='cache-warmup', daemon=True).start()
+    return True
+
+
+def ensure_warmup_started():
+    """Start the boot warm-up once per process (no-op afterwards)."""
+    if _started_pid != os.getpid():
+        start_warmup('boot')
+
+
+def get_warmup_status():
+    """Current warm-up state of this process."""
+    with _lock:
+        status = dict(_state, tasks=list(_state['tasks']))
+    status['enabled'] = WARMUP_ENABLED
+    status['pid'] = os.getpid()
+    return status
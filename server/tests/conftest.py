@@ -0,0 +1,82 @@
+"""
+Shared fixtures: an isolated data directory with a small seeded dump database.
+"""
+
+import os
+import sys
+import tempfile
+
+# Before the app modules are imported: no background warm-up, private metrics store
+os.environ.setdefault('WARMUP_ENABLED', '0')
+os.environ.setdefault('METRICS_DB_PATH', os.path.join(tempfile.mkdtemp(), 'metrics.db'))
+os.environ.setdefault('METRICS_FLUSH_INTERVAL', '0.2')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from services import cache, db
+from services.db import get_dump_connection, init_dump_db
+
+
+YEAR = 2030
+
+# (date, lieu_collecte, categorie, sous_categorie, flux, orientation, origine, secteur_collecte, tournee, poids, volume_m3, nombre)
+ROWS = [
+    ('2030-01-06', 'Dech. Sanssac', '4.MEUBLES', 'CHAISES', 'MEUBLES', 'REEMPLOI', 'Apport', 'S1', 'T1', 12.5, 0.4, 2),
+    ('2030-01-07', 'Dech. Sanssac', '4.LIVRES', None, 'LIVRES', 'MASSICOT', 'Apport', 'S1', 'T1', 30.0, 0.2, 10),
+    ('2030-01-20', 'Dech. Polignac', '4.MEUBLES', 'CHAISES', 'MEUBLES', 'REEMPLOI', 'Collecte', 'S2', 'T2', 7.5, 0.3, 1),
+    ('2030-02-03', 'Dech. Polignac', '4.TEXTILE', 'VETEMENTS', 'TLC', 'REEMPLOI', 'Collecte', 'S2', None, 20.0, None, 4),
+    ('2030-02-10', 'Dech. Sanssac', '4.PAM', 'FRIGO', 'DEEE', 'DEMANTELLEMENT', 'Apport', 'S1', 'T2', 55.0, 1.5, 1),
+]
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Point the dump databases, result cache and lock files to a temporary directory."""
+    from api import concurrency
+
+    monkeypatch.setattr(db, '_data_dir', lambda: tmp_path)
+    monkeypatch.setattr(cache, '_disk_cache_dir', lambda: tmp_path / 'cache')
+    monkeypatch.setattr(concurrency, '_slots_dir', lambda: _mkdir(tmp_path / 'locks'))
+    cache.clear_cache()
+    yield tmp_path
+    cache.clear_cache()
+
+
+def _mkdir(path):
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@pytest.fixture
+def dump_db(data_dir):
+    """Seed the YEAR database with ROWS (one imported file)."""
+    init_dump_db(YEAR)
+    with get_dump_connection(YEAR) as conn:
+        cursor = conn.execute(
+            """
+            INSERT INTO import_dump_files (filename, file_hash, imported_at, row_count, sheet_count)
+            VALUES ('seed.xlsx', 'seed', '2030-03-01T00:00:00', ?, 1)
+            """,
+            (len(ROWS),)
+        )
+        conn.executemany(
+            """
+            INSERT INTO raw_dump (file_id, row_index, date, lieu_collecte, categorie, sous_categorie, flux,
+                                  orientation, origine, secteur_collecte, tournee, poids, volume_m3, nombre)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(cursor.lastrowid, index) + row for index, row in enumerate(ROWS)]
+        )
+        conn.commit()
+    return YEAR
+
+
+@pytest.fixture
+def client(dump_db):
+    from app import create_app
+
+    app = create_app()
+    app.config['TESTING'] = True
+    return app.test_client()
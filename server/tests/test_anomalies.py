@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.dump_stats_service import _detect_anomalies, _window_median_mad
+
+
+DAYS = pd.date_range('2030-01-01', periods=84, freq='D')
+
+
+def _matrix():
+    rng = np.random.default_rng(0)
+    open_days = DAYS.dayofweek < 5
+    columns = {
+        # Regular daily flux with one spike and one missing day
+        ('Sanssac', 'MEUBLES'): 100 + rng.normal(0, 5, len(DAYS)),
+        # Regular flux that stopped for one day while the site stayed open
+        ('Sanssac', 'TLC'): np.where(np.arange(len(DAYS)) == 30, 0, 50 + rng.normal(0, 2, len(DAYS))),
+        # Site closed every weekend
+        ('Polignac', 'MEUBLES'): np.where(open_days, 60 + rng.normal(0, 1, len(DAYS)), 0),
+        ('Polignac', 'TLC'): np.where(open_days, 40 + rng.normal(0, 1, len(DAYS)), 0),
+        # Site normally closed: open on Wednesdays and Saturdays only
+        ('Yssingeaux', 'MEUBLES'): np.where(np.isin(DAYS.dayofweek, [2, 5]), 90 + rng.normal(0, 2, len(DAYS)), 0),
+    }
+    columns[('Sanssac', 'MEUBLES')][50] = 600
+    columns[('Sanssac', 'MEUBLES')][70] = 0
+    matrix = pd.DataFrame(columns, index=DAYS)
+    matrix.columns.names = ['dechetterie', 'flux']
+    return matrix
+
+
+def test_window_mad_is_taken_around_the_window_median():
+    values = np.array([[1.0], [2.0], [3.0], [10.0], [0.0]])
+    median, mad, zero_share = _window_median_mad(values, window=4, min_periods=3)
+
+    assert np.isnan(median[2, 0])
+    assert median[3, 0] == 2.0 and mad[3, 0] == 1.0
+    # Window 1, 2, 3, 10: median 2.5, deviations 1.5, 0.5, 0.5, 7.5
+    assert median[4, 0] == 2.5 and mad[4, 0] == 1.0
+    assert zero_share[4, 0] == 0
+
+
+def test_known_spike_and_missing_day_only():
+    anomalies = _detect_anomalies(_matrix())
+
+    flagged = {(a['date'], a['dechetterie'], a['flux'], a['type']) for a in anomalies}
+    assert flagged == {
+        (DAYS[50].strftime('%Y-%m-%d'), 'Sanssac', 'MEUBLES', 'spike'),
+        (DAYS[70].strftime('%Y-%m-%d'), 'Sanssac', 'MEUBLES', 'zero'),
+        (DAYS[30].strftime('%Y-%m-%d'), 'Sanssac', 'TLC', 'zero'),
+    }
+    assert anomalies[0]['type'] == 'spike'
+    assert anomalies[0]['expected'] == pytest.approx(100, abs=5)
@@ -0,0 +1,30 @@
+from services import cache
+from services.cache import cached_for_version
+
+from tests.conftest import YEAR
+
+
+def test_per_query_entries_do_not_evict_stats(data_dir):
+    calls = []
+
+    def stats():
+        calls.append('stats')
+        return {'total': 1}
+
+    cached_for_version('dump_stats', YEAR, stats)
+    for index in range(cache.NAMESPACE_MAX_ENTRIES['aggregate'] + 10):
+        cached_for_version('aggregate', YEAR, lambda: index, {'limit': index})
+    cached_for_version('dump_stats', YEAR, stats)
+
+    assert calls == ['stats']
+    assert len(cache._entries['aggregate']) == cache.NAMESPACE_MAX_ENTRIES['aggregate']
+
+
+def test_clear_cache_for_one_year(data_dir):
+    cached_for_version('dump_stats', YEAR, lambda: 1)
+    cached_for_version('dump_stats', YEAR + 1, lambda: 2)
+
+    cache.clear_cache(YEAR)
+
+    assert cached_for_version('dump_stats', YEAR, lambda: 3) == 3
+    assert cached_for_version('dump_stats', YEAR + 1, lambda: 4) == 2
@@ -0,0 +1,18 @@
+import pytest
+
+from services.columnar import MAX_PRECISION, parse_precision
+
+from tests.conftest import YEAR
+
+
+def test_parse_precision_is_clamped():
+    assert parse_precision('-3') == 0
+    assert parse_precision('99') == MAX_PRECISION
+
+
+@pytest.mark.parametrize('path', ['stats', 'stats/advanced/series'])
+def test_invalid_precision_is_a_bad_request(client, path):
+    response = client.get(f'/api/db/dump/{path}?year={YEAR}&format=columnar&precision=abc')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Paramètres invalides'
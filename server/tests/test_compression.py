@@ -0,0 +1,42 @@
+import gzip
+import itertools
+import json
+
+from api import compression
+from api import db as db_api
+
+from tests.conftest import YEAR
+
+
+def _gunzip_json(response):
+    assert response.headers['Content-Encoding'] == 'gzip'
+    return json.loads(gzip.decompress(response.get_data()))
+
+
+def test_volatile_timings_are_not_served_from_compressed_cache(client, monkeypatch):
+    calls = itertools.count()
+
+    def fake_bundle(year, **kwargs):
+        return {'series': ['x' * 2048], 'timings_ms': {'total': next(calls)}}
+
+    monkeypatch.setattr(db_api, 'get_advanced_bundle', fake_bundle)
+    url = f'/api/db/dump/stats/advanced/bundle?year={YEAR}'
+    headers = {'Accept-Encoding': 'gzip'}
+
+    first = _gunzip_json(client.get(url, headers=headers))
+    second = _gunzip_json(client.get(url, headers=headers))
+
+    assert first['data']['timings_ms'] == {'total': 0}
+    assert second['data']['timings_ms'] == {'total': 1}
+
+
+def test_stable_payload_is_compressed_once(client, monkeypatch):
+    url = f'/api/db/dump/raw?year={YEAR}&limit=50'
+    headers = {'Accept-Encoding': 'gzip'}
+    first = client.get(url, headers=headers)
+    assert first.headers['Content-Encoding'] == 'gzip'
+
+    monkeypatch.setattr(compression, '_compress', lambda data, encoding: (_ for _ in ()).throw(AssertionError))
+    second = client.get(url, headers=headers)
+
+    assert second.get_data() == first.get_data()
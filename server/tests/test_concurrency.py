@@ -0,0 +1,61 @@
+import pytest
+
+from api import concurrency
+from services.cache import ComputeRejected, cached_for_version, reset_compute_guard, set_compute_guard
+
+from tests.conftest import YEAR
+
+
+@pytest.fixture
+def single_slot(monkeypatch):
+    monkeypatch.setattr(concurrency, 'HEAVY_MAX_CONCURRENT', 1)
+
+
+def test_busy_only_when_a_computation_must_start(client, single_slot):
+    url = f'/api/db/dump/stats/heatmap/flux?year={YEAR}'
+
+    with concurrency._heavy_slot() as acquired:
+        assert acquired
+        busy = client.get(url)
+    assert busy.status_code == 503
+    assert busy.headers['Retry-After'] == str(concurrency.RETRY_AFTER_SECONDS)
+
+    assert client.get(url).status_code == 200
+    # Cached result: served even while every slot is taken
+    with concurrency._heavy_slot():
+        assert client.get(url).status_code == 200
+
+
+def test_guard_wraps_outer_computation_only(data_dir):
+    entered = []
+
+    class Guard:
+        def __enter__(self):
+            entered.append(True)
+
+        def __exit__(self, *exc):
+            return False
+
+    def outer():
+        return cached_for_version('inner', YEAR, lambda: 1) + 1
+
+    token = set_compute_guard(Guard)
+    try:
+        assert cached_for_version('outer', YEAR, outer) == 2
+        assert cached_for_version('outer', YEAR, outer) == 2
+    finally:
+        reset_compute_guard(token)
+    assert entered == [True]
+
+
+def test_rejected_computation_is_not_cached(data_dir):
+    def reject():
+        raise ComputeRejected('busy')
+
+    token = set_compute_guard(reject)
+    try:
+        with pytest.raises(ComputeRejected):
+            cached_for_version('outer', YEAR, lambda: 1)
+    finally:
+        reset_compute_guard(token)
+    assert cached_for_version('outer', YEAR, lambda: 3) == 3
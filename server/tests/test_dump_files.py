@@ -0,0 +1,17 @@
+from api import db as db_api
+from services.db import get_dump_connection
+
+from tests.conftest import YEAR
+
+
+def test_remove_succeeds_when_report_refresh_fails(client, monkeypatch):
+    def failing_refresh(year):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(db_api, 'refresh_stale_report', failing_refresh)
+    response = client.delete(f'/api/db/dump/files/1?year={YEAR}')
+
+    assert response.status_code == 200
+    assert response.get_json()['success']
+    with get_dump_connection(YEAR) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM raw_dump").fetchone()[0] == 0
@@ -0,0 +1,54 @@
+from collections import defaultdict
+
+import pytest
+
+from mappings import map_category_to_collectes
+
+from tests.conftest import ROWS, YEAR
+
+
+# Raw dimension -> index of its column in ROWS
+RAW_DIMENSIONS = {'flux': 4, 'orientation': 5, 'origine': 6, 'secteur': 7, 'tournee': 8}
+
+
+def _category(row):
+    return map_category_to_collectes(row[2], row[3], row[4], row[5]) or 'AUTRES'
+
+
+def _aggregate(client, query):
+    response = client.get(f'/api/db/dump/aggregate?year={YEAR}&{query}')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']
+
+
+@pytest.mark.parametrize('dimension', sorted(RAW_DIMENSIONS))
+def test_raw_dimension_with_category(client, dimension):
+    data = _aggregate(client, f'dimensions={dimension},category')
+
+    expected = defaultdict(float)
+    for row in ROWS:
+        expected[(row[RAW_DIMENSIONS[dimension]], _category(row))] += row[9]
+    assert data['source'] == 'raw'
+    assert {(row[dimension], row['category']): row['sum_poids'] for row in data['rows']} == expected
+
+
+@pytest.mark.parametrize('dimension', sorted(RAW_DIMENSIONS))
+def test_raw_dimension_with_category_filter(client, dimension):
+    category = _category(ROWS[0])
+    data = _aggregate(client, f'dimensions=month,{dimension}&category={category}&order=-sum_poids')
+
+    expected = defaultdict(float)
+    for row in ROWS:
+        if _category(row) == category:
+            expected[(row[0][:7], row[RAW_DIMENSIONS[dimension]])] += row[9]
+    assert {(row['month'], row[dimension]): row['sum_poids'] for row in data['rows']} == expected
+    weights = [row['sum_poids'] for row in data['rows']]
+    assert weights == sorted(weights, reverse=True)
+
+
+def test_partials_order_by_measure(client):
+    data = _aggregate(client, 'dimensions=dechetterie&measures=sum:poids,count&order=-count')
+
+    assert data['source'] == 'partials'
+    assert [row['count'] for row in data['rows']] == [3, 2]
+    assert sum(row['sum_poids'] for row in data['rows']) == sum(row[9] for row in ROWS)
@@ -0,0 +1,26 @@
+from api import http_cache
+
+from tests.conftest import YEAR
+
+
+def test_etag_revalidation_without_last_modified(client):
+    url = f'/api/db/dump/stats/advanced/category?year={YEAR}'
+    response = client.get(url)
+    etag = response.headers['ETag']
+
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response.headers
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    # If-Modified-Since alone is no longer a validator
+    assert client.get(url, headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}).status_code == 200
+
+
+def test_etag_changes_with_build_version(client, monkeypatch):
+    url = f'/api/db/dump/stats/advanced/category?year={YEAR}'
+    etag = client.get(url).headers['ETag']
+
+    monkeypatch.setattr(http_cache, 'BUILD_VERSION', 'next-deploy')
+    response = client.get(url, headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
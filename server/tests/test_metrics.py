@@ -0,0 +1,79 @@
+import subprocess
+import sys
+import time
+
+from services import metrics
+
+
+def _samples(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_histogram_exposition_uses_exact_bounds():
+    labels = {'route': '/tests/histogram'}
+    metrics.observe('http_response_size_bytes', 2 * 1024 * 1024, labels=labels, buckets=metrics.SIZE_BUCKETS)
+    metrics.observe('http_response_size_bytes', 512, labels=labels, buckets=metrics.SIZE_BUCKETS)
+
+    text = metrics.render_prometheus()
+    prefix = 'http_response_size_bytes'
+    selector = 'route="/tests/histogram"'
+
+    assert _samples(text, f'{prefix}_bucket{{{selector},') == [
+        f'{prefix}_bucket{{{selector},le="1024"}} 1',
+        f'{prefix}_bucket{{{selector},le="10240"}} 1',
+        f'{prefix}_bucket{{{selector},le="102400"}} 1',
+        f'{prefix}_bucket{{{selector},le="1048576"}} 1',
+        f'{prefix}_bucket{{{selector},le="10485760"}} 2',
+        f'{prefix}_bucket{{{selector},le="+Inf"}} 2',
+    ]
+    assert f'{prefix}_count{{{selector}}} 2' in text
+    assert f'{prefix}_sum{{{selector}}} {2 * 1024 * 1024 + 512}' in text
+    assert '# TYPE http_response_size_bytes histogram' in text
+
+
+def test_latency_bounds_keep_decimal_form():
+    labels = {'method': 'GET', 'route': '/tests/latency'}
+    metrics.observe('http_request_duration_seconds', 0.003, labels=labels)
+
+    text = metrics.render_prometheus()
+    buckets = _samples(text, 'http_request_duration_seconds_bucket{method="GET",route="/tests/latency",')
+
+    assert buckets[0] == 'http_request_duration_seconds_bucket{method="GET",route="/tests/latency",le="0.005"} 1'
+    assert 'le="2.5"' in buckets[8] and 'le="30"' in buckets[11]
+    assert len(buckets) == len(metrics.LATENCY_BUCKETS) + 1
+
+
+def _stored(sql, params=()):
+    conn = metrics._connect()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_idle_process_flushes_in_background():
+    labels = {'namespace': 'tests', 'result': 'idle'}
+    metrics.inc('dump_cache_requests_total', labels=labels)
+
+    key = metrics._label_key(labels)
+    deadline = time.monotonic() + 20 * metrics.FLUSH_INTERVAL
+    while not _stored("SELECT value FROM metric_values WHERE labels = ?", (key,)):
+        assert time.monotonic() < deadline
+        time.sleep(metrics.FLUSH_INTERVAL / 4)
+
+
+def test_dead_process_gauges_are_deleted():
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    conn = metrics._connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO metric_gauges (name, labels, pid, value) VALUES ('http_requests_in_flight', '', ?, 3)",
+            (dead.pid,)
+        )
+    conn.close()
+
+    text = metrics.render_prometheus()
+
+    assert _stored("SELECT value FROM metric_gauges WHERE pid = ?", (dead.pid,)) == []
+    assert 'http_requests_in_flight 3' not in text
@@ -0,0 +1,54 @@
+import shutil
+import sqlite3
+
+from services.db import get_dump_connection, get_dump_db_path
+from services.dump_ingest_service import remove_dump_file
+from services.query_executor import run_queries
+
+from tests.conftest import ROWS, YEAR
+
+
+COUNT = {'rows': ("SELECT COUNT(*) FROM raw_dump", (), 'one')}
+
+
+def _count():
+    results, _ = run_queries(YEAR, COUNT)
+    return results['rows'][0]
+
+
+def test_reads_after_reimport(dump_db):
+    assert _count() == len(ROWS)
+
+    remove_dump_file(1, year=YEAR)
+    assert _count() == 0
+
+    with get_dump_connection(YEAR) as conn:
+        cursor = conn.execute(
+            """
+            INSERT INTO import_dump_files (filename, file_hash, imported_at, row_count, sheet_count)
+            VALUES ('seed.xlsx', 'seed-v2', '2030-04-01T00:00:00', 1, 1)
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO raw_dump (file_id, row_index, date, lieu_collecte, categorie, sous_categorie, flux,
+                                  orientation, origine, secteur_collecte, tournee, poids, volume_m3, nombre)
+            VALUES (?, 0, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (cursor.lastrowid,) + ROWS[0]
+        )
+        conn.commit()
+    assert _count() == 1
+
+
+def test_reads_after_database_file_replaced(dump_db, tmp_path):
+    assert _count() == len(ROWS)
+
+    db_path = get_dump_db_path(YEAR)
+    replacement = tmp_path / 'replacement.db'
+    shutil.copy(db_path, replacement)
+    with sqlite3.connect(str(replacement)) as conn:
+        conn.execute("DELETE FROM raw_dump WHERE poids < 20")
+    replacement.replace(db_path)
+
+    assert _count() == 3
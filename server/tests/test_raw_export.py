@@ -0,0 +1,24 @@
+import csv
+import io
+import json
+
+from tests.conftest import ROWS, YEAR
+
+
+def test_csv_export_headers_and_rows(client):
+    response = client.get(f'/api/db/dump/raw/export?year={YEAR}&format=csv&gzip=0')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/csv; charset=utf-8'
+    assert response.headers['Content-Disposition'] == f'attachment; filename="dump-{YEAR}.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == len(ROWS)
+
+
+def test_ndjson_export_headers_and_rows(client):
+    response = client.get(f'/api/db/dump/raw/export?year={YEAR}&format=ndjson&gzip=0&fields=date,poids')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/x-ndjson; charset=utf-8'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['poids'] for line in lines] == [row[9] for row in ROWS]
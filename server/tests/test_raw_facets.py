@@ -0,0 +1,32 @@
+import pytest
+
+from services.db import get_dump_connection
+
+from tests.conftest import YEAR
+
+
+@pytest.fixture
+def accented_row(dump_db):
+    with get_dump_connection(YEAR) as conn:
+        conn.execute(
+            """
+            INSERT INTO raw_dump (file_id, row_index, date, lieu_collecte, categorie, flux, poids)
+            VALUES (1, 99, '2030-03-02', 'DÉCHETTERIE Yssingeaux', '4.MEUBLES', 'MEUBLES', 3.0)
+            """
+        )
+        conn.commit()
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('q=déchetterie', 0),
+    ('q=DÉCHETTERIE', 1),
+    ('q=dÉchetterie', 1),
+    ('lieu_collecte=yssingeaux', 1),
+    ('lieu_collecte=éCHETTERIE', 0),
+])
+def test_facet_counts_match_rows_with_accents(client, accented_row, query, expected):
+    rows = client.get(f'/api/db/dump/raw?year={YEAR}&count=1&{query}').get_json()
+    facets = client.get(f'/api/db/dump/raw/options?year={YEAR}&{query}').get_json()['facets']
+
+    assert rows['total'] == expected
+    assert sum(entry['count'] for entry in facets['flux']) == expected
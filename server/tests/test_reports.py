@@ -0,0 +1,86 @@
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+
+from api import db as db_api
+from services import report_service
+
+from tests.conftest import YEAR
+
+
+@pytest.fixture
+def output_dir(data_dir, monkeypatch):
+    path = data_dir / 'output'
+    path.mkdir()
+    monkeypatch.setattr(report_service, 'get_output_dir', lambda: path)
+    monkeypatch.setattr(db_api, 'get_output_dir', lambda: path)
+    monkeypatch.setattr(report_service, '_jobs_dir', lambda: _mkdir(data_dir / 'jobs'))
+    return path
+
+
+def _mkdir(path):
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _generate(client):
+    response = client.post(f'/api/reports/collectes?year={YEAR}')
+    assert response.status_code == 202
+    job = response.get_json()['job']
+    deadline = time.monotonic() + 60
+    while job['state'] == 'running':
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+        job = client.get(f'/api/reports/jobs/{job["id"]}').get_json()['job']
+    return job
+
+
+def test_job_flow_then_version_keyed_cache_hit(client, output_dir):
+    job = _generate(client)
+
+    assert job['state'] == 'done', job.get('error')
+    assert job['report']['up_to_date']
+    report_path = output_dir / job['report']['filename']
+    assert report_path.exists()
+    assert (output_dir / f"{report_path.name}.version").read_text(encoding='utf-8') == job['version']
+    assert not list(output_dir.glob('*.version.*.tmp'))
+
+    cached = client.post(f'/api/reports/collectes?year={YEAR}')
+    assert cached.status_code == 200
+    assert cached.get_json()['cached'] is True
+    assert cached.get_json()['download_url'] == job['download_url']
+
+    # Another data version: the workbook is generated again
+    (output_dir / f"{report_path.name}.version").write_text('older-version', encoding='utf-8')
+    assert _generate(client)['state'] == 'done'
+
+
+def test_download_supports_ranges(client, output_dir):
+    job = _generate(client)
+    url = job['download_url']
+    full = client.get(url).get_data()
+
+    partial = client.get(url, headers={'Range': 'bytes=0-9'})
+
+    assert partial.status_code == 206
+    assert partial.get_data() == full[:10]
+    assert partial.headers['Content-Range'] == f'bytes 0-9/{len(full)}'
+
+
+def test_job_of_a_dead_process_is_reported_failed(client, output_dir):
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    job = {
+        'id': 'deadbeef', 'year': YEAR, 'version': 'v', 'force': False,
+        'state': 'running', 'pid': dead.pid, 'started_at': None, 'finished_at': None
+    }
+    (report_service._jobs_dir() / 'deadbeef.json').write_text(json.dumps(job), encoding='utf-8')
+
+    response = client.get('/api/reports/jobs/deadbeef')
+
+    assert response.status_code == 200
+    assert response.get_json()['job']['state'] == 'error'
+    assert report_service.get_job('deadbeef')['state'] == 'error'
@@ -0,0 +1,38 @@
+from services.db import get_dump_connection
+from services.dump_rollup_service import MAPPING_FINGERPRINT_KEY, get_mapping_fingerprint
+
+from tests.conftest import ROWS, YEAR
+
+
+def _fingerprint():
+    with get_dump_connection(YEAR) as conn:
+        return conn.execute("SELECT value FROM dump_meta WHERE key = ?", (MAPPING_FINGERPRINT_KEY,)).fetchone()[0]
+
+
+def _set_fingerprint(value):
+    with get_dump_connection(YEAR) as conn:
+        conn.execute("UPDATE dump_meta SET value = ? WHERE key = ?", (value, MAPPING_FINGERPRINT_KEY))
+        conn.commit()
+
+
+def test_app_startup_builds_rollups(client):
+    assert _fingerprint() == get_mapping_fingerprint()
+    with get_dump_connection(YEAR) as conn:
+        assert conn.execute("SELECT SUM(row_count) FROM dump_stats_partials").fetchone()[0] == len(ROWS)
+
+
+def test_read_paths_do_not_rebuild_rollups(client):
+    _set_fingerprint('outdated')
+
+    assert client.get(f'/api/db/dump/stats?year={YEAR}').status_code == 200
+    assert client.get(f'/api/db/dump/aggregate?year={YEAR}&dimensions=category').status_code == 200
+    assert _fingerprint() == 'outdated'
+
+
+def test_rollups_rebuilt_at_next_startup(client):
+    _set_fingerprint('outdated')
+
+    from app import create_app
+    create_app()
+
+    assert _fingerprint() == get_mapping_fingerprint()
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 1500))
+LAZY_MODULES = ('pandas', 'numpy', 'openpyxl')
+
+# Import, create_app() and first /api/status response in a fresh interpreter
+PROBE = """
+import json, sys
+from pathlib import Path
+from time import perf_counter
+started = perf_counter()
+import services.db
+services.db._data_dir = lambda: Path(sys.argv[1])
+from app import create_app
+imported = perf_counter()
+app = create_app()
+created = perf_counter()
+response = app.test_client().get('/api/status')
+answered = perf_counter()
+print(json.dumps({
+    'total_ms': (answered - started) * 1000,
+    'status': response.status_code,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def test_startup_within_budget(tmp_path):
+    env = dict(os.environ, LOG_LEVEL='WARNING', WARMUP_ENABLED='0')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, str(tmp_path)],
+        cwd=SERVER_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result['status'] == 200
+    assert result['loaded'] == []
+    assert result['total_ms'] <= BUDGET_MS, f"démarrage en {result['total_ms']:.0f} ms (budget {BUDGET_MS:g} ms)"
+
+
+def test_invalid_log_level_falls_back_to_info(data_dir, monkeypatch, caplog):
+    from app import create_app
+
+    monkeypatch.setenv('LOG_LEVEL', 'verbose')
+    app = create_app()
+
+    assert app.test_client().get('/api/status').status_code == 200
+    assert 'LOG_LEVEL invalide (VERBOSE)' in caplog.text
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from services import warmup
+
+from tests.conftest import YEAR
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(warmup, 'WARMUP_ENABLED', True)
+    monkeypatch.setattr(warmup, '_pending', None)
+    monkeypatch.setitem(warmup._state, 'state', 'idle')
+
+
+def _wait_finished():
+    deadline = time.monotonic() + 5
+    while warmup.get_warmup_status()['state'] == 'running':
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return warmup.get_warmup_status()
+
+
+def test_failed_pass_ends_in_error_and_does_not_block_later_passes(enabled, dump_db, monkeypatch):
+    def broken_years(years=None):
+        raise RuntimeError('disque indisponible')
+
+    monkeypatch.setattr(warmup, '_recent_years', broken_years)
+    assert warmup.start_warmup('boot')
+    status = _wait_finished()
+    assert status['state'] == 'error'
+    assert status['error'] == 'disque indisponible'
+
+    monkeypatch.setattr(warmup, '_warmup_tasks', lambda: [('noop', lambda year: None)])
+    monkeypatch.setattr(warmup, '_recent_years', lambda years=None: [YEAR])
+    assert warmup.start_warmup('import', [YEAR])
+    status = _wait_finished()
+    assert status['state'] == 'done'
+    assert status['tasks'] == [{'year': YEAR, 'name': 'noop', 'ms': status['tasks'][0]['ms']}]
+
+
+def test_request_during_a_pass_is_replayed(enabled, dump_db, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_task(year):
+        calls.append(year)
+        release.wait(5)
+
+    monkeypatch.setattr(warmup, '_warmup_tasks', lambda: [('slow', slow_task)])
+    assert warmup.start_warmup('boot')
+    assert warmup.start_warmup('import', [YEAR])
+    assert warmup.get_warmup_status()['state'] == 'running'
+
+    release.set()
+    status = _wait_finished()
+
+    assert status['state'] == 'done'
+    assert status['reason'] == 'import'
+    assert calls == [YEAR, YEAR]
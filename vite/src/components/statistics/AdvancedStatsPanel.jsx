@@ -2,17 +2,16 @@ import React, { useEffect, useMemo, useState } from 'react';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '../ui/card';
 import { Button } from '../ui/button';
 import { Loader2 } from 'lucide-react';
-import {
-  getDumpTimeSeries,
-  getDumpCategoryStats,
-  getDumpFluxOrientationMatrix,
-  getDumpAnomalies,
-  getDumpMissingDays,
-  getDumpComparison
-} from '../../services/api';
+import { getDumpAdvancedBundle } from '../../services/api';
 import MonthlyLineChart from './MonthlyLineChart';
 import { formatKg, formatExactDate } from '../../utils/statistics';
 
+const ANOMALY_LABELS = {
+  spike: 'Pic',
+  drop: 'Chute',
+  zero: 'Zéro'
+};
+
 const AdvancedStatsPanel = ({ year }) => {
   const [granularity, setGranularity] = useState('day');
   const [series, setSeries] = useState([]);
@@ -26,20 +25,14 @@ const AdvancedStatsPanel = ({ year }) => {
   const loadAll = async () => {
     setLoading(true);
     try {
-      const [seriesRes, catRes, fluxRes, anomaliesRes, missingRes, compRes] = await Promise.all([
-        getDumpTimeSeries(granularity, year),
-        getDumpCategoryStats(year),
-        getDumpFluxOrientationMatrix(year),
-        getDumpAnomalies(10, year),
-        getDumpMissingDays(year),
-        getDumpComparison(year)
-      ]);
-      setSeries(seriesRes.data || []);
-      setCategoryStats(catRes.data || []);
-      setFluxMatrix(fluxRes.data || []);
-      setAnomalies(anomaliesRes.data || []);
-      setMissingDays(missingRes.data || []);
-      setComparison(compRes.data || []);
+      const result = await getDumpAdvancedBundle(granularity, year);
+      const data = result.data || {};
+      setSeries(data.series || []);
+      setCategoryStats(data.category || []);
+      setFluxMatrix(data.flux_orientation || []);
+      setAnomalies(data.anomalies || []);
+      setMissingDays(data.missing_days || []);
+      setComparison(data.comparison || []);
     } finally {
       setLoading(false);
     }
@@ -175,15 +168,19 @@ const AdvancedStatsPanel = ({ year }) => {
 
           <Card>
             <CardHeader>
-              <CardTitle className="text-base">Anomalies (pics)</CardTitle>
-              <CardDescription className="text-xs">Top 10 jours les plus élevés</CardDescription>
+              <CardTitle className="text-base">Anomalies</CardTitle>
+              <CardDescription className="text-xs">Pics, chutes et jours à zéro (écart à la médiane glissante)</CardDescription>
             </CardHeader>
             <CardContent>
               <div className="space-y-2">
                 {anomalies.map((row, idx) => (
-                  <div key={`${row.date}-${row.dechetterie}-${idx}`} className="flex justify-between text-sm">
-                    <span>{formatExactDate(row.date)} · {row.dechetterie} · {row.flux}</span>
-                    <span className="tabular-nums">{formatKg(row.total)} kg</span>
+                  <div key={`${row.date}-${row.dechetterie}-${row.flux}-${idx}`} className="flex justify-between text-sm">
+                    <span>
+                      {ANOMALY_LABELS[row.type] || row.type} · {formatExactDate(row.date)} · {row.dechetterie} · {row.flux}
+                    </span>
+                    <span className="tabular-nums">
+                      {formatKg(row.total)} kg (attendu {formatKg(row.expected)} kg, score {row.score})
+                    </span>
                   </div>
                 ))}
               </div>
@@ -193,14 +190,23 @@ const AdvancedStatsPanel = ({ year }) => {
           <Card>
             <CardHeader>
               <CardTitle className="text-base">Jours manquants</CardTitle>
-              <CardDescription className="text-xs">Nombre de jours sans collecte</CardDescription>
+              <CardDescription className="text-xs">Jours d'ouverture sans collecte (hors fermetures et jours fériés)</CardDescription>
             </CardHeader>
             <CardContent>
               <div className="space-y-2">
                 {missingDays.map((row) => (
-                  <div key={row.dechetterie} className="flex justify-between text-sm">
-                    <span>{row.dechetterie}</span>
-                    <span className="tabular-nums">{row.missing_days.length}</span>
+                  <div key={row.dechetterie} className="text-sm">
+                    <div className="flex justify-between">
+                      <span>{row.dechetterie}</span>
+                      <span className="tabular-nums">{row.missing_count}</span>
+                    </div>
+                    {row.missing_ranges.slice(0, 5).map((range) => (
+                      <div key={range.start} className="text-xs text-muted-foreground">
+                        {range.length > 1
+                          ? `${formatExactDate(range.start)} → ${formatExactDate(range.end)} (${range.length} j)`
+                          : formatExactDate(range.start)}
+                      </div>
+                    ))}
                   </div>
                 ))}
               </div>
@@ -4,7 +4,7 @@ import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '../..
 import { Alert, AlertDescription } from '../../ui/alert';
 import { Table, BarChart3, LineChart as LineChartIcon, PieChart as PieChartIcon } from 'lucide-react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
-import { getDumpCategoryStats } from '../../../services/api';
+import { getDumpCategoryStats, getDumpCalendarHeatmap, decodeCalendarHeatmap } from '../../../services/api';
 import OverviewCards from '../OverviewCards';
 import StatsTable, { MultiColumnStatsTable } from '../StatsTable';
 import MonthlyLineChart from '../MonthlyLineChart';
@@ -43,6 +43,22 @@ const GlobalOverview = ({ stats, datasetYear, selectedYear }) => {
     loadCategoryStats();
   }, [selectedYear, datasetYear]);
 
+  const [calendarSeries, setCalendarSeries] = useState({});
+
+  useEffect(() => {
+    const loadCalendarHeatmap = async () => {
+      try {
+        const result = await getDumpCalendarHeatmap(selectedYear || datasetYear || 2025, 'category');
+        if (result?.success && result.data) {
+          setCalendarSeries(decodeCalendarHeatmap(result.data));
+        }
+      } catch (error) {
+        // Ignore errors
+      }
+    };
+    loadCalendarHeatmap();
+  }, [selectedYear, datasetYear]);
+
   // Vérification de sécurité
   if (!stats || !stats.global_totals) {
     return (
@@ -384,15 +400,7 @@ const GlobalOverview = ({ stats, datasetYear, selectedYear }) => {
                     key={cat}
                     title={cat}
                     description={`Poids journalier (kg) • ${datasetYearLabel}${explicitRangeLabel ? ` • ${explicitRangeLabel}` : ''}`}
-                    series={Object.fromEntries(
-                      (stats.months_order || []).map((date) => [
-                        date,
-                        Object.values(stats.dechetteries || {}).reduce(
-                          (sum, d) => sum + (d.months?.[date]?.[cat] || 0),
-                          0
-                        )
-                      ])
-                    )}
+                    series={calendarSeries[cat] || {}}
                     dateRange={{ start: stats.date_start, end: stats.date_end }}
                   />
                 ))}
@@ -403,15 +411,7 @@ const GlobalOverview = ({ stats, datasetYear, selectedYear }) => {
                     key={flux}
                     title={flux}
                     description={`Poids journalier (kg) • ${datasetYearLabel}${explicitRangeLabel ? ` • ${explicitRangeLabel}` : ''}`}
-                    series={Object.fromEntries(
-                      (stats.months_order || []).map((date) => [
-                        date,
-                        Object.values(stats.dechetteries || {}).reduce(
-                          (sum, d) => sum + (d.months?.[date]?.[flux] || 0),
-                          0
-                        )
-                      ])
-                    )}
+                    series={calendarSeries[flux] || {}}
                     dateRange={{ start: stats.date_start, end: stats.date_end }}
                   />
                 ))}
@@ -12,9 +12,13 @@ import {
   listOutputFiles,
   downloadOutputFile,
   listInputFiles,
-  uploadInputFile
+  uploadInputFile,
+  generateCollectesReport,
+  getReportJob
 } from '../services/api';
-import { RefreshCw, Database, Download, Upload } from 'lucide-react';
+import { RefreshCw, Database, Download, Upload, FileSpreadsheet } from 'lucide-react';
+
+const REPORT_POLL_INTERVAL_MS = 2000;
 
 function ImportPage() {
   const [serverStatus, setServerStatus] = useState('checking');
@@ -31,6 +35,7 @@ function ImportPage() {
   const [fileLoading, setFileLoading] = useState(false);
   const [fileMessage, setFileMessage] = useState(null);
   const [fileType, setFileType] = useState('info');
+  const [reportLoading, setReportLoading] = useState(false);
   const fileInputRef = React.useRef(null);
 
   useEffect(() => {
@@ -123,6 +128,41 @@ function ImportPage() {
     }
   };
 
+  const handleGenerateReport = async () => {
+    setReportLoading(true);
+    setFileMessage(`Génération du rapport COLLECTES ${dumpYear} en cours...`);
+    setFileType('info');
+    try {
+      const result = await generateCollectesReport(dumpYear);
+      let report = result.report;
+      if (!result.cached) {
+        // Background job: poll until the workbook is written
+        let job = result.job;
+        while (job.state === 'running') {
+          await new Promise((resolve) => setTimeout(resolve, REPORT_POLL_INTERVAL_MS));
+          job = (await getReportJob(job.id)).job;
+        }
+        if (job.state !== 'done') {
+          throw new Error(job.error || 'Erreur lors de la génération du rapport');
+        }
+        report = job.report;
+      }
+      const output = await listOutputFiles();
+      if (output?.success) setOutputFiles(output.files || []);
+      setFileMessage(
+        result.cached
+          ? `Rapport ${report.filename} déjà à jour`
+          : `Rapport ${report.filename} généré avec succès`
+      );
+      setFileType('success');
+    } catch (error) {
+      setFileMessage(error.message || 'Erreur lors de la génération du rapport');
+      setFileType('error');
+    } finally {
+      setReportLoading(false);
+    }
+  };
+
   const handleDownloadOutputFile = async (filename) => {
     setFileLoading(true);
     try {
@@ -271,6 +311,14 @@ function ImportPage() {
               </CardDescription>
             </CardHeader>
             <CardContent className="space-y-4">
+              <Button
+                onClick={handleGenerateReport}
+                disabled={reportLoading || serverStatus === 'offline'}
+                size="sm"
+              >
+                <FileSpreadsheet className="mr-2 h-4 w-4" />
+                {reportLoading ? 'Génération en cours...' : `Générer le rapport COLLECTES ${dumpYear}`}
+              </Button>
               {outputFiles.length > 0 ? (
                 <div className="space-y-2">
                   {outputFiles.map((file) => (
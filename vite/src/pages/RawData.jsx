@@ -3,8 +3,14 @@ import GlobalHeader from '../components/GlobalHeader';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { Alert, AlertDescription } from '../components/ui/alert';
-import { Loader2, ChevronLeft, ChevronRight } from 'lucide-react';
-import { getDumpAvailableYears, getDumpStatus, getDumpRawData, getDumpRawDataOptions } from '../services/api';
+import { Loader2, ChevronLeft, ChevronRight, Download } from 'lucide-react';
+import {
+  getDumpAvailableYears,
+  getDumpStatus,
+  getDumpRawData,
+  getDumpRawDataOptions,
+  getDumpRawExportUrl
+} from '../services/api';
 import { formatExactDate } from '../utils/statistics';
 import { Input } from '../components/ui/input';
 import {
@@ -23,6 +29,8 @@ const RawData = () => {
   const [items, setItems] = useState([]);
   const [total, setTotal] = useState(0);
   const [offset, setOffset] = useState(0);
+  const [pageCursor, setPageCursor] = useState(null);
+  const [cursors, setCursors] = useState({ next: null, prev: null });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [availableYears, setAvailableYears] = useState([]);
@@ -61,20 +69,47 @@ const RawData = () => {
     source_sheet: []
   });
 
+  const [facetCounts, setFacetCounts] = useState({});
+
   const [pageSize, setPageSize] = useState(50);
   const [pageInput, setPageInput] = useState('1');
 
   const currentPage = Math.floor(offset / pageSize) + 1;
   const totalPages = Math.max(1, Math.ceil(total / pageSize));
 
+  const facetLabel = (key, value) => {
+    const count = facetCounts[key]?.[value];
+    return count !== undefined ? `${value} (${count} lignes)` : value;
+  };
+
+  // Values picked from the options lists are matched exactly (index-backed),
+  // free text keeps the server's default "contains" match.
+  const withMatchModes = (applied) => {
+    const params = { ...applied };
+    Object.entries(filterOptions).forEach(([key, values]) => {
+      if (applied[key] && (values || []).includes(applied[key])) {
+        params[`${key}_match`] = 'exact';
+      }
+    });
+    return params;
+  };
+
   const loadData = async () => {
     setLoading(true);
     setError(null);
     try {
-      const result = await getDumpRawData(pageSize, offset, selectedYear, appliedFilters);
+      // Only the displayed columns are fetched (date_raw is used to render the date)
+      const params = {
+        ...withMatchModes(appliedFilters),
+        fields: [...columns.map((col) => col.key), 'date_raw'].join(',')
+      };
+      const result = await getDumpRawData(pageSize, offset, selectedYear, params, pageCursor || {});
       if (result && result.success) {
         setItems(result.items || []);
-        setTotal(result.total || 0);
+        setCursors({ next: result.next_cursor || null, prev: result.prev_cursor || null });
+        if (result.total !== undefined) {
+          setTotal(result.total || 0);
+        }
       } else {
         setError(result?.message || 'Impossible de charger les données brutes.');
       }
@@ -88,7 +123,7 @@ const RawData = () => {
   useEffect(() => {
     loadData();
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [offset, selectedYear, appliedFilters, pageSize]);
+  }, [offset, pageCursor, selectedYear, appliedFilters, pageSize]);
 
   useEffect(() => {
     const loadYears = async () => {
@@ -131,16 +166,22 @@ const RawData = () => {
     if (!selectedYear) return;
     const loadOptions = async () => {
       try {
-        const result = await getDumpRawDataOptions(selectedYear);
+        const result = await getDumpRawDataOptions(selectedYear, withMatchModes(appliedFilters));
         if (result?.success) {
           setFilterOptions(result.options || {});
+          const counts = {};
+          Object.entries(result.facets || {}).forEach(([key, entries]) => {
+            counts[key] = Object.fromEntries(entries.map((entry) => [entry.value, entry.count]));
+          });
+          setFacetCounts(counts);
         }
       } catch (err) {
         // ignore
       }
     };
     loadOptions();
-  }, [selectedYear]);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [selectedYear, appliedFilters]);
 
   const columns = useMemo(
     () => [
@@ -159,6 +200,7 @@ const RawData = () => {
 
   const handleApplyFilters = () => {
     setOffset(0);
+    setPageCursor(null);
     setPageInput('1');
     setAppliedFilters(filters);
   };
@@ -179,6 +221,7 @@ const RawData = () => {
     setFilters(empty);
     setAppliedFilters(empty);
     setOffset(0);
+    setPageCursor(null);
     setPageInput('1');
   };
 
@@ -190,9 +233,23 @@ const RawData = () => {
   const handlePageJump = () => {
     const target = Math.max(1, Math.min(totalPages, Number(pageInput) || 1));
     setOffset((target - 1) * pageSize);
+    setPageCursor(null);
     setPageInput(String(target));
   };
 
+  // Previous / next pages seek from the current page's cursors (keyset);
+  // page jumps and the first page fall back to offset mode, which also returns the total.
+  const handlePreviousPage = () => {
+    const nextOffset = Math.max(0, offset - pageSize);
+    setPageCursor(nextOffset > 0 && cursors.prev ? { before: cursors.prev } : null);
+    setOffset(nextOffset);
+  };
+
+  const handleNextPage = () => {
+    setPageCursor(cursors.next ? { after: cursors.next } : null);
+    setOffset((prev) => Math.min((totalPages - 1) * pageSize, prev + pageSize));
+  };
+
   return (
     <div className="min-h-screen bg-background text-foreground">
       <GlobalHeader />
@@ -209,6 +266,7 @@ const RawData = () => {
                       value={selectedYear || ''}
                       onChange={(event) => {
                         setOffset(0);
+                        setPageCursor(null);
                         setSelectedYear(Number(event.target.value));
                       }}
                       className="h-9 w-full rounded-md border border-input bg-background px-3 text-sm shadow-sm"
@@ -241,7 +299,7 @@ const RawData = () => {
                   />
                   <datalist id="raw-lieu-collecte">
                     {(filterOptions.lieu_collecte || []).map((value) => (
-                      <option key={value} value={value} />
+                      <option key={value} value={value} label={facetLabel('lieu_collecte', value)} />
                     ))}
                   </datalist>
                 </div>
@@ -256,7 +314,7 @@ const RawData = () => {
                   />
                   <datalist id="raw-categorie">
                     {(filterOptions.categorie || []).map((value) => (
-                      <option key={value} value={value} />
+                      <option key={value} value={value} label={facetLabel('categorie', value)} />
                     ))}
                   </datalist>
                 </div>
@@ -271,7 +329,7 @@ const RawData = () => {
                   />
                   <datalist id="raw-flux">
                     {(filterOptions.flux || []).map((value) => (
-                      <option key={value} value={value} />
+                      <option key={value} value={value} label={facetLabel('flux', value)} />
                     ))}
                   </datalist>
                 </div>
@@ -286,7 +344,7 @@ const RawData = () => {
                   />
                   <datalist id="raw-orientation">
                     {(filterOptions.orientation || []).map((value) => (
-                      <option key={value} value={value} />
+                      <option key={value} value={value} label={facetLabel('orientation', value)} />
                     ))}
                   </datalist>
                 </div>
@@ -301,7 +359,7 @@ const RawData = () => {
                   />
                   <datalist id="raw-source-file">
                     {(filterOptions.source_file || []).map((value) => (
-                      <option key={value} value={value} />
+                      <option key={value} value={value} label={facetLabel('source_file', value)} />
                     ))}
                   </datalist>
                 </div>
@@ -316,7 +374,7 @@ const RawData = () => {
                   />
                   <datalist id="raw-source-sheet">
                     {(filterOptions.source_sheet || []).map((value) => (
-                      <option key={value} value={value} />
+                      <option key={value} value={value} label={facetLabel('source_sheet', value)} />
                     ))}
                   </datalist>
                 </div>
@@ -379,6 +437,14 @@ const RawData = () => {
               <CardHeader className="flex flex-col gap-3 md:flex-row md:items-center md:justify-between">
                 <CardTitle>Table des données</CardTitle>
                 <div className="flex flex-wrap items-center gap-3">
+                  {selectedYear && total > 0 && (
+                    <Button variant="outline" size="sm" asChild>
+                      <a href={getDumpRawExportUrl(selectedYear, withMatchModes(appliedFilters), 'csv')}>
+                        <Download className="mr-1 h-4 w-4" />
+                        Exporter CSV
+                      </a>
+                    </Button>
+                  )}
                   <div className="flex items-center gap-2 text-sm">
                     <span className="text-muted-foreground">Taille</span>
                     <select
@@ -387,6 +453,7 @@ const RawData = () => {
                         const nextSize = Number(event.target.value);
                         setPageSize(nextSize);
                         setOffset(0);
+                        setPageCursor(null);
                         setPageInput('1');
                       }}
                       className="h-9 rounded-md border border-input bg-background px-3 text-sm shadow-sm"
@@ -414,7 +481,7 @@ const RawData = () => {
                   <Button
                     variant="outline"
                     size="sm"
-                    onClick={() => setOffset((prev) => Math.max(0, prev - pageSize))}
+                    onClick={handlePreviousPage}
                     disabled={offset === 0 || loading}
                   >
                     <ChevronLeft className="mr-1 h-4 w-4" />
@@ -426,8 +493,8 @@ const RawData = () => {
                   <Button
                     variant="outline"
                     size="sm"
-                    onClick={() => setOffset((prev) => Math.min((totalPages - 1) * pageSize, prev + pageSize))}
-                    disabled={offset + pageSize >= total || loading}
+                    onClick={handleNextPage}
+                    disabled={offset + pageSize >= total || !cursors.next || loading}
                   >
                     Suivant
                     <ChevronRight className="ml-1 h-4 w-4" />
@@ -13,6 +13,26 @@ const api = axios.create({
   timeout: 300000, // 5 minutes pour les gros fichiers
 });
 
+// Les endpoints de statistiques répondent 503 + Retry-After quand tous les
+// slots de calcul sont pris : on relance les GET après le délai indiqué
+const BUSY_MAX_RETRIES = 2;
+const BUSY_MAX_DELAY_SECONDS = 30;
+
+api.interceptors.response.use(undefined, async (error) => {
+  const { config, response } = error;
+  if (!config || response?.status !== 503 || (config.method || 'get').toLowerCase() !== 'get') {
+    throw error;
+  }
+  const attempt = (config.busyRetries || 0) + 1;
+  if (attempt > BUSY_MAX_RETRIES) {
+    throw error;
+  }
+  const retryAfter = Number.parseInt(response.headers?.['retry-after'], 10);
+  const delay = Math.min(Number.isFinite(retryAfter) ? retryAfter : 5, BUSY_MAX_DELAY_SECONDS);
+  await new Promise((resolve) => setTimeout(resolve, delay * 1000));
+  return api({ ...config, busyRetries: attempt });
+});
+
 /**
  * Vérifie que le serveur est opérationnel
  */
@@ -25,6 +45,100 @@ export const checkStatus = async () => {
   }
 };
 
+// ============================================================================
+// Columnar decoding
+// ============================================================================
+
+/**
+ * Décode une réponse stats au format `columnar` vers le format historique
+ * (dechetteries -> { months, total, categories }).
+ * Ordre row-major : values[(d * P + p) * C + c], totals[d * C + c].
+ */
+export const decodeColumnarStats = (encoded) => {
+  if (!encoded || encoded.format !== 'columnar') return encoded;
+  const { dimensions, values, totals, format, precision, layout, ...rest } = encoded;
+  const { dechetteries, periods, columns } = dimensions;
+  const P = periods.length;
+  const C = columns.length;
+  const decoded = {};
+  dechetteries.forEach((dech, d) => {
+    const months = {};
+    periods.forEach((period, p) => {
+      const base = (d * P + p) * C;
+      const monthData = {};
+      columns.forEach((col, c) => {
+        monthData[col] = values[base + c];
+      });
+      months[period] = monthData;
+    });
+    const total = {};
+    columns.forEach((col, c) => {
+      total[col] = totals[d * C + c];
+    });
+    decoded[dech] = { months, total, categories: {} };
+  });
+  return { ...rest, dechetteries: decoded };
+};
+
+/**
+ * Décode une série temporelle au format `columnar` vers une liste
+ * de { period, dechetterie, total }. Ordre row-major : values[p * D + d].
+ */
+export const decodeColumnarSeries = (encoded) => {
+  if (!encoded || encoded.format !== 'columnar') return encoded;
+  const { periods, dechetteries } = encoded.dimensions;
+  const D = dechetteries.length;
+  const rows = [];
+  periods.forEach((period, p) => {
+    dechetteries.forEach((dechetterie, d) => {
+      rows.push({ period, dechetterie, total: encoded.values[p * D + d] });
+    });
+  });
+  return rows;
+};
+
+/**
+ * Décode une grille de heatmap calendrier ({ layers, week_starts, values })
+ * en { [layer]: { 'YYYY-MM-DD': valeur } }. Ordre : values[(l * W + w) * 7 + d].
+ */
+export const decodeCalendarHeatmap = (grid) => {
+  const result = {};
+  if (!grid || !grid.layers) return result;
+  const W = grid.week_starts.length;
+  const weekStarts = grid.week_starts.map((iso) => new Date(`${iso}T00:00:00Z`));
+  grid.layers.forEach((layer, l) => {
+    const series = {};
+    weekStarts.forEach((monday, w) => {
+      for (let d = 0; d < 7; d += 1) {
+        const value = grid.values[(l * W + w) * 7 + d];
+        if (value) {
+          const day = new Date(monday.getTime() + d * 86400000);
+          series[day.toISOString().slice(0, 10)] = value;
+        }
+      }
+    });
+    result[layer] = series;
+  });
+  return result;
+};
+
+/**
+ * Décode une matrice déchetterie × flux en { rows, columns } (props de FluxHeatmap).
+ * Ordre : values[d * C + c].
+ */
+export const decodeFluxHeatmap = (matrix) => {
+  if (!matrix || !matrix.dechetteries) return { rows: [], columns: [] };
+  const C = matrix.columns.length;
+  const rows = matrix.dechetteries.map((name, d) => {
+    const row = { name };
+    matrix.columns.forEach((col, c) => {
+      row[col] = matrix.values[d * C + c];
+    });
+    return row;
+  });
+  return { rows, columns: matrix.columns };
+};
+
 // ============================================================================
 // Dump API functions
 // ============================================================================
@@ -69,9 +183,13 @@ export const getDumpStatus = async (year = 2025) => {
 export const getDumpStats = async (year = 2025) => {
   try {
     const response = await api.get('/db/dump/stats', {
-      params: { year }
+      params: { year, format: 'columnar' }
     });
-    return response.data;
+    const data = response.data;
+    if (data && data.stats) {
+      data.stats = decodeColumnarStats(data.stats);
+    }
+    return data;
   } catch (error) {
     if (error.response) {
       throw new Error(error.response.data.error || error.response.data.message || 'Erreur lors du chargement des statistiques');
@@ -83,14 +201,21 @@ export const getDumpStats = async (year = 2025) => {
   }
 };
 
-export const getDumpRawData = async (limit = 50, offset = 0, year = 2025, filters = {}) => {
+export const getDumpRawData = async (limit = 50, offset = 0, year = 2025, filters = {}, cursor = {}) => {
   try {
+    // With a keyset cursor ({ after } or { before }), the offset is not sent
     const params = {
       limit,
-      offset,
       year,
       ...filters
     };
+    if (cursor.after) {
+      params.after = cursor.after;
+    } else if (cursor.before) {
+      params.before = cursor.before;
+    } else {
+      params.offset = offset;
+    }
     const response = await api.get('/db/dump/raw', { params });
     return response.data;
   } catch (error) {
@@ -104,10 +229,24 @@ export const getDumpRawData = async (limit = 50, offset = 0, year = 2025, filter
   }
 };
 
-export const getDumpRawDataOptions = async (year = 2025) => {
+/**
+ * URL de l'export streamé des données brutes filtrées (csv ou ndjson).
+ * Utilisée comme lien direct pour que le navigateur écrive le fichier au fil de l'eau.
+ */
+export const getDumpRawExportUrl = (year = 2025, filters = {}, format = 'csv') => {
+  const params = new URLSearchParams({ year: String(year), format });
+  Object.entries(filters).forEach(([key, value]) => {
+    if (value) {
+      params.append(key, value);
+    }
+  });
+  return `${api.defaults.baseURL}/db/dump/raw/export?${params.toString()}`;
+};
+
+export const getDumpRawDataOptions = async (year = 2025, filters = {}) => {
   try {
     const response = await api.get('/db/dump/raw/options', {
-      params: { year }
+      params: { year, ...filters }
     });
     return response.data;
   } catch (error) {
@@ -121,12 +260,40 @@ export const getDumpRawDataOptions = async (year = 2025) => {
   }
 };
 
+export const getDumpAggregate = async (year = 2025, { dimensions = [], measures = ['sum:poids'], order = [], limit, ...filters } = {}) => {
+  try {
+    const response = await api.get('/db/dump/aggregate', {
+      params: {
+        year,
+        dimensions: dimensions.join(','),
+        measures: measures.join(','),
+        order: order.length ? order.join(',') : undefined,
+        limit,
+        ...filters
+      }
+    });
+    return response.data;
+  } catch (error) {
+    if (error.response) {
+      throw new Error(error.response.data.error || error.response.data.message || 'Erreur lors de l\'agrégation');
+    } else if (error.request) {
+      throw new Error('Le serveur ne répond pas. Vérifiez qu\'il est démarré.');
+    } else {
+      throw new Error(error.message || 'Erreur inconnue');
+    }
+  }
+};
+
 export const getDumpTimeSeries = async (granularity = 'day', year = 2025) => {
   try {
     const response = await api.get('/db/dump/stats/advanced/series', {
-      params: { granularity, year }
+      params: { granularity, year, format: 'columnar' }
     });
-    return response.data;
+    const data = response.data;
+    if (data && data.data) {
+      data.data = decodeColumnarSeries(data.data);
+    }
+    return data;
   } catch (error) {
     if (error.response) {
       throw new Error(error.response.data.error || error.response.data.message || 'Erreur lors du chargement des séries temporelles');
@@ -189,10 +356,10 @@ export const getDumpAnomalies = async (limit = 10, year = 2025) => {
   }
 };
 
-export const getDumpMissingDays = async (year = 2025) => {
+export const getDumpMissingDays = async (year = 2025, calendar = true) => {
   try {
     const response = await api.get('/db/dump/stats/advanced/missing-days', {
-      params: { year }
+      params: { year, calendar }
     });
     return response.data;
   } catch (error) {
@@ -223,6 +390,91 @@ export const getDumpComparison = async (year = 2025) => {
   }
 };
 
+export const getDumpAdvancedBundle = async (granularity = 'day', year = 2025, { limit = 10, calendar = true } = {}) => {
+  try {
+    const response = await api.get('/db/dump/stats/advanced/bundle', {
+      params: { granularity, year, limit, calendar }
+    });
+    return response.data;
+  } catch (error) {
+    if (error.response) {
+      throw new Error(error.response.data.error || error.response.data.message || 'Erreur lors du chargement des statistiques avancées');
+    } else if (error.request) {
+      throw new Error('Le serveur ne répond pas. Vérifiez qu\'il est démarré.');
+    } else {
+      throw new Error(error.message || 'Erreur inconnue');
+    }
+  }
+};
+
+export const getDumpWeightDistribution = async (year = 2025, { by = 'category', bins = 20, scale = 'log' } = {}) => {
+  try {
+    const response = await api.get('/db/dump/stats/distribution', {
+      params: { year, by, bins, scale }
+    });
+    return response.data;
+  } catch (error) {
+    if (error.response) {
+      throw new Error(error.response.data.error || error.response.data.message || 'Erreur lors du chargement des distributions');
+    } else if (error.request) {
+      throw new Error('Le serveur ne répond pas. Vérifiez qu\'il est démarré.');
+    } else {
+      throw new Error(error.message || 'Erreur inconnue');
+    }
+  }
+};
+
+export const getDumpCalendarHeatmap = async (year = 2025, by = 'dechetterie') => {
+  try {
+    const response = await api.get('/db/dump/stats/heatmap/calendar', {
+      params: { year, by }
+    });
+    return response.data;
+  } catch (error) {
+    if (error.response) {
+      throw new Error(error.response.data.error || error.response.data.message || 'Erreur lors du chargement de la heatmap');
+    } else if (error.request) {
+      throw new Error('Le serveur ne répond pas. Vérifiez qu\'il est démarré.');
+    } else {
+      throw new Error(error.message || 'Erreur inconnue');
+    }
+  }
+};
+
+export const getDumpFluxHeatmap = async (year = 2025, by = 'category') => {
+  try {
+    const response = await api.get('/db/dump/stats/heatmap/flux', {
+      params: { year, by }
+    });
+    return response.data;
+  } catch (error) {
+    if (error.response) {
+      throw new Error(error.response.data.error || error.response.data.message || 'Erreur lors du chargement de la heatmap');
+    } else if (error.request) {
+      throw new Error('Le serveur ne répond pas. Vérifiez qu\'il est démarré.');
+    } else {
+      throw new Error(error.message || 'Erreur inconnue');
+    }
+  }
+};
+
+export const getDumpYearOverYear = async (years = []) => {
+  try {
+    const response = await api.get('/db/dump/stats/yoy', {
+      params: years.length ? { years: years.join(',') } : {}
+    });
+    return response.data;
+  } catch (error) {
+    if (error.response) {
+      throw new Error(error.response.data.error || error.response.data.message || 'Erreur lors du chargement de la comparaison annuelle');
+    } else if (error.request) {
+      throw new Error('Le serveur ne répond pas. Vérifiez qu\'il est démarré.');
+    } else {
+      throw new Error(error.message || 'Erreur inconnue');
+    }
+  }
+};
+
 export const getDumpAvailableYears = async () => {
   try {
     const response = await api.get('/db/dump/years');
@@ -281,6 +533,34 @@ export const downloadOutputFile = async (filename) => {
   }
 };
 
+export const generateCollectesReport = async (year = 2025, force = false) => {
+  try {
+    const response = await api.post('/reports/collectes', null, {
+      params: { year, force: force ? 'true' : undefined }
+    });
+    return response.data;
+  } catch (error) {
+    if (error.response) {
+      throw new Error(error.response.data.error || error.response.data.message || 'Erreur lors de la génération du rapport');
+    } else {
+      throw new Error('Erreur lors de la génération du rapport');
+    }
+  }
+};
+
+export const getReportJob = async (jobId) => {
+  try {
+    const response = await api.get(`/reports/jobs/${encodeURIComponent(jobId)}`);
+    return response.data;
+  } catch (error) {
+    if (error.response) {
+      throw new Error(error.response.data.error || 'Erreur lors du suivi de la génération');
+    } else {
+      throw new Error('Erreur lors du suivi de la génération');
+    }
+  }
+};
+
 export const listInputFiles = async () => {
   try {
     const response = await api.get('/files/input/list');